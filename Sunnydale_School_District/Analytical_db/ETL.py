@@ -3,8 +3,59 @@ from sqlalchemy.engine import URL
 from sqlalchemy.sql import exists
 import pandas as pd
 import datetime
-from typing import Optional, Dict, Union
+import os
+import time
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 from configparser import ConfigParser
+import argparse
+
+from partitions import DEFAULT_START as CALENDAR_START, ensure_future_partitions
+from school_calendar import calendar_rows, from_days, grade_level_sql, school_year, school_year_start, to_days
+from migrations import migrate
+from bulk_writer import BulkWriter, METHODS as BULK_METHODS
+from etl_scheduler import SourceSnapshot, Task, run_stages
+import summaries
+from table_swap import SHADOW_SUFFIX, create_shadow_tables, drop_tables, swap_tables
+from etl_telemetry import ETL_CONTROL_SQL, RunTelemetry, compare_runs, print_history
+from snapshot_publisher import DEFAULT_SNAPSHOT_DIR, publish_snapshot
+
+PROCESS_NAME = 'student_warehouse'
+
+# fact table -> source table it has one row per source row of
+FACT_SOURCES = {
+    'student_attendance_fact': 'attendance',
+    'student_performance_fact': 'grade_details',
+}
+
+# Tables a full refresh rebuilds in shadow copies and swaps in, tables that
+# reference others first
+REFRESHED_TABLES = [
+    'attendance_daily_summary',
+    'performance_summary',
+    'student_attendance_fact',
+    'student_performance_fact',
+    'student_dim',
+    'teacher_dim',
+    'course_dim',
+    'school_dim',
+    'attendance_note_dim',
+    'date_dim',
+]
+
+# Incremental runs re-read this much before the last watermark, so rows
+# committed by transactions that were still open at that moment are not
+# missed. Everything is loaded idempotently, so the overlap is harmless.
+CHANGE_OVERLAP = datetime.timedelta(minutes=5)
+
+# rows fetched from the source per round trip; memory use is about two chunks
+DEFAULT_CHUNK_SIZE = 10000
+
+# source connections (and threads) loading in parallel
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
 
 def load_config(path: str, section: str = 'database') -> dict:
     parser = ConfigParser()
@@ -22,18 +73,41 @@ def load_config(path: str, section: str = 'database') -> dict:
 db_config_path = '/Users/louisas/Documents/Data 201 - Database/Homework/Assignment11/db_config.ini'
 wh_config_path = '/Users/louisas/Documents/Data 201 - Database/Homework/Assignment11/wh_config.ini'
 
-db_config = load_config(db_config_path)
-wh_config = load_config(wh_config_path)
-
 
 class ETLProcessor:
-    def __init__(self, db_config: Dict, wh_config: Dict):
+    def __init__(self, db_config: Dict, wh_config: Dict, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 trace_memory: bool = False, bulk_method: str = 'auto',
+                 workers: int = DEFAULT_WORKERS, fact_partitions: Optional[int] = None,
+                 snapshot_dir: Optional[str] = None):
         """Initialize database connections"""
         self.db_engine = self._create_engine(db_config)
-        self.wh_engine = self._create_engine(wh_config)
+        self.wh_engine = self._create_engine(wh_config, local_infile=True)
+        self.writer = BulkWriter(bulk_method)
         self.metadata = MetaData()
+        self.chunk_size = chunk_size
+        # tracemalloc slows allocation down noticeably, so peaks are only measured on request
+        self.trace_memory = trace_memory
+        self.memory_peaks = {}
+        self.telemetry = RunTelemetry()
+        if trace_memory and workers > 1:
+            # tracemalloc's peak is process-wide, so it is one table's only while tables load one at a time
+            print("Tracing memory, loading one table at a time")
+            workers = 1
+        self.workers = workers
+        self.fact_partitions = fact_partitions or workers
+        # the snapshot connection of the scheduler thread a load runs on
+        self._source = threading.local()
+        # appended to the warehouse tables loads write, SHADOW_SUFFIX during a full refresh
+        self.table_suffix = ''
+        self._primary_keys: Dict[str, List[str]] = {}
+        # attendance_note_dim's note_hash -> note_id, read after the notes are loaded
+        self.note_ids: Dict[str, int] = {}
+        # the school year the source's student.grade_level values are for, read at the start of a run
+        self.grades_as_of: Optional[int] = None
+        # where each successful run publishes the dashboards' Parquet snapshot, None for no snapshot
+        self.snapshot_dir = snapshot_dir
         
-    def _create_engine(self, config: Dict):
+    def _create_engine(self, config: Dict, local_infile: bool = False):
         """Create SQLAlchemy engine"""
         url = URL.create(
             drivername="mysql+pymysql",
@@ -43,7 +117,12 @@ class ETLProcessor:
             database=config['database'],
             query={'charset': 'utf8mb4'}
         )
-        return create_engine(url, pool_pre_ping=True, pool_recycle=3600)
+        return create_engine(
+            url,
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            connect_args={'local_infile': True} if local_infile else {}
+        )
 
     # ========== ETL Control Methods ==========
     def initialize_etl(self) -> bool:
@@ -59,69 +138,184 @@ class ETLProcessor:
                 autoload_with=self.wh_engine
             )
             result = conn.execute(
-                select(exists().where(etl_control.c.process_name == 'student_warehouse'))
+                select(exists().where(etl_control.c.process_name == PROCESS_NAME))
             )
             return result.scalar()
 
-    def get_last_etl_run(self) -> datetime.datetime:
-        """Get timestamp of last successful run"""
+    def get_last_etl_run(self) -> Optional[datetime.datetime]:
+        """Get the source watermark of the last successful run, None if there is none"""
         with self.wh_engine.connect() as conn:
             inspector = inspect(self.wh_engine)
             if not inspector.has_table('etl_control'):
-                return datetime.datetime(1970, 1, 1)
-                
+                return None
+            columns = [c['name'] for c in inspector.get_columns('etl_control')]
+            if 'watermark' not in columns:
+                return None
+
+            # watermark is only ever written by successful runs
             query = text("""
-                SELECT last_run FROM etl_control 
-                WHERE process_name = 'student_warehouse'
-                AND status = 'success'
-                ORDER BY last_run DESC 
-                LIMIT 1
-            """)
-            result = conn.execute(query).fetchone()
-            return result[0] if result else datetime.datetime(1970, 1, 1)
+                SELECT MAX(watermark) FROM etl_control
+                WHERE process_name = :process
+            """).bindparams(process=PROCESS_NAME)
+            return conn.execute(query).scalar()
 
     def update_etl_status(
         self, 
         status: str, 
         rows_processed: int = 0, 
         error_msg: Optional[str] = None, 
-        duration: float = 0
+        duration: float = 0,
+        watermark: Optional[datetime.datetime] = None
     ):
         """Update control table with current run details"""
         with self.wh_engine.begin() as conn:
             inspector = inspect(self.wh_engine)
             if not inspector.has_table('etl_control'):
-                conn.execute(text("""
-                    CREATE TABLE etl_control (
-                        process_name VARCHAR(100) NOT NULL,
-                        last_run TIMESTAMP NOT NULL,
-                        status VARCHAR(20) NOT NULL,
-                        rows_processed INT DEFAULT 0,
-                        error_message TEXT,
-                        duration_seconds FLOAT,
-                        PRIMARY KEY (process_name, last_run)
-                    )
-                """))
+                conn.execute(text(ETL_CONTROL_SQL))
+            elif 'watermark' not in [c['name'] for c in inspector.get_columns('etl_control')]:
+                conn.execute(text("ALTER TABLE etl_control ADD COLUMN watermark DATETIME"))
             
+            # a failed run keeps the previous watermark so the next run retries its changes
             conn.execute(text("""
                 INSERT INTO etl_control 
-                    (process_name, last_run, status, rows_processed, error_message, duration_seconds)
+                    (process_name, last_run, watermark, status, rows_processed, error_message, duration_seconds)
                 VALUES 
-                    (:process, NOW(), :status, :rows, :error, :duration)
+                    (:process, NOW(), :watermark, :status, :rows, :error, :duration)
                 ON DUPLICATE KEY UPDATE 
                     last_run = NOW(),
+                    watermark = COALESCE(VALUES(watermark), watermark),
                     status = VALUES(status),
                     rows_processed = VALUES(rows_processed),
                     error_message = VALUES(error_message),
                     duration_seconds = VALUES(duration_seconds)
             """).bindparams(
-                process='student_warehouse',
+                process=PROCESS_NAME,
+                watermark=watermark,
                 status=status,
                 rows=rows_processed,
                 error=error_msg,
                 duration=duration
             ))
 
+    def source_now(self) -> datetime.datetime:
+        """Current time on the source database, which stamps updated_at"""
+        with self.db_engine.connect() as conn:
+            return conn.execute(text("SELECT NOW()")).scalar()
+
+    def source_school_year(self) -> int:
+        """
+        The school year the source's student.grade_level values are for. The
+        source keeps only each student's current grade, so that is the latest
+        school year with attendance, or this one before any is recorded.
+        """
+        with self.db_engine.connect() as conn:
+            latest = conn.execute(text("SELECT MAX(date) FROM attendance")).scalar()
+        return school_year(latest or datetime.date.today())
+
+    # ========== Partition Maintenance ==========
+    def maintain_partitions(self, months_ahead: int = 3):
+        """Create upcoming monthly partitions on the date-partitioned tables"""
+        ensure_future_partitions(self.db_engine, 'attendance', 'date', months_ahead)
+        ensure_future_partitions(self.wh_engine, 'student_attendance_fact', 'to_days', months_ahead)
+
+    # ========== Streaming ==========
+    def stream_query(self, sql_text: text) -> Iterator[pd.DataFrame]:
+        """Read a source query chunk_size rows at a time through a server-side cursor"""
+        conn = getattr(self._source, 'conn', None)
+        if conn is not None:
+            yield from pd.read_sql(sql_text, conn.execution_options(stream_results=True),
+                                   chunksize=self.chunk_size)
+            return
+        with self.db_engine.connect().execution_options(stream_results=True) as conn:
+            for chunk in pd.read_sql(sql_text, conn, chunksize=self.chunk_size):
+                yield chunk
+
+    def _source_connection(self):
+        """The snapshot connection when running under the scheduler, otherwise the engine"""
+        return getattr(self._source, 'conn', None) or self.db_engine
+
+    def pipeline_load(
+        self,
+        sql_text: text,
+        target_table: str,
+        write_chunk: Callable[[pd.DataFrame], None],
+        transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None
+    ) -> int:
+        """
+        Stream sql_text from the source, apply transform to each chunk and hand
+        it to write_chunk on a writer thread while the next chunk is fetched. At
+        most one chunk is being written and one fetched at a time, so memory
+        stays at about two chunks whatever the size of the table.
+        """
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+
+        def timed_write(chunk):
+            start = time.perf_counter()
+            write_chunk(chunk)
+            return time.perf_counter() - start
+
+        rows = size = 0
+        extract_seconds = transform_seconds = load_seconds = 0.0
+        pending = None
+        chunks = self.stream_query(sql_text)
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            while True:
+                start = time.perf_counter()
+                chunk = next(chunks, None)
+                extract_seconds += time.perf_counter() - start
+                if chunk is None:
+                    break
+
+                start = time.perf_counter()
+                if transform is not None:
+                    chunk = transform(chunk)
+                transform_seconds += time.perf_counter() - start
+
+                if pending is not None:
+                    load_seconds += pending.result()
+                pending = writer.submit(timed_write, chunk)
+                rows += len(chunk)
+                size += int(chunk.memory_usage(index=False, deep=True).sum())
+            if pending is not None:
+                load_seconds += pending.result()
+
+        peak = None
+        if self.trace_memory:
+            # a fact split into slices keeps the largest slice's peak
+            peak = tracemalloc.get_traced_memory()[1]
+            peak = self.memory_peaks[target_table] = max(self.memory_peaks.get(target_table, 0), peak)
+        self.telemetry.record(
+            target_table,
+            peak_memory=peak,
+            extract_seconds=extract_seconds,
+            transform_seconds=transform_seconds,
+            load_seconds=load_seconds,
+            rows_processed=rows,
+            bytes_processed=size
+        )
+        return rows
+
+    @staticmethod
+    def _bind(query: Union[str, text], params: Optional[dict] = None) -> text:
+        sql_text = text(query) if isinstance(query, str) else query
+        if params:
+            sql_text = sql_text.bindparams(**params)
+        return sql_text
+
+    def _append(self, conn, df: pd.DataFrame, table: str):
+        self.writer.write(conn, df, table)
+
+    def table(self, name: str) -> str:
+        """The table loads of warehouse table name write to"""
+        return name + self.table_suffix
+
+    def primary_key(self, table: str) -> List[str]:
+        """Primary key columns of a warehouse table, inspected once per processor"""
+        if table not in self._primary_keys:
+            self._primary_keys[table] = inspect(self.wh_engine).get_pk_constraint(table)['constrained_columns']
+        return self._primary_keys[table]
+
     # ========== Dimension Loading ==========
     def load_dimension_table(
         self, 
@@ -131,96 +325,354 @@ class ETLProcessor:
         where_clause: Optional[str] = None,
         params: Optional[dict] = None
     ):
-        """Generic dimension table loader"""
+        """
+        Generic dimension table loader. Rows are upserted on the primary key and
+        carry a hash of their source values, so rows that have not changed since
+        they were last loaded are not rewritten.
+        """
         columns_str = ', '.join(columns)
-        query = f"SELECT {columns_str} FROM {source_table}"
+        query = f"SELECT {columns_str}, MD5(CONCAT_WS('|', {columns_str})) AS row_hash FROM {source_table}"
 
         if where_clause:
             query += f" WHERE {where_clause}"
 
         #query += " LIMIT 1000"  # dev only
 
-        # Create text object and bind parameters
-        sql_text = text(query)
-        if params:
-            sql_text = sql_text.bindparams(**params)
+        def transform(df):
+            if target_table == 'school_dim' and 'state' in df.columns:
+                df['state'] = df['state'].str[:2]
+            return df
 
-        df = pd.read_sql(sql_text, self.db_engine)
+        return self.merge_table(query, target_table, params, transform=transform, hash_column='row_hash')
 
-        if target_table == 'school_dim' and 'state' in df.columns:
-            df['state'] = df['state'].str[:2]
+    # ========== Fact Table Loading ==========
+    def load_fact_table(self, query: Union[str, text], target_table: str, params: Optional[dict] = None,
+                        transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None):
+        """Generic fact table loader that handles both raw SQL and text() clauses"""
+        table = self.table(target_table)
 
+        def write_chunk(df):
+            with self.wh_engine.begin() as conn:
+                self._append(conn, df, table)
+
+        return self.pipeline_load(self._bind(query, params), target_table, write_chunk, transform)
+
+    def merge_table(self, query: Union[str, text], target_table: str, params: Optional[dict] = None,
+                    stage_table: Optional[str] = None,
+                    transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+                    hash_column: Optional[str] = None):
+        """
+        Load a table through a staging table and upsert it on the table's
+        primary key, so loading the same source rows twice leaves it unchanged.
+        With hash_column, rows whose hash matches the stored row are skipped.
+        """
+        table = self.table(target_table)
+        stage_table = stage_table or f"{target_table}_stage"
         with self.wh_engine.begin() as conn:
-            inspector = inspect(self.wh_engine)
-            pk_column = inspector.get_pk_constraint(target_table)['constrained_columns'][0]
-            
-            if not df.empty and pk_column in df.columns:
-                ids = tuple(df[pk_column].tolist())
-                if ids:
-                    conn.execute(
-                        text(f"DELETE FROM {target_table} WHERE {pk_column} IN :ids").bindparams(ids=ids)
-                    )
-
-            df.to_sql(
-                target_table,
-                conn,
-                if_exists='append',
-                index=False,
-                method='multi',
-                chunksize=1000
-            )
+            conn.execute(text(f"DROP TABLE IF EXISTS {stage_table}"))
+            conn.execute(text(f"CREATE TABLE {stage_table} LIKE {table}"))
+
+        unchanged = ''
+        if hash_column:
+            key = ' AND '.join(f"t.{c} = s.{c}" for c in self.primary_key(target_table))
+            unchanged = f"""
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {table} t WHERE {key} AND t.{hash_column} = s.{hash_column}
+                )"""
+
+        def write_chunk(df):
+            columns = ', '.join(df.columns)
+            updates = ', '.join(f"{c} = VALUES({c})" for c in df.columns)
+            with self.wh_engine.begin() as conn:
+                conn.execute(text(f"DELETE FROM {stage_table}"))
+                self._append(conn, df, stage_table)
+                conn.execute(text(f"""
+                    INSERT INTO {table} ({columns})
+                    SELECT {', '.join(f's.{c}' for c in df.columns)} FROM {stage_table} s{unchanged}
+                    ON DUPLICATE KEY UPDATE {updates}
+                """))
 
-        return len(df)
+        rows = self.pipeline_load(self._bind(query, params), target_table, write_chunk, transform)
+        with self.wh_engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {stage_table}"))
+        return rows
+
+    # ========== Change Detection ==========
+    def changed_keys(self, source_table: str, key_columns: list, since: datetime.datetime) -> pd.DataFrame:
+        """Keys of source rows inserted, updated or deleted after since"""
+        columns = ', '.join(key_columns)
+        query = text(f"""
+            SELECT {columns} FROM {source_table}
+            WHERE updated_at > :since
+            UNION
+            SELECT {columns} FROM etl_change_log
+            WHERE table_name = :source_table AND changed_at > :since
+        """).bindparams(since=since, source_table=source_table)
+        return pd.read_sql(query, self._source_connection())
+
+    def delete_changed_facts(self, target_table: str, keys: pd.DataFrame, join_condition: str) -> int:
+        """Remove the fact rows built from the given source keys so they can be reloaded"""
+        if keys.empty:
+            return 0
+        with self.wh_engine.begin() as conn:
+            keys.to_sql('etl_changed_keys', conn, if_exists='replace', index=False)
+            result = conn.execute(text(f"""
+                DELETE f FROM {target_table} f
+                JOIN etl_changed_keys k ON {join_condition}
+            """))
+            conn.execute(text("DROP TABLE etl_changed_keys"))
+        return result.rowcount
+
+    # ========== Load Stages ==========
+    def load_calendar(self) -> int:
+        """
+        Extend date_dim through the end of next school year. The calendar does
+        not depend on the source data, so most runs find it complete and only
+        read MAX(date_id).
+        """
+        through = school_year_start(school_year(datetime.date.today()) + 2) - datetime.timedelta(days=1)
+        with self.wh_engine.connect() as conn:
+            last_date_id = conn.execute(text(f"SELECT MAX(date_id) FROM {self.table('date_dim')}")).scalar()
 
-    # ========== Fact Table Loading ==========
-    def load_fact_table(self, query: Union[str, text], target_table: str, params: Optional[dict] = None):
-        """Generic fact table loader that handles both raw SQL and text() clauses"""
-        if isinstance(query, str):
-            sql_text = text(query)
-            if params:
-                sql_text = sql_text.bindparams(**params)
+        if last_date_id is None:
+            start = school_year_start(school_year(CALENDAR_START))
         else:
-            sql_text = query  # Assume it's already a text() object
+            start = from_days(last_date_id + 1)
+        if start > through:
+            return 0
 
-        df = pd.read_sql(sql_text, self.db_engine)
-        
+        df = pd.DataFrame(calendar_rows(start, through))
         with self.wh_engine.begin() as conn:
-            df.to_sql(
-                target_table,
-                conn,
-                if_exists='append',
-                index=False,
-                method='multi',
-                chunksize=1000
-            )
-        
+            self._append(conn, df, self.table('date_dim'))
         return len(df)
 
-    # ========== Main ETL Process ==========
-    # Add this method to handle truncation
-    def truncate_tables(self, conn):
-        """Truncate all necessary tables in the star schema to avoid foreign key issues."""
-        # List of all tables you want to truncate (fact tables first, then dimension tables)
-        tables_to_truncate = [
-            'student_attendance_fact',  # Fact tables
-            'student_performance_fact',  # More fact tables if needed
-            'student_dim',  # Dimension tables
-            'teacher_dim',  # Dimension tables
-            'course_dim',  # Dimension tables
-            'school_dim',  # Dimension tables
-            'date_dim'  # Dimension tables
+    def load_attendance_notes(self, changed: dict) -> int:
+        """
+        Add the notes of changed attendance rows to attendance_note_dim, each
+        distinct text once, then read every note's id for the attendance fact
+        """
+        table = self.table('attendance_note_dim')
+
+        def write_chunk(df):
+            with self.wh_engine.begin() as conn:
+                conn.execute(text(f"CREATE TEMPORARY TABLE IF NOT EXISTS attendance_note_stage LIKE {table}"))
+                conn.execute(text("DELETE FROM attendance_note_stage"))
+                self._append(conn, df, 'attendance_note_stage')
+                conn.execute(text(f"""
+                    INSERT INTO {table} (note_hash, notes)
+                    SELECT s.note_hash, s.notes FROM attendance_note_stage s
+                    WHERE NOT EXISTS (SELECT 1 FROM {table} n WHERE n.note_hash = s.note_hash)
+                """))
+
+        rows = self.pipeline_load(self._bind("""
+            SELECT DISTINCT MD5(notes) AS note_hash, notes
+            FROM attendance
+            WHERE notes IS NOT NULL AND updated_at > :since
+        """, changed), 'attendance_note_dim', write_chunk)
+
+        with self.wh_engine.connect() as conn:
+            self.note_ids = dict(conn.execute(text(f"SELECT note_hash, note_id FROM {table}")).fetchall())
+        return rows
+
+    def _note_keys(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Replace the attendance rows' note hashes with attendance_note_dim keys"""
+        df['note_id'] = df.pop('note_hash').map(self.note_ids).astype('Int64')
+        return df
+
+    @staticmethod
+    def _school_slice(changed: dict, part: int, parts: int):
+        """WHERE fragment and parameters restricting a fact query to one slice of schools"""
+        if parts == 1:
+            return '', dict(changed)
+        return ' AND MOD(s.school_id, :parts) = :part', dict(changed, part=part, parts=parts)
+
+    def load_performance_fact(self, changed: dict, part: int = 0, parts: int = 1) -> int:
+        """Performance fact for the schools in one slice"""
+        school_filter, params = self._school_slice(changed, part, parts)
+        # One row per grade_details row. The teacher is the one teaching the
+        # course to the student's homeroom, resolved once per class rather than
+        # once per weekly teaches slot. grade_details has no assessment date, but
+        # its grades are for the classes of the student's current grade (teaches
+        # is joined on s.grade_level), so that grade is the one at assessment and
+        # the summaries need no student_dim join. updated_at only says when the
+        # row was last edited and must not move the stamp
+        #add LIMIT 1000 for dev
+        return self.merge_table(
+            query=f"""
+            SELECT 
+                gd.grade_type, 
+                gd.score, 
+                gd.weight, 
+                (gd.score * gd.weight) AS weighted_score,
+                gd.student_id,
+                gd.course_id,
+                t.teacher_id,
+                s.school_id,
+                s.grade_level
+            FROM grade_details gd
+            JOIN student s ON gd.student_id = s.student_id
+            JOIN (
+                SELECT course_id, homeroom_id, school_id, grade_level, MIN(teacher_id) AS teacher_id
+                FROM teaches
+                GROUP BY course_id, homeroom_id, school_id, grade_level
+            ) t ON t.course_id = gd.course_id
+                AND t.homeroom_id = s.homeroom_id
+                AND t.school_id = s.school_id
+                AND t.grade_level = s.grade_level
+            WHERE gd.updated_at > :since
+            """ + school_filter,
+            target_table='student_performance_fact',
+            params=params,
+            stage_table=f"student_performance_fact_stage{part}"
+        )
+
+    def load_attendance_fact(self, changed: dict, part: int = 0, parts: int = 1) -> int:
+        """
+        Attendance fact for the schools in one slice, one row per attendance
+        row, stamped with the student's grade level on the day
+        """
+        school_filter, params = self._school_slice(changed, part, parts)
+        #add LIMIT 1000 for dev
+        return self.load_fact_table(
+            query=f"""
+            SELECT 
+                a.status, 
+                MD5(a.notes) AS note_hash,
+                a.student_id,
+                a.recorded_by AS teacher_id,
+                s.school_id,
+                TO_DAYS(a.date) AS date_id,
+                {grade_level_sql('s.grade_level', 'a.date', self.grades_as_of)} AS grade_level
+            FROM attendance a
+            JOIN student s ON a.student_id = s.student_id
+            WHERE a.updated_at > :since
+            """ + school_filter,
+            target_table='student_attendance_fact',
+            params=params,
+            transform=self._note_keys
+        )
+
+    def refresh_attendance_summary(self, changed: dict, full_refresh: bool) -> int:
+        """Recompute attendance_daily_summary for the days with changed attendance"""
+        date_ids = None
+        if not full_refresh:
+            keys = self.changed_keys('attendance', ['student_id', 'date'], changed['since'])
+            date_ids = sorted({to_days(day) for day in keys['date']})
+        with self.wh_engine.begin() as conn:
+            return summaries.refresh_attendance_summary(conn, date_ids, self.table_suffix)
+
+    def refresh_performance_summary(self, changed: dict, full_refresh: bool) -> int:
+        """Recompute performance_summary for the schools with changed grades"""
+        school_ids = None
+        if not full_refresh:
+            keys = self.changed_keys('grade_details', ['student_id', 'course_id', 'grade_type'], changed['since'])
+            school_ids = []
+            if not keys.empty:
+                query = text("SELECT DISTINCT school_id FROM student WHERE student_id IN :ids").bindparams(
+                    ids=tuple(keys['student_id'].unique().tolist())
+                )
+                school_ids = pd.read_sql(query, self._source_connection())['school_id'].tolist()
+        with self.wh_engine.begin() as conn:
+            return summaries.refresh_performance_summary(conn, school_ids, self.table_suffix)
+
+    def _timed(self, table: str, load: Callable[[], Optional[int]]) -> Callable[[], Optional[int]]:
+        """Wrap a load that does not go through pipeline_load so it still shows in the telemetry"""
+        def run():
+            start = time.perf_counter()
+            rows = load()
+            self.telemetry.record(table, load_seconds=time.perf_counter() - start, rows_processed=rows or 0)
+            return rows
+        return run
+
+    def load_stages(self, changed: dict, full_refresh: bool) -> List[Tuple[str, List[Task]]]:
+        """
+        The loads of one run grouped into stages of independent tasks: all
+        dimensions, then the removal of changed fact rows, then the facts split
+        into fact_partitions slices of schools each, then the dashboard summaries
+        """
+        dimensions = [
+            ('teachers', lambda: self.load_dimension_table(
+                source_table='teacher',
+                target_table='teacher_dim',
+                columns=['teacher_id', 'first_name', 'last_name', 'employment_type'],
+                where_clause='updated_at > :since',
+                params=changed
+            )),
+            ('students', lambda: self.load_dimension_table(
+                source_table='student',
+                target_table='student_dim',
+                columns=['student_id', 'first_name', 'last_name', 'date_of_birth', 'grade_level'],
+                where_clause='updated_at > :since',
+                params=changed
+            )),
+            ('courses', lambda: self.load_dimension_table(
+                source_table='course',
+                target_table='course_dim',
+                columns=['course_id', 'name'],
+                where_clause='updated_at > :since',
+                params=changed
+            )),
+            ('schools', lambda: self.load_dimension_table(
+                source_table='school',
+                target_table='school_dim',
+                columns=['school_id', 'name', 'school_type', 'address', 'city', 'state', 'zip'],
+                where_clause='updated_at > :since',
+                params=changed
+            )),
+            ('notes', lambda: self.load_attendance_notes(changed)),
+            ('dates', self._timed('date_dim', self.load_calendar)),
+        ]
+
+        # drop the fact rows built from changed or deleted source rows, the
+        # fact loads then reload the ones that still exist
+        removals = [] if full_refresh else [
+            (None, self._timed('student_performance_fact', lambda: self.delete_changed_facts(
+                'student_performance_fact',
+                self.changed_keys('grade_details', ['student_id', 'course_id', 'grade_type'], changed['since']),
+                'f.student_id = k.student_id AND f.course_id = k.course_id AND f.grade_type = k.grade_type'
+            ))),
+            (None, self._timed('student_attendance_fact', lambda: self.delete_changed_facts(
+                'student_attendance_fact',
+                self.changed_keys('attendance', ['student_id', 'date'], changed['since']),
+                'f.student_id = k.student_id AND f.date_id = TO_DAYS(k.date)'
+            ))),
         ]
 
-        for table in tables_to_truncate:
-            query = text(f"TRUNCATE TABLE {table}")
-            conn.execute(query)
+        parts = self.fact_partitions
+        facts = []
+        for part in range(parts):
+            facts.append(('performance', partial(self.load_performance_fact, changed, part, parts)))
+            facts.append(('attendance', partial(self.load_attendance_fact, changed, part, parts)))
+
+        summary_tables = [
+            ('attendance_summary', self._timed('attendance_daily_summary',
+                                               lambda: self.refresh_attendance_summary(changed, full_refresh))),
+            ('performance_summary', self._timed('performance_summary',
+                                                lambda: self.refresh_performance_summary(changed, full_refresh))),
+        ]
 
+        stages = [('dimensions', dimensions), ('removals', removals), ('facts', facts), ('summaries', summary_tables)]
+        return [(name, tasks) for name, tasks in stages if tasks]
 
-    # Modify your run_full_etl method to use truncate_tables
+    # ========== Main ETL Process ==========
     def run_full_etl(self):
-        """Execute complete ETL pipeline"""
+        """Rebuild the warehouse from the source and swap it in when complete"""
+        self.run_etl(full_refresh=True)
+
+    def run_incremental_etl(self):
+        """Load only the source rows that changed since the last successful run"""
+        self.run_etl(full_refresh=False)
+
+    def run_etl(self, full_refresh: bool = False):
+        """Execute the ETL pipeline, incrementally unless full_refresh is set"""
         start_time = datetime.datetime.now()
         stats = {}
+        self.memory_peaks = {}
+        self.telemetry = RunTelemetry()
+        self.table_suffix = ''
+        mode = 'full refresh' if full_refresh else 'incremental'
+        if self.trace_memory:
+            tracemalloc.start()
         
         try:
             # Initialize - ensure control table exists
@@ -228,143 +680,98 @@ class ETLProcessor:
                 print("ETL control table not found, creating...")
                 self.update_etl_status(status='initialized')
 
-            # Disable FK checks for initial load
-            with self.wh_engine.begin() as conn:
-                conn.execute(text("SET FOREIGN_KEY_CHECKS=0"))
-                print("Foreign key checks temporarily disabled for initial load")
-
-                # Truncate tables before starting the load
-                print("Truncating tables...")
-                self.truncate_tables(conn)
-                print("Tables truncated successfully.")
-
-            # Proceed with normal ETL process
-            last_run = self.get_last_etl_run()
-            print(f"Starting ETL from last run: {last_run}")
-            
-            # Load all dimensions first
-            stats['teachers'] = self.load_dimension_table(
-                source_table='teacher',
-                target_table='teacher_dim',
-                columns=['teacher_id', 'first_name', 'last_name', 'employment_type']
-            )
-            
-            stats['students'] = self.load_dimension_table(
-                source_table='student',
-                target_table='student_dim',
-                columns=['student_id', 'first_name', 'last_name', 'date_of_birth', 'grade_level']
-            )
-            
-            stats['courses'] = self.load_dimension_table(
-                source_table='course',
-                target_table='course_dim',
-                columns=['course_id', 'name']
-            )
-            
-            stats['schools'] = self.load_dimension_table(
-                source_table='school',
-                target_table='school_dim',
-                columns=['school_id', 'name', 'school_type', 'address', 'city', 'state', 'zip']
-            )
-            
-            # Date dimension and performance fact loading
-            date_query = text("""
-                SELECT DISTINCT
-                    TO_DAYS(date) AS date_id,
-                    DAY(date) AS day,
-                    MONTH(date) AS month,
-                    CASE WHEN MONTH(date) BETWEEN 8 AND 12 THEN 1 ELSE 2 END AS semester,
-                    YEAR(date) AS year,
-                    DAYNAME(date) AS weekday
-                FROM attendance
-                WHERE date > :last_run
-            """).bindparams(last_run=last_run)
-
-            # First delete any existing dates we're about to insert
-            with self.wh_engine.begin() as conn:
-                dates_to_process = pd.read_sql(date_query, self.db_engine)
-                if not dates_to_process.empty:
-                    conn.execute(
-                        text("DELETE FROM date_dim WHERE date_id IN :ids"),
-                        {'ids': tuple(dates_to_process['date_id'].tolist())}
-                    )
-
-            stats['dates'] = self.load_fact_table(
-                query=date_query,
-                target_table='date_dim'
-            )
-            
-            # Performance fact
-            #add LIMIT 1000 for dev
-            stats['performance'] = self.load_fact_table(
-                query="""
-                SELECT 
-                    gd.grade_type, 
-                    gd.score, 
-                    gd.weight, 
-                    (gd.score * gd.weight) AS weighted_score,
-                    gd.student_id,
-                    gd.course_id,
-                    t.teacher_id,
-                    s.school_id
-                FROM grade_details gd
-                JOIN student s ON gd.student_id = s.student_id
-                JOIN takes tk ON gd.student_id = tk.student_id AND gd.course_id = tk.course_id
-                JOIN teaches t ON tk.course_id = t.course_id AND tk.day = t.day AND tk.start_time = t.start_time
-                """,
-                target_table='student_performance_fact'
-            )
-            
-            # Attendance fact with proper parameter binding
-            #add LIMIT 1000 for dev
-            attendance_query = text("""
-                SELECT 
-                    a.status, 
-                    COALESCE(a.notes, '') AS notes,
-                    a.student_id,
-                    tk.course_id,
-                    t.teacher_id,
-                    s.school_id,
-                    TO_DAYS(a.date) AS date_id
-                FROM attendance a
-                JOIN student s ON a.student_id = s.student_id
-                JOIN takes tk ON a.student_id = tk.student_id
-                JOIN teaches t ON tk.course_id = t.course_id AND tk.day = t.day AND tk.start_time = t.start_time
-                WHERE a.date > :last_run
-            """).bindparams(last_run=last_run)
-            stats['attendance'] = self.load_fact_table(
-                query=attendance_query,
-                target_table='student_attendance_fact'
-            )
+            # Bring the warehouse schema up to date, then make sure the
+            # partitions for the coming months exist before loading
+            migrate(self.wh_engine)
+            self.maintain_partitions()
+
+            # Taken before extracting, so changes made during this run are picked up next time
+            watermark = self.source_now()
+            last_run = None if full_refresh else self.get_last_etl_run()
+
+            if last_run is None:
+                print("Running full refresh")
+                full_refresh = True
+                mode = 'full refresh'
+                since = datetime.datetime(1970, 1, 1)
+                # the dashboards keep reading the live tables until the swap
+                with self.wh_engine.begin() as conn:
+                    create_shadow_tables(conn, REFRESHED_TABLES)
+                self.table_suffix = SHADOW_SUFFIX
+            else:
+                since = last_run - CHANGE_OVERLAP
+                print(f"Loading changes since {since} (last run {last_run})")
+
+            changed = {'since': since}
+            self.grades_as_of = self.source_school_year()
+
+            # Every load reads the same snapshot of the source, on self.workers connections
+            with SourceSnapshot(self.db_engine, self.workers) as snapshot:
+                stats = run_stages(self.load_stages(changed, full_refresh), snapshot, self._source,
+                                   on_task_start=self.telemetry.set_stage)
+
+            if full_refresh:
+                print("Swapping in the refreshed tables...")
+                with self.wh_engine.begin() as conn:
+                    swap_tables(conn, REFRESHED_TABLES)
+                self.table_suffix = ''
             
             # Update status
             duration = (datetime.datetime.now() - start_time).total_seconds()
             self.update_etl_status(
                 status='success',
                 rows_processed=sum(stats.values()),
-                duration=duration
+                duration=duration,
+                watermark=watermark
             )
+            run_id = self.telemetry.save(self.wh_engine, PROCESS_NAME, mode, 'success', start_time,
+                                         duration, sum(stats.values()))
+
+            # like the snapshot, a missing KPI row only leaves the dashboards on the previous run's
+            try:
+                with self.wh_engine.begin() as conn:
+                    summaries.refresh_district_kpis(conn, run_id)
+            except Exception as e:
+                print(f"WARNING: could not refresh the district KPIs: {e}")
             
-            print(f"ETL completed successfully. Processed {sum(stats.values())} records in {duration:.2f} seconds")
+            if self.snapshot_dir:
+                # the warehouse is already loaded, a missing snapshot only leaves the dashboards on the previous one
+                try:
+                    print(f"Published dashboard snapshot {publish_snapshot(self.wh_engine, run_id, self.snapshot_dir)}")
+                except Exception as e:
+                    print(f"WARNING: could not publish the dashboard snapshot: {e}")
+
+            print(f"Run {run_id} ({mode}) completed successfully. Processed {sum(stats.values())} records in {duration:.2f} seconds")
             print("Breakdown:", stats)
+            print("Steps:")
+            self.telemetry.report()
+            print("Write throughput:")
+            self.writer.report()
+            for table, peak in self.memory_peaks.items():
+                print(f"Peak memory loading {table}: {peak / 1024 / 1024:.1f} MiB")
             
         except Exception as e:
-            # Error handling
+            # Error handling, the live tables are untouched by a failed full refresh
+            if self.table_suffix:
+                with self.wh_engine.begin() as conn:
+                    drop_tables(conn, REFRESHED_TABLES, self.table_suffix)
+                self.table_suffix = ''
             duration = (datetime.datetime.now() - start_time).total_seconds()
             self.update_etl_status(
                 status='failed',
                 error_msg=str(e),
                 duration=duration
             )
-            print(f"ETL failed: {str(e)}")
+            run_id = self.telemetry.save(self.wh_engine, PROCESS_NAME, mode, 'failed', start_time,
+                                         duration, sum(stats.values()), str(e))
+            print(f"ETL run {run_id} failed: {str(e)}")
             raise
 
         finally:
-            # Always re-enable FK checks
+            if self.trace_memory:
+                tracemalloc.stop()
+
             with self.wh_engine.begin() as conn:
-                conn.execute(text("SET FOREIGN_KEY_CHECKS=1"))
-                print("Foreign key checks re-enabled")
-                
                 # Basic integrity verification
                 result = conn.execute(text("""
                     SELECT 'student_performance_fact' AS table_name,
@@ -384,20 +791,62 @@ class ETLProcessor:
                     if bad_records > 0:
                         print(f"WARNING: {bad_records} orphaned records in {table}")
 
-            # Success reporting
-            duration = (datetime.datetime.now() - start_time).total_seconds()
-            self.update_etl_status(
-                status='success',
-                rows_processed=sum(stats.values()),
-                duration=duration
-            )
-            print(f"ETL completed successfully. Processed {sum(stats.values())} records")
+            for table, (source_rows, fact_rows) in self.validate_row_counts().items():
+                print(f"WARNING: {table} has {fact_rows} rows, its source has {source_rows}")
+
+    def validate_row_counts(self) -> Dict[str, tuple]:
+        """Facts whose row count differs from their source table, as table -> (source, fact)"""
+        mismatches = {}
+        for fact_table, source_table in FACT_SOURCES.items():
+            with self.db_engine.connect() as conn:
+                source_rows = conn.execute(text(f"SELECT COUNT(*) FROM {source_table}")).scalar()
+            with self.wh_engine.connect() as conn:
+                fact_rows = conn.execute(text(f"SELECT COUNT(*) FROM {fact_table}")).scalar()
+            if source_rows != fact_rows:
+                mismatches[fact_table] = (source_rows, fact_rows)
+        return mismatches
 
 
 # Run ETL
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the star schema from the operational database")
+    parser.add_argument('--full-refresh', action='store_true',
+                        help="rebuild the warehouse and swap it in instead of loading changes")
+    parser.add_argument('--history', action='store_true',
+                        help="list the latest runs instead of running the ETL")
+    parser.add_argument('--compare-runs', type=int, nargs=2, metavar=('RUN_A', 'RUN_B'),
+                        help="compare the per-table timings of two runs instead of running the ETL")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="rows read from the source per chunk")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="report the peak Python memory used while loading each table "
+                             "(loads one table at a time)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="loads run in parallel, each on its own source connection")
+    parser.add_argument('--fact-partitions', type=int,
+                        help="slices of schools each fact is split into (default: --workers)")
+    parser.add_argument('--bulk-method', choices=BULK_METHODS, default='auto',
+                        help="how rows are written to the warehouse (auto tries LOAD DATA first)")
+    parser.add_argument('--snapshot-dir', default=DEFAULT_SNAPSHOT_DIR,
+                        help="directory the dashboards' Parquet snapshot is published to after each run")
+    parser.add_argument('--no-snapshot', action='store_true',
+                        help="do not publish a dashboard snapshot")
+    options = parser.parse_args()
+
     try:
-        etl = ETLProcessor(db_config, wh_config)
-        etl.run_full_etl()
+        db_config = load_config(db_config_path)
+        wh_config = load_config(wh_config_path)
+        etl = ETLProcessor(db_config, wh_config, chunk_size=options.chunk_size,
+                           trace_memory=options.trace_memory, bulk_method=options.bulk_method,
+                           workers=options.workers, fact_partitions=options.fact_partitions,
+                           snapshot_dir=None if options.no_snapshot else options.snapshot_dir)
+        if options.history:
+            print_history(etl.wh_engine, PROCESS_NAME)
+        elif options.compare_runs:
+            compare_runs(etl.wh_engine, *options.compare_runs)
+        elif options.full_refresh:
+            etl.run_full_etl()
+        else:
+            etl.run_incremental_etl()
     except Exception as e:
         print(f"Fatal error in ETL process: {str(e)}")
\ No newline at end of file
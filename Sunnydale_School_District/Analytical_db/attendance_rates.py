@@ -0,0 +1,64 @@
+"""
+Attendance rates of every school day by school and by school and grade, for
+the executive dashboard, in a file it memory-maps (UI/attendance_snapshot.py).
+
+publish_snapshot() builds it into every snapshot version as
+attendance_rates.bin, laid out as snapshot_format.py describes.
+
+Rates are percentages, NaN where a school (or grade) had no attendance that
+day. Both arrays are read straight from disk, so opening the file costs the
+header only whatever the number of days.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from school_calendar import grade_order
+from snapshot_format import array_layout, make_header, pack_header
+
+
+def build_attendance_rates(conn, path: str) -> int:
+    """Write the rates of every school day in attendance_daily_summary to path, returning the days"""
+    rows = pd.read_sql(text("""
+        SELECT ads.date_id, ads.school_id, ads.grade_level, ads.present_count, ads.total_count
+        FROM attendance_daily_summary ads
+        JOIN date_dim d ON d.date_id = ads.date_id
+        WHERE d.is_school_day
+    """), conn)
+    schools = pd.read_sql(text("SELECT school_id, name FROM school_dim ORDER BY school_id"), conn)
+    return write_attendance_rates(path, rows, schools)
+
+
+def write_attendance_rates(path: str, rows: pd.DataFrame, schools: pd.DataFrame) -> int:
+    """
+    Write the rates of (date_id, school_id, grade_level, present_count,
+    total_count) rows for the (school_id, name) schools to path, returning the days
+    """
+    date_ids = np.sort(rows['date_id'].unique()).astype('<i4')
+    school_index = {school_id: i for i, school_id in enumerate(schools['school_id'])}
+    grade_levels = sorted(rows['grade_level'].unique(), key=grade_order)
+    grade_index = {grade_level: i for i, grade_level in enumerate(grade_levels)}
+
+    rows = rows[rows['school_id'].isin(school_index)]
+    shape = (len(date_ids), len(school_index), len(grade_levels))
+    present = np.zeros(shape)
+    total = np.zeros(shape)
+    cells = (
+        np.searchsorted(date_ids, rows['date_id'].to_numpy()),
+        rows['school_id'].map(school_index).to_numpy(),
+        rows['grade_level'].map(grade_index).to_numpy(),
+    )
+    np.add.at(present, cells, rows['present_count'].to_numpy())
+    np.add.at(total, cells, rows['total_count'].to_numpy())
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grade_rates = np.round(100 * present / total, 1).astype('<f4')
+        school_rates = np.round(100 * present.sum(axis=2) / total.sum(axis=2), 1).astype('<f4')
+
+    header = make_header(len(date_ids), schools.itertuples(index=False, name=None), grade_levels)
+    arrays = {'date_ids': date_ids, 'school_rates': school_rates, 'grade_rates': grade_rates}
+    with open(path, 'wb') as f:
+        f.write(pack_header(header))
+        for name, dtype, shape in array_layout(header):
+            f.write(np.ascontiguousarray(arrays[name], dtype=dtype).reshape(shape).tobytes())
+    return len(date_ids)
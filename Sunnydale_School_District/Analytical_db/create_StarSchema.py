@@ -1,18 +1,25 @@
+import re
+from typing import List
+
 import mysql.connector
 from data201 import db_connection
+from partitions import partition_clause
+from migrations import MIGRATIONS, SCHEMA_MIGRATIONS_SQL
+from summaries import ATTENDANCE_SUMMARY_SQL, DISTRICT_KPI_CACHE_SQL, PERFORMANCE_SUMMARY_SQL
+from etl_telemetry import ETL_CONTROL_SQL, ETL_RUN_SQL, ETL_RUN_STEP_SQL
 
-#connect to warehouse
-conn_wh = db_connection(config_file = '/Users/louisas/Documents/Data 201 - Database/Homework/Assignment11/sheql_wh.ini')
-cursor = conn_wh.cursor()
-
+# monthly partitions up to today, partitions.ensure_future_partitions adds the rest
+attendance_partitions = partition_clause('date_id', 'to_days')
 
 # SQL to create all tables
-create_tables_sql = """
+create_tables_sql = f"""
+-- row_hash is an MD5 of the source columns, the ETL skips rows it matches
 CREATE TABLE teacher_dim (
   teacher_id INT NOT NULL,
   first_name VARCHAR(50) NOT NULL,
   last_name VARCHAR(50) NOT NULL,
   employment_type VARCHAR(15) NOT NULL,
+  row_hash CHAR(32) NOT NULL DEFAULT '',
   PRIMARY KEY (teacher_id)
 );
 
@@ -22,12 +29,14 @@ CREATE TABLE student_dim (
   last_name VARCHAR(50) NOT NULL,
   date_of_birth DATE NOT NULL,
   grade_level VARCHAR(4) NOT NULL,
+  row_hash CHAR(32) NOT NULL DEFAULT '',
   PRIMARY KEY (student_id)
 );
 
 CREATE TABLE course_dim (
   course_id INT NOT NULL,
   name VARCHAR(10) NOT NULL,
+  row_hash CHAR(32) NOT NULL DEFAULT '',
   PRIMARY KEY (course_id)
 );
 
@@ -39,72 +48,140 @@ CREATE TABLE school_dim (
   city VARCHAR(50) NOT NULL,
   state VARCHAR(2) NOT NULL,
   zip VARCHAR(10) NOT NULL,
+  row_hash CHAR(32) NOT NULL DEFAULT '',
   PRIMARY KEY (school_id)
 );
 
+-- One row per graded assignment, like grade_details it is loaded from, with
+-- the same types as grade_details. grade_level is the student's grade when
+-- the grade was recorded. KEY (school_id, grade_level, grade_type, score)
+-- covers the per-school performance_summary refresh
 CREATE TABLE student_performance_fact (
-  grade_type VARCHAR(20) NOT NULL,
-  score INT NOT NULL,
-  weight FLOAT NOT NULL,
-  weighted_score FLOAT NOT NULL,
+  grade_type ENUM('homework1', 'homework2', 'quiz', 'mid exam', 'final exam') NOT NULL,
+  score TINYINT UNSIGNED NOT NULL,
+  weight DECIMAL(3, 2) NOT NULL,
+  weighted_score DECIMAL(5, 2) NOT NULL,
   student_id INT NOT NULL,
   course_id INT NOT NULL,
   teacher_id INT NOT NULL,
   school_id INT NOT NULL,
+  grade_level VARCHAR(4) NOT NULL,
+  PRIMARY KEY (student_id, course_id, grade_type),
+  KEY (school_id, grade_level, grade_type, score),
   FOREIGN KEY (student_id) REFERENCES student_dim(student_id),
   FOREIGN KEY (course_id) REFERENCES course_dim(course_id),
   FOREIGN KEY (teacher_id) REFERENCES teacher_dim(teacher_id),
   FOREIGN KEY (school_id) REFERENCES school_dim(school_id)
 );
 
+-- Every calendar day, generated from school_calendar.py rather than from the
+-- days that happen to have attendance
 CREATE TABLE date_dim (
   date_id INT NOT NULL,
+  date DATE NOT NULL,
   day INT NOT NULL,
   month INT NOT NULL,
   semester INT NOT NULL,
   year INT NOT NULL,
   weekday VARCHAR(15) NOT NULL,
-  PRIMARY KEY (date_id)
+  school_year SMALLINT NOT NULL,
+  week_of_term TINYINT NOT NULL,
+  is_weekend BOOLEAN NOT NULL,
+  is_holiday BOOLEAN NOT NULL,
+  holiday_name VARCHAR(50),
+  is_school_day BOOLEAN NOT NULL,
+  PRIMARY KEY (date_id),
+  UNIQUE KEY (date),
+  KEY (school_year, semester, is_school_day)
 );
 
-CREATE TABLE student_attendance_fact (
-  status VARCHAR(25) NOT NULL,
+-- The distinct attendance notes. Few attendance rows have a note and most
+-- notes repeat, so the fact carries a 3-byte note_id (NULL for no note)
+-- instead of the text
+CREATE TABLE attendance_note_dim (
+  note_id MEDIUMINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  note_hash CHAR(32) NOT NULL,
   notes TEXT NOT NULL,
+  PRIMARY KEY (note_id),
+  UNIQUE KEY (note_hash)
+);
+
+-- One row per student and school day, like the attendance table it is loaded
+-- from. teacher_id is the teacher who recorded it and grade_level the
+-- student's grade on the day. KEY (school_id, date_id) serves the per-school
+-- and per-day lookups, KEY (date_id, school_id, grade_level, status) covers
+-- the attendance_daily_summary refresh.
+-- Partitioned by month on date_id (= TO_DAYS(date)). InnoDB does not allow
+-- foreign keys on partitioned tables, the ETL's orphan check covers them.
+CREATE TABLE student_attendance_fact (
+  status ENUM('present', 'absent', 'late', 'excused') NOT NULL,
+  note_id MEDIUMINT UNSIGNED,
   student_id INT NOT NULL,
-  course_id INT NOT NULL,
   teacher_id INT NOT NULL,
   school_id INT NOT NULL,
   date_id INT NOT NULL,
-  FOREIGN KEY (student_id) REFERENCES student_dim(student_id),
-  FOREIGN KEY (course_id) REFERENCES course_dim(course_id),
-  FOREIGN KEY (teacher_id) REFERENCES teacher_dim(teacher_id),
-  FOREIGN KEY (school_id) REFERENCES school_dim(school_id),
-  FOREIGN KEY (date_id) REFERENCES date_dim(date_id)
-);
+  grade_level VARCHAR(4) NOT NULL,
+  PRIMARY KEY (student_id, date_id),
+  KEY (school_id, date_id),
+  KEY (date_id, school_id, grade_level, status)
+)
+{attendance_partitions};
 
-CREATE TABLE IF NOT EXISTS etl_control (
-  process_name VARCHAR(50) PRIMARY KEY,
-  last_run DATETIME NOT NULL,
-  rows_processed INT,
-  status VARCHAR(20),
-  error_message TEXT,
-  duration_seconds INT,
-  created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-);
+-- Dashboard aggregates, maintained by the ETL (see summaries.py)
+{ATTENDANCE_SUMMARY_SQL};
+
+{PERFORMANCE_SUMMARY_SQL};
+
+{DISTRICT_KPI_CACHE_SQL};
+
+-- ETL state and run history (see etl_telemetry.py)
+{ETL_CONTROL_SQL};
+
+{ETL_RUN_SQL};
+
+{ETL_RUN_STEP_SQL};
+
+{SCHEMA_MIGRATIONS_SQL};
 """
 
-# Split by semicolon and execute each statement
-for stmt in create_tables_sql.strip().split(';'):
-    stmt = stmt.strip()
-    if stmt:
+
+def schema_statements(sql: str = create_tables_sql) -> List[str]:
+    """
+    The statements of sql. The -- comments are removed before splitting on
+    semicolons, so a semicolon in a comment cannot cut a statement in two.
+    """
+    sql = re.sub(r'--[^\n]*', '', sql)
+    return [stmt.strip() for stmt in sql.split(';') if stmt.strip()]
+
+
+def create_star_schema(cursor):
+    """Create every warehouse table on the given cursor's database"""
+    for stmt in schema_statements():
         try:
-            cursor.execute(stmt + ';')
+            cursor.execute(stmt)
             print(f"Executed: {stmt[:40]}...")
         except mysql.connector.Error as err:
+            # a missing table must not be recorded as migrated below
             print(f"Error: {err}")
             print(f"Failed SQL: {stmt}")
+            raise
+
+    # the tables above are already the latest schema
+    for migration in MIGRATIONS:
+        cursor.execute(
+            "INSERT IGNORE INTO schema_migrations (version, description) VALUES (%s, %s)",
+            (migration.version, migration.description)
+        )
+
+
+if __name__ == "__main__":
+    #connect to warehouse
+    conn_wh = db_connection(config_file = '/Users/louisas/Documents/Data 201 - Database/Homework/Assignment11/sheql_wh.ini')
+    cursor = conn_wh.cursor()
+
+    create_star_schema(cursor)
 
-# Commit changes and clean up
-conn_wh.commit()
-cursor.close()
-conn_wh.close()
+    # Commit changes and clean up
+    conn_wh.commit()
+    cursor.close()
+    conn_wh.close()
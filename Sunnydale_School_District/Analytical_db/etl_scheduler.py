@@ -0,0 +1,108 @@
+"""
+Parallel execution of the ETL's loads.
+
+Loads are grouped into stages. Everything in a stage is independent and runs
+concurrently; a stage only starts once the previous one has finished, so
+facts are loaded after the dimensions they reference.
+
+Every worker reads the operational database through its own connection and
+all of those connections read one consistent snapshot (see SourceSnapshot),
+so a fact loaded by one worker never sees rows that another worker's
+dimension load missed.
+"""
+import queue
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+# (stats name, load) - the load returns the number of rows it wrote; tasks
+# named None are run but not counted
+Task = Tuple[Optional[str], Callable[[], Optional[int]]]
+
+
+class SourceSnapshot:
+    """
+    workers connections to the source database that all read the same
+    consistent snapshot. InnoDB cannot hand a snapshot from one session to
+    another, so the snapshots are started while FLUSH TABLES WITH READ LOCK
+    holds writers off for a moment, the way mysqldump --single-transaction
+    does. That needs the RELOAD privilege; without it the snapshots are
+    started back-to-back and can differ by whatever committed in between.
+    """
+    def __init__(self, engine, workers: int):
+        self.engine = engine
+        self.workers = workers
+        self.connections = []
+
+    def __enter__(self):
+        self.connections = [self.engine.connect() for _ in range(self.workers)]
+
+        lock = None
+        if self.workers > 1:
+            lock = self.engine.connect()
+            try:
+                lock.execute(text("FLUSH TABLES WITH READ LOCK"))
+            except Exception as e:
+                print(f"Could not lock the source for a shared snapshot, worker snapshots may differ: {e}")
+                lock.close()
+                lock = None
+
+        try:
+            for conn in self.connections:
+                conn.execute(text("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+                conn.execute(text("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY"))
+        finally:
+            if lock is not None:
+                lock.execute(text("UNLOCK TABLES"))
+                lock.close()
+        return self
+
+    def __exit__(self, *exc):
+        for conn in self.connections:
+            conn.rollback()
+            conn.close()
+        self.connections = []
+        return False
+
+
+def run_stages(stages: List[Tuple[str, List[Task]]], snapshot: SourceSnapshot, local: threading.local,
+               on_task_start: Optional[Callable[[str], None]] = None) -> Dict[str, int]:
+    """
+    Run each (stage name, tasks) stage on snapshot.workers threads. Each thread
+    gets one snapshot connection as local.conn for its lifetime, and
+    on_task_start(stage name) is called on the thread before every task. The
+    first failure cancels the tasks not yet started and is re-raised once the
+    running ones have finished. Returns rows written per stats name.
+    """
+    free = queue.Queue()
+    for conn in snapshot.connections:
+        free.put(conn)
+
+    def bind_connection():
+        local.conn = free.get_nowait()
+
+    def run_task(stage_name, load):
+        if on_task_start is not None:
+            on_task_start(stage_name)
+        return load()
+
+    stats = {}
+    with ThreadPoolExecutor(max_workers=snapshot.workers, initializer=bind_connection) as pool:
+        for stage_name, tasks in stages:
+            futures = {pool.submit(run_task, stage_name, load): name for name, load in tasks}
+            done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+
+            for future in done:
+                if future.exception() is not None:
+                    for pending in not_done:
+                        pending.cancel()
+                    raise future.exception()
+
+            for future, name in futures.items():
+                rows = future.result()
+                if name is not None:
+                    stats[name] = stats.get(name, 0) + (rows or 0)
+
+    return stats
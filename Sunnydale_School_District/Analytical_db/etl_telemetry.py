@@ -0,0 +1,162 @@
+"""
+Run history and per-table timings for the ETL.
+
+    etl_control   one row per process: the state of its latest run and the
+                  watermark incremental runs continue from
+    etl_run       one row per run
+    etl_run_step  one row per stage and table of a run: extract, transform
+                  and load seconds, rows, bytes and peak memory
+
+RunTelemetry collects the step figures while the loads run (from any
+thread) and saves them with the run. compare_runs() prints two runs side by
+side, e.g.
+
+    python ETL.py --history
+    python ETL.py --compare-runs 41 42
+"""
+import threading
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+ETL_CONTROL_SQL = """
+CREATE TABLE IF NOT EXISTS etl_control (
+  process_name VARCHAR(50) PRIMARY KEY,
+  last_run DATETIME NOT NULL,
+  watermark DATETIME,
+  rows_processed INT,
+  status VARCHAR(20),
+  error_message TEXT,
+  duration_seconds FLOAT,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+ETL_RUN_SQL = """
+CREATE TABLE IF NOT EXISTS etl_run (
+  run_id INT AUTO_INCREMENT PRIMARY KEY,
+  process_name VARCHAR(50) NOT NULL,
+  mode VARCHAR(20) NOT NULL,
+  status VARCHAR(20) NOT NULL,
+  started_at DATETIME NOT NULL,
+  duration_seconds FLOAT NOT NULL,
+  rows_processed INT NOT NULL,
+  error_message TEXT,
+  KEY (process_name, started_at)
+)
+"""
+
+ETL_RUN_STEP_SQL = """
+CREATE TABLE IF NOT EXISTS etl_run_step (
+  run_id INT NOT NULL,
+  stage VARCHAR(30) NOT NULL,
+  table_name VARCHAR(64) NOT NULL,
+  extract_seconds FLOAT NOT NULL,
+  transform_seconds FLOAT NOT NULL,
+  load_seconds FLOAT NOT NULL,
+  rows_processed BIGINT NOT NULL,
+  bytes_processed BIGINT NOT NULL,
+  peak_memory_bytes BIGINT,
+  PRIMARY KEY (run_id, stage, table_name),
+  FOREIGN KEY (run_id) REFERENCES etl_run(run_id)
+)
+"""
+
+STEP_FIELDS = ('extract_seconds', 'transform_seconds', 'load_seconds', 'rows_processed', 'bytes_processed')
+
+
+class RunTelemetry:
+    def __init__(self):
+        self.steps: Dict[Tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+        self._stage = threading.local()
+
+    def set_stage(self, stage: str):
+        """Stage the calling thread's loads belong to"""
+        self._stage.name = stage
+
+    def record(self, table: str, peak_memory: Optional[int] = None, **figures):
+        """Add figures (see STEP_FIELDS) to the current stage's step for table"""
+        key = (getattr(self._stage, 'name', 'main'), table)
+        with self._lock:
+            step = self.steps.setdefault(key, dict.fromkeys(STEP_FIELDS, 0))
+            for field, value in figures.items():
+                step[field] += value
+            if peak_memory is not None:
+                step['peak_memory_bytes'] = max(step.get('peak_memory_bytes') or 0, peak_memory)
+
+    def save(self, engine, process_name: str, mode: str, status: str, started_at, duration: float,
+             rows: int, error: Optional[str] = None) -> int:
+        """Write the run and its steps, returning the run_id"""
+        with engine.begin() as conn:
+            conn.execute(text(ETL_RUN_SQL))
+            conn.execute(text(ETL_RUN_STEP_SQL))
+            run_id = conn.execute(text("""
+                INSERT INTO etl_run
+                    (process_name, mode, status, started_at, duration_seconds, rows_processed, error_message)
+                VALUES (:process, :mode, :status, :started_at, :duration, :rows, :error)
+            """), {
+                'process': process_name, 'mode': mode, 'status': status, 'started_at': started_at,
+                'duration': duration, 'rows': rows, 'error': error,
+            }).lastrowid
+
+            for (stage, table), step in self.steps.items():
+                conn.execute(text("""
+                    INSERT INTO etl_run_step
+                        (run_id, stage, table_name, extract_seconds, transform_seconds, load_seconds,
+                         rows_processed, bytes_processed, peak_memory_bytes)
+                    VALUES (:run_id, :stage, :table_name, :extract_seconds, :transform_seconds,
+                            :load_seconds, :rows_processed, :bytes_processed, :peak_memory_bytes)
+                """), dict(step, run_id=run_id, stage=stage, table_name=table,
+                           peak_memory_bytes=step.get('peak_memory_bytes')))
+        return run_id
+
+    def report(self):
+        print(f"  {'stage':<12} {'table':<30} {'extract s':>10} {'transform s':>12} {'load s':>8} {'rows':>10} {'MiB':>8}")
+        for (stage, table), step in self.steps.items():
+            print(f"  {stage:<12} {table:<30} {step['extract_seconds']:>10.2f} {step['transform_seconds']:>12.2f} "
+                  f"{step['load_seconds']:>8.2f} {step['rows_processed']:>10} {step['bytes_processed'] / 1048576:>8.1f}")
+
+
+def print_history(engine, process_name: str, limit: int = 10):
+    """The latest runs of a process"""
+    with engine.connect() as conn:
+        runs = conn.execute(text("""
+            SELECT run_id, started_at, mode, status, duration_seconds, rows_processed
+            FROM etl_run
+            WHERE process_name = :process
+            ORDER BY run_id DESC
+            LIMIT :limit
+        """), {'process': process_name, 'limit': limit}).fetchall()
+    print(f"  {'run':>5} {'started':<20} {'mode':<14} {'status':<8} {'seconds':>9} {'rows':>10}")
+    for run_id, started_at, mode, status, duration, rows in runs:
+        print(f"  {run_id:>5} {started_at:%Y-%m-%d %H:%M:%S} {mode:<14} {status:<8} {duration:>9.2f} {rows:>10}")
+
+
+def compare_runs(engine, run_a: int, run_b: int):
+    """Print each step's total time in both runs and the change"""
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT run_id, stage, table_name,
+                   extract_seconds + transform_seconds + load_seconds AS seconds,
+                   rows_processed
+            FROM etl_run_step
+            WHERE run_id IN (:run_a, :run_b)
+            ORDER BY stage, table_name
+        """), {'run_a': run_a, 'run_b': run_b}).fetchall()
+
+    steps = {}
+    for run_id, stage, table, seconds, step_rows in rows:
+        steps.setdefault((stage, table), {})[run_id] = (seconds, step_rows)
+
+    print(f"  {'stage':<12} {'table':<30} {f'run {run_a} s':>10} {f'run {run_b} s':>10} {'change':>8} {'rows':>14}")
+    for (stage, table), runs in steps.items():
+        a_seconds, a_rows = runs.get(run_a, (None, None))
+        b_seconds, b_rows = runs.get(run_b, (None, None))
+        change = f"{(b_seconds - a_seconds) / a_seconds:+.0%}" if a_seconds and b_seconds is not None else ''
+        print(f"  {stage:<12} {table:<30} {_cell(a_seconds):>10} {_cell(b_seconds):>10} {change:>8} "
+              f"{_cell(a_rows, '{}')}->{_cell(b_rows, '{}')}".rstrip())
+
+
+def _cell(value, fmt: str = '{:.2f}') -> str:
+    return '-' if value is None else fmt.format(value)
@@ -0,0 +1,339 @@
+"""
+Versioned schema changes for the warehouse.
+
+create_StarSchema.py always builds the latest schema and records every
+migration below as applied. An existing warehouse is brought up to date by
+migrate(), which the ETL calls before every load. Each migration runs once
+and is recorded in schema_migrations.
+
+To change the schema, update create_tables_sql in create_StarSchema.py and
+append a migration here that turns the previous schema into the new one.
+"""
+from typing import Callable, List, NamedTuple, Union
+
+from sqlalchemy import inspect, text
+
+from partitions import partition_clause
+from school_calendar import HOLIDAYS
+import summaries
+from etl_telemetry import ETL_RUN_SQL, ETL_RUN_STEP_SQL
+
+SCHEMA_MIGRATIONS_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version INT NOT NULL,
+  description VARCHAR(255) NOT NULL,
+  applied_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (version)
+)
+"""
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    # SQL statements, or a callable taking the connection for anything more involved
+    steps: List[Union[str, Callable]]
+
+
+def _attendance_fact_student_day():
+    # The old fact held one copy of every attendance row per class the student
+    # takes. Every copy carries the same status and notes. teacher_id was the
+    # class teacher and is now the teacher who recorded the attendance, so
+    # run the ETL with --full-refresh after migrating to fill it in correctly.
+    return [
+        f"""
+        CREATE TABLE student_attendance_fact_new (
+          status VARCHAR(25) NOT NULL,
+          notes TEXT NOT NULL,
+          student_id INT NOT NULL,
+          teacher_id INT NOT NULL,
+          school_id INT NOT NULL,
+          date_id INT NOT NULL,
+          PRIMARY KEY (student_id, date_id)
+        )
+        {partition_clause('date_id', 'to_days')}
+        """,
+        """
+        INSERT INTO student_attendance_fact_new
+            (status, notes, student_id, teacher_id, school_id, date_id)
+        SELECT MIN(status), MIN(notes), student_id, MIN(teacher_id), MIN(school_id), date_id
+        FROM student_attendance_fact
+        GROUP BY student_id, date_id
+        """,
+        """
+        RENAME TABLE student_attendance_fact TO student_attendance_fact_old,
+                     student_attendance_fact_new TO student_attendance_fact
+        """,
+        "DROP TABLE student_attendance_fact_old",
+    ]
+
+
+def _performance_fact_per_assignment():
+    # The old fact held one copy of every grade per weekday the class meets,
+    # each with the same score. The copies are collapsed here; run the ETL with
+    # --full-refresh afterwards to resolve teacher_id from the homeroom schedule.
+    return [
+        """
+        CREATE TABLE student_performance_fact_new (
+          grade_type VARCHAR(20) NOT NULL,
+          score INT NOT NULL,
+          weight FLOAT NOT NULL,
+          weighted_score FLOAT NOT NULL,
+          student_id INT NOT NULL,
+          course_id INT NOT NULL,
+          teacher_id INT NOT NULL,
+          school_id INT NOT NULL,
+          PRIMARY KEY (student_id, course_id, grade_type),
+          FOREIGN KEY (student_id) REFERENCES student_dim(student_id),
+          FOREIGN KEY (course_id) REFERENCES course_dim(course_id),
+          FOREIGN KEY (teacher_id) REFERENCES teacher_dim(teacher_id),
+          FOREIGN KEY (school_id) REFERENCES school_dim(school_id)
+        )
+        """,
+        """
+        INSERT INTO student_performance_fact_new
+            (grade_type, score, weight, weighted_score, student_id, course_id, teacher_id, school_id)
+        SELECT grade_type, MIN(score), MIN(weight), MIN(weighted_score),
+               student_id, course_id, MIN(teacher_id), MIN(school_id)
+        FROM student_performance_fact
+        GROUP BY student_id, course_id, grade_type
+        """,
+        """
+        RENAME TABLE student_performance_fact TO student_performance_fact_old,
+                     student_performance_fact_new TO student_performance_fact
+        """,
+        "DROP TABLE student_performance_fact_old",
+    ]
+
+
+def _calendar_date_dim():
+    # nothing references date_dim, so it is rebuilt empty and the next ETL run
+    # fills it from school_calendar.py
+    return [
+        "DROP TABLE date_dim",
+        """
+        CREATE TABLE date_dim (
+          date_id INT NOT NULL,
+          date DATE NOT NULL,
+          day INT NOT NULL,
+          month INT NOT NULL,
+          semester INT NOT NULL,
+          year INT NOT NULL,
+          weekday VARCHAR(15) NOT NULL,
+          school_year SMALLINT NOT NULL,
+          week_of_term TINYINT NOT NULL,
+          is_weekend BOOLEAN NOT NULL,
+          is_holiday BOOLEAN NOT NULL,
+          holiday_name VARCHAR(50),
+          is_school_day BOOLEAN NOT NULL,
+          PRIMARY KEY (date_id),
+          UNIQUE KEY (date),
+          KEY (school_year, semester, is_school_day)
+        )
+        """,
+    ]
+
+
+def _dashboard_summaries():
+    # filled by migration 8, the refresh reads the grade_level it adds to the facts
+    return [
+        summaries.ATTENDANCE_SUMMARY_SQL,
+        summaries.PERFORMANCE_SUMMARY_SQL,
+    ]
+
+
+def _key_etl_control_by_process(conn):
+    # ETL.py used to create etl_control keyed by (process_name, last_run), which
+    # added a row per run. Keep the latest row of each process, carrying over
+    # the newest watermark, now that run history lives in etl_run.
+    if not inspect(conn).has_table('etl_control'):
+        return
+    conn.execute(text("""
+        UPDATE etl_control c
+        JOIN (
+            SELECT process_name, MAX(last_run) AS last_run, MAX(watermark) AS watermark
+            FROM etl_control
+            GROUP BY process_name
+        ) latest ON latest.process_name = c.process_name AND latest.last_run = c.last_run
+        SET c.watermark = latest.watermark
+    """))
+    conn.execute(text("""
+        DELETE c FROM etl_control c
+        JOIN (
+            SELECT process_name, MAX(last_run) AS last_run
+            FROM etl_control
+            GROUP BY process_name
+        ) latest ON latest.process_name = c.process_name AND c.last_run < latest.last_run
+    """))
+    conn.execute(text("""
+        ALTER TABLE etl_control
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (process_name),
+            MODIFY duration_seconds FLOAT
+    """))
+
+
+def _dimension_row_hashes():
+    # existing rows get an empty hash, so the next load rewrites each of them once
+    return [
+        f"ALTER TABLE {table} ADD COLUMN row_hash CHAR(32) NOT NULL DEFAULT ''"
+        for table in ('teacher_dim', 'student_dim', 'course_dim', 'school_dim')
+    ]
+
+
+def _compact_facts():
+    # types matching the source's grade_details and attendance, indexes for the
+    # per-school summary refreshes, and attendance notes moved to a junk dimension
+    return [
+        """
+        CREATE TABLE attendance_note_dim (
+          note_id MEDIUMINT UNSIGNED NOT NULL AUTO_INCREMENT,
+          note_hash CHAR(32) NOT NULL,
+          notes TEXT NOT NULL,
+          PRIMARY KEY (note_id),
+          UNIQUE KEY (note_hash)
+        )
+        """,
+        # the old fact stored a missing note as ''
+        """
+        INSERT INTO attendance_note_dim (note_hash, notes)
+        SELECT DISTINCT MD5(notes), notes
+        FROM student_attendance_fact
+        WHERE notes <> ''
+        """,
+        """
+        ALTER TABLE student_attendance_fact
+            ADD COLUMN note_id MEDIUMINT UNSIGNED AFTER status,
+            MODIFY status ENUM('present', 'absent', 'late', 'excused') NOT NULL,
+            ADD KEY (school_id, date_id)
+        """,
+        """
+        UPDATE student_attendance_fact f
+        JOIN attendance_note_dim n ON n.note_hash = MD5(f.notes)
+        SET f.note_id = n.note_id
+        WHERE f.notes <> ''
+        """,
+        "ALTER TABLE student_attendance_fact DROP COLUMN notes",
+        """
+        ALTER TABLE student_performance_fact
+            MODIFY grade_type ENUM('homework1', 'homework2', 'quiz', 'mid exam', 'final exam') NOT NULL,
+            MODIFY score TINYINT UNSIGNED NOT NULL,
+            MODIFY weight DECIMAL(3, 2) NOT NULL,
+            MODIFY weighted_score DECIMAL(5, 2) NOT NULL,
+            ADD KEY (school_id, grade_type)
+        """,
+    ]
+
+
+def _index_name(conn, table: str, columns: str):
+    """Name of table's index on exactly columns ('a,b'), None if there is none"""
+    return conn.execute(text("""
+        SELECT index_name FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = :table
+        GROUP BY index_name
+        HAVING GROUP_CONCAT(column_name ORDER BY seq_in_index) = :columns
+    """), {'table': table, 'columns': columns}).scalar()
+
+
+def _performance_summary_key(conn):
+    # extend migration 7's (school_id, grade_type) key, which MySQL named after
+    # whichever indexes the table already had; the school_id foreign key needs
+    # one of them at all times, so drop and add in one statement
+    old = _index_name(conn, 'student_performance_fact', 'school_id,grade_type')
+    drop = f"DROP KEY `{old}`, " if old else ''
+    conn.execute(text(f"""
+        ALTER TABLE student_performance_fact
+            {drop}ADD KEY (school_id, grade_level, grade_type, score)
+    """))
+
+
+def _fact_grade_levels():
+    # existing facts get the students' current grade; run the ETL with
+    # --full-refresh to restamp them with the grade at the time
+    return [
+        """
+        ALTER TABLE student_attendance_fact
+            ADD COLUMN grade_level VARCHAR(4) NOT NULL DEFAULT '',
+            ADD KEY (date_id, school_id, grade_level, status)
+        """,
+        """
+        UPDATE student_attendance_fact f
+        JOIN student_dim sd ON sd.student_id = f.student_id
+        SET f.grade_level = sd.grade_level
+        """,
+        """
+        ALTER TABLE student_performance_fact
+            ADD COLUMN grade_level VARCHAR(4) NOT NULL DEFAULT ''
+        """,
+        _performance_summary_key,
+        """
+        UPDATE student_performance_fact f
+        JOIN student_dim sd ON sd.student_id = f.student_id
+        SET f.grade_level = sd.grade_level
+        """,
+        "ALTER TABLE student_attendance_fact ALTER COLUMN grade_level DROP DEFAULT",
+        "ALTER TABLE student_performance_fact ALTER COLUMN grade_level DROP DEFAULT",
+        summaries.refresh_attendance_summary,
+        summaries.refresh_performance_summary,
+    ]
+
+
+def _calendar_holidays(conn):
+    # date_dim is only ever extended, so days that became holidays after their
+    # rows were loaded (the middle of spring break 2025) are updated here
+    for day, name in sorted(HOLIDAYS.items()):
+        conn.execute(text("""
+            UPDATE date_dim SET is_holiday = TRUE, holiday_name = :name, is_school_day = FALSE
+            WHERE date = :day
+        """), {'day': day, 'name': name})
+
+
+MIGRATIONS = [
+    Migration(1, 'student_attendance_fact at student-day grain', _attendance_fact_student_day()),
+    Migration(2, 'student_performance_fact keyed by assignment', _performance_fact_per_assignment()),
+    Migration(3, 'date_dim generated from the school calendar', _calendar_date_dim()),
+    Migration(4, 'attendance and performance summaries for the dashboards', _dashboard_summaries()),
+    Migration(5, 'etl_control keyed by process, run history tables',
+              [_key_etl_control_by_process, ETL_RUN_SQL, ETL_RUN_STEP_SQL]),
+    Migration(6, 'row hashes on the dimensions', _dimension_row_hashes()),
+    Migration(7, 'compact fact types, summary indexes and attendance_note_dim', _compact_facts()),
+    Migration(8, 'grade_level on the facts', _fact_grade_levels()),
+    # filled by the next successful run, get_district_kpis computes them until then
+    Migration(9, 'district_kpi_cache', [summaries.DISTRICT_KPI_CACHE_SQL]),
+    Migration(10, 'every day of spring break a holiday in date_dim', [_calendar_holidays]),
+]
+
+
+def applied_versions(conn) -> List[int]:
+    """Versions already recorded in schema_migrations"""
+    conn.execute(text(SCHEMA_MIGRATIONS_SQL))
+    return [row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))]
+
+
+def migrate(engine) -> List[int]:
+    """
+    Apply every migration that has not run yet, oldest first. MySQL commits
+    DDL implicitly, so a migration that fails halfway has to be finished by
+    hand. Returns the versions applied.
+    """
+    applied = []
+    with engine.begin() as conn:
+        done = set(applied_versions(conn))
+
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version in done:
+            continue
+        print(f"Applying migration {migration.version}: {migration.description}")
+        with engine.begin() as conn:
+            for step in migration.steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(text(step))
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+                {'version': migration.version, 'description': migration.description}
+            )
+        applied.append(migration.version)
+
+    return applied
@@ -0,0 +1,141 @@
+"""
+Date-range partitioning for the tables keyed by attendance date.
+
+    attendance               (operational)  PARTITION BY RANGE COLUMNS(date)
+    student_attendance_fact  (warehouse)    PARTITION BY RANGE (date_id)
+
+date_id in the warehouse is TO_DAYS(date), so both tables are split on the
+same calendar boundaries: one partition per month (or per term) plus a
+trailing p_future partition. ensure_future_partitions() splits p_future
+ahead of time so new days always land in a named, prunable partition.
+"""
+import datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from school_calendar import TERM_START_MONTHS, from_days, to_days
+
+# first month covered by the generated data set
+DEFAULT_START = datetime.date(2025, 3, 1)
+
+FUTURE_PARTITION = 'p_future'
+
+
+def next_boundary(day: datetime.date, granularity: str = 'month') -> datetime.date:
+    """First day of the month (or term) after the one containing day"""
+    if granularity == 'month':
+        if day.month == 12:
+            return datetime.date(day.year + 1, 1, 1)
+        return datetime.date(day.year, day.month + 1, 1)
+    if granularity == 'term':
+        for month in TERM_START_MONTHS:
+            if day.month < month:
+                return datetime.date(day.year, month, 1)
+        return datetime.date(day.year + 1, TERM_START_MONTHS[0], 1)
+    raise ValueError(f"Unknown partition granularity '{granularity}'")
+
+
+def period_start(day: datetime.date, granularity: str = 'month') -> datetime.date:
+    """First day of the month (or term) containing day"""
+    if granularity == 'month':
+        return day.replace(day=1)
+    month = max(m for m in TERM_START_MONTHS if m <= day.month)
+    return datetime.date(day.year, month, 1)
+
+
+def period_starts(start: datetime.date, end: datetime.date, granularity: str = 'month') -> List[datetime.date]:
+    """Start of every period from the one containing start through the one containing end"""
+    starts = []
+    current = period_start(start, granularity)
+    while current <= end:
+        starts.append(current)
+        current = next_boundary(current, granularity)
+    return starts
+
+
+def boundary_literal(day: datetime.date, kind: str) -> str:
+    """VALUES LESS THAN literal for a boundary: a quoted date or a TO_DAYS number"""
+    if kind == 'date':
+        return f"'{day.isoformat()}'"
+    if kind == 'to_days':
+        return str(to_days(day))
+    raise ValueError(f"Unknown partition key kind '{kind}'")
+
+
+def partition_definitions(starts: List[datetime.date], kind: str, granularity: str = 'month',
+                          include_future: bool = True) -> List[str]:
+    """PARTITION ... VALUES LESS THAN ... lines for each period start"""
+    definitions = [
+        f"PARTITION p{start:%Y%m} VALUES LESS THAN ({boundary_literal(next_boundary(start, granularity), kind)})"
+        for start in starts
+    ]
+    if include_future:
+        definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    return definitions
+
+
+def partition_clause(column: str, kind: str, start: datetime.date = DEFAULT_START,
+                     end: Optional[datetime.date] = None, granularity: str = 'month') -> str:
+    """
+    Full PARTITION BY clause for a CREATE TABLE statement. kind is 'date'
+    for a DATE column (RANGE COLUMNS) or 'to_days' for an INT day number.
+    """
+    end = end or datetime.date.today()
+    definitions = partition_definitions(period_starts(start, end, granularity), kind, granularity)
+    method = f"RANGE COLUMNS({column})" if kind == 'date' else f"RANGE ({column})"
+    return f"PARTITION BY {method} (\n  " + ",\n  ".join(definitions) + "\n)"
+
+
+def _parse_boundary(description: str, kind: str) -> datetime.date:
+    value = description.strip().strip("'")
+    if kind == 'date':
+        return datetime.date.fromisoformat(value[:10])
+    return from_days(int(value))
+
+
+def ensure_future_partitions(engine, table: str, kind: str, months_ahead: int = 3,
+                             granularity: str = 'month') -> List[str]:
+    """
+    Split p_future so that named partitions exist up to months_ahead months
+    from today. Runs as a cheap metadata change as long as p_future is still
+    empty, which is the point of doing it ahead of time. Returns the names of
+    the partitions created.
+    """
+    with engine.begin() as conn:
+        rows = conn.execute(text("""
+            SELECT partition_name, partition_description
+            FROM information_schema.partitions
+            WHERE table_schema = DATABASE()
+              AND table_name = :table
+              AND partition_name IS NOT NULL
+        """).bindparams(table=table)).fetchall()
+
+        if not rows:
+            print(f"{table} is not partitioned, skipping partition maintenance")
+            return []
+
+        boundaries = [_parse_boundary(desc, kind) for name, desc in rows
+                      if name != FUTURE_PARTITION and desc and desc.upper() != 'MAXVALUE']
+        if not boundaries:
+            return []
+
+        today = datetime.date.today()
+        horizon = today
+        for _ in range(months_ahead):
+            horizon = next_boundary(horizon, 'month')
+
+        # the highest boundary is the start of the first period not yet covered
+        starts = period_starts(max(boundaries), horizon, granularity)
+        if not starts:
+            return []
+
+        definitions = partition_definitions(starts, kind, granularity)
+        conn.execute(text(
+            f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO (\n  "
+            + ",\n  ".join(definitions) + "\n)"
+        ))
+
+    created = [f"p{start:%Y%m}" for start in starts]
+    print(f"Added partitions to {table}: {', '.join(created)}")
+    return created
@@ -0,0 +1,138 @@
+"""
+The district's school calendar: which days are school days and which term
+and school-year week they fall in.
+
+Dataset/data.py generates attendance only for is_school_day() days and the
+ETL builds date_dim from calendar_rows(), so both use the same holiday
+list. Add each new school year's holidays to HOLIDAYS before it starts.
+
+It also holds the calendar helpers the partitioning, the ETL and the UI
+share (to_days(), the grade levels and their order), and needs nothing
+outside the standard library so the dashboards can import it.
+"""
+import datetime
+from typing import Dict, Iterator, List, Tuple
+
+
+def days_off(start: datetime.date, end: datetime.date, name: str) -> Dict[datetime.date, str]:
+    """HOLIDAYS entries naming every day from start through end, for breaks"""
+    return {start + datetime.timedelta(days=n): name for n in range((end - start).days + 1)}
+
+
+HOLIDAYS: Dict[datetime.date, str] = {
+    datetime.date(2025, 1, 20): 'MLK Day',
+    datetime.date(2025, 2, 17): 'Presidents Day',
+    **days_off(datetime.date(2025, 3, 24), datetime.date(2025, 3, 28), 'Spring break'),
+    datetime.date(2025, 4, 18): 'Good Friday',
+}
+
+# semester boundaries used by the ETL: months 8-12 are semester 1, 1-7 semester 2
+TERM_START_MONTHS = (1, 8)
+
+# school years run from the first term start month (August) to the next July
+SCHOOL_YEAR_START_MONTH = max(TERM_START_MONTHS)
+
+# student.grade_level values, youngest first
+GRADE_LEVELS = ['K'] + [str(grade) for grade in range(1, 13)]
+
+
+def grade_order(grade_level: str) -> Tuple[int, object]:
+    """Sort key putting grade levels K to 12 first and any other values after them"""
+    return (0, GRADE_LEVELS.index(grade_level)) if grade_level in GRADE_LEVELS else (1, grade_level)
+
+
+def to_days(day: datetime.date) -> int:
+    """Python equivalent of MySQL TO_DAYS(), the warehouse's date_id"""
+    return day.toordinal() + 365
+
+
+def from_days(days: int) -> datetime.date:
+    """Python equivalent of MySQL FROM_DAYS()"""
+    return datetime.date.fromordinal(days - 365)
+
+
+def is_school_day(day: datetime.date) -> bool:
+    """Weekdays that are not holidays"""
+    return day.weekday() < 5 and day not in HOLIDAYS
+
+
+def school_days(start: datetime.date, end: datetime.date) -> List[datetime.date]:
+    """Every school day from start through end"""
+    return [day for day in date_range(start, end) if is_school_day(day)]
+
+
+def date_range(start: datetime.date, end: datetime.date) -> Iterator[datetime.date]:
+    day = start
+    while day <= end:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+def school_year(day: datetime.date) -> int:
+    """Calendar year the school year containing day starts in (2024 for 2024-25)"""
+    return day.year if day.month >= SCHOOL_YEAR_START_MONTH else day.year - 1
+
+
+def school_year_start(year: int) -> datetime.date:
+    return datetime.date(year, SCHOOL_YEAR_START_MONTH, 1)
+
+
+def school_year_sql(date_expr: str) -> str:
+    """SQL for school_year() of a date expression"""
+    return f"(YEAR({date_expr}) - (MONTH({date_expr}) < {SCHOOL_YEAR_START_MONTH}))"
+
+
+def grade_level_sql(grade_expr: str, date_expr: str, grades_as_of: int) -> str:
+    """
+    SQL for the grade level a student in grade_expr during school year
+    grades_as_of was in on date_expr. The source only keeps one grade, so it
+    is counted back one grade per earlier school year; later dates and values
+    outside GRADE_LEVELS keep grade_expr. The result does not depend on the
+    day the ETL runs, so full and incremental loads stamp the same grade.
+    """
+    years_back = f"({grades_as_of} - {school_year_sql(date_expr)})"
+    grade = f"(IF({grade_expr} = 'K', 0, CAST({grade_expr} AS SIGNED)) - {years_back})"
+    levels = ', '.join(f"'{level}'" for level in GRADE_LEVELS)
+    return (f"CASE WHEN {years_back} <= 0 OR {grade_expr} NOT IN ({levels}) THEN {grade_expr} "
+            f"WHEN {grade} <= 0 THEN 'K' ELSE CAST({grade} AS CHAR) END")
+
+
+def term(day: datetime.date) -> int:
+    """1 for the autumn term (August-December), 2 for the spring term"""
+    return 1 if day.month >= SCHOOL_YEAR_START_MONTH else 2
+
+
+def term_start(day: datetime.date) -> datetime.date:
+    month = max(m for m in TERM_START_MONTHS if m <= day.month)
+    return datetime.date(day.year, month, 1)
+
+
+def week_of_term(day: datetime.date) -> int:
+    """1-based week of the term, weeks starting on Monday"""
+    start = term_start(day)
+    first_monday = start - datetime.timedelta(days=start.weekday())
+    return (day - first_monday).days // 7 + 1
+
+
+def calendar_row(day: datetime.date) -> dict:
+    """One date_dim row"""
+    return {
+        'date_id': to_days(day),
+        'date': day,
+        'day': day.day,
+        'month': day.month,
+        'semester': term(day),
+        'year': day.year,
+        'weekday': day.strftime('%A'),
+        'school_year': school_year(day),
+        'week_of_term': week_of_term(day),
+        'is_weekend': day.weekday() >= 5,
+        'is_holiday': day in HOLIDAYS,
+        'holiday_name': HOLIDAYS.get(day),
+        'is_school_day': is_school_day(day),
+    }
+
+
+def calendar_rows(start: datetime.date, end: datetime.date) -> List[dict]:
+    """date_dim rows for every day from start through end"""
+    return [calendar_row(day) for day in date_range(start, end)]
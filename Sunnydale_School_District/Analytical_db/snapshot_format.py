@@ -0,0 +1,83 @@
+"""
+The parts of a warehouse snapshot (snapshot_publisher.py) that the ETL and
+the UI both read: the CURRENT file naming the published version, and the
+layout of attendance_rates.bin, the file of attendance rates in every
+version. attendance_rates.py writes it and UI/attendance_snapshot.py
+memory-maps it, both through this module, so they cannot drift apart. It
+needs nothing outside the standard library.
+
+    8 bytes   MAGIC
+    4 bytes   little-endian length of the JSON header
+    header    {"dates": D, "schools": [[school_id, name], ...],
+               "grade_levels": [...]}, padded with spaces to 8 bytes
+    int32     date_ids[D], ascending
+    float32   school_rates[D][schools]
+    float32   grade_rates[D][schools][grade_levels]
+
+All numbers are little-endian.
+"""
+import json
+import os
+import struct
+from typing import BinaryIO, Iterable, List, Optional, Sequence, Tuple
+
+CURRENT_FILE = 'CURRENT'
+
+MAGIC = b'SHQATT01'
+
+ATTENDANCE_RATES_FILE = 'attendance_rates.bin'
+
+DATE_ID_DTYPE = '<i4'
+RATE_DTYPE = '<f4'
+
+_LENGTH = struct.Struct('<I')
+
+
+def current_version(directory: str) -> Optional[str]:
+    """Name of the version CURRENT points at, None before the first publish"""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def set_current_version(directory: str, version: str):
+    """Point CURRENT at version, replacing the file so a reader sees the old or the new name"""
+    pointer = os.path.join(directory, CURRENT_FILE + '.tmp')
+    with open(pointer, 'w') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+
+def make_header(dates: int, schools: Iterable[Tuple[int, str]], grade_levels: Sequence[str]) -> dict:
+    return {
+        'dates': int(dates),
+        'schools': [[int(school_id), name] for school_id, name in schools],
+        'grade_levels': list(grade_levels),
+    }
+
+
+def pack_header(header: dict) -> bytes:
+    """MAGIC, the header length and the padded header, everything before the arrays"""
+    encoded = json.dumps(header).encode('utf-8')
+    encoded += b' ' * (-(len(MAGIC) + _LENGTH.size + len(encoded)) % 8)
+    return MAGIC + _LENGTH.pack(len(encoded)) + encoded
+
+
+def read_header(f: BinaryIO, name: str = 'file') -> Tuple[dict, int]:
+    """The header of an open file and the offset its arrays start at"""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{name} is not an attendance rates file")
+    length, = _LENGTH.unpack(f.read(_LENGTH.size))
+    return json.loads(f.read(length)), len(MAGIC) + _LENGTH.size + length
+
+
+def array_layout(header: dict) -> List[Tuple[str, str, tuple]]:
+    """(name, dtype, shape) of the arrays after the header, in file order"""
+    days, schools, grades = header['dates'], len(header['schools']), len(header['grade_levels'])
+    return [
+        ('date_ids', DATE_ID_DTYPE, (days,)),
+        ('school_rates', RATE_DTYPE, (days, schools)),
+        ('grade_rates', RATE_DTYPE, (days, schools, grades)),
+    ]
@@ -0,0 +1,125 @@
+"""
+Read-only Parquet copies of the warehouse for the dashboards.
+
+After every successful run the ETL writes what the dashboards read, the
+schools, the summaries and the latest KPIs, to a new version directory
+
+    snapshots/run-000042/school_dim.parquet
+                        ...
+                        attendance_rates.bin   (see attendance_rates.py)
+                        manifest.json
+    snapshots/CURRENT           -> "run-000042"
+
+and only then points CURRENT at it, so a reader never opens a half-written
+version. UI/local_warehouse.py answers the district dashboard's queries
+from the CURRENT version instead of the warehouse. The last KEEP_VERSIONS
+versions are kept so a dashboard that loaded an older one can finish with it.
+
+The facts stay in the warehouse: a snapshot only grows with the summaries,
+and every table is read through a server-side cursor, so a chunk at a time
+is held in memory.
+"""
+import datetime
+import json
+import os
+import shutil
+from typing import Dict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+from attendance_rates import build_attendance_rates
+from snapshot_format import ATTENDANCE_RATES_FILE, current_version, set_current_version
+from summaries import DISTRICT_KPIS
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots')
+
+# file name -> the query for it, only the columns UI/local_warehouse.py and UI/district_cube.py read
+SNAPSHOT_TABLES = {
+    'school_dim': "SELECT school_id, name FROM school_dim",
+    'performance_summary': """
+        SELECT school_id, grade_level, grade_type, score_sum, score_count
+        FROM performance_summary
+    """,
+    'attendance_daily_summary': """
+        SELECT date_id, school_id, grade_level, present_count, absent_count, late_count, excused_count
+        FROM attendance_daily_summary
+    """,
+    # the dashboards show the latest run's KPIs only
+    'district_kpi_cache': f"""
+        SELECT run_id, refreshed_at, {', '.join(DISTRICT_KPIS)}
+        FROM district_kpi_cache
+        ORDER BY run_id DESC
+        LIMIT 1
+    """,
+}
+
+KEEP_VERSIONS = 3
+
+CHUNK_SIZE = 100000
+
+
+def _export_table(conn, query: str, path: str) -> int:
+    """Stream a query's rows into a Parquet file a chunk (one row group) at a time"""
+    rows = 0
+    writer = None
+    try:
+        for chunk in pd.read_sql(text(query), conn, chunksize=CHUNK_SIZE):
+            batch = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, batch.schema)
+            writer.write_table(batch.cast(writer.schema))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        # no rows, still write the table so readers find its columns
+        columns = pd.read_sql(text(f"SELECT * FROM ({query}) q LIMIT 0"), conn).columns
+        pd.DataFrame(columns=columns).to_parquet(path, index=False)
+    return rows
+
+
+def publish_snapshot(engine, run_id: int, directory: str = DEFAULT_SNAPSHOT_DIR,
+                     tables: Dict[str, str] = SNAPSHOT_TABLES) -> str:
+    """
+    Export tables (file name -> query) as version run-<run_id> and make it
+    CURRENT. All tables are read in one transaction, so the version is
+    consistent even while another run loads. Returns the version directory.
+    """
+    version = f"run-{run_id:06d}"
+    path = os.path.join(directory, version)
+    staging = path + '.partial'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    counts: Dict[str, int] = {}
+    with engine.connect() as conn:
+        # a server-side cursor, otherwise PyMySQL buffers the whole result before the first chunk
+        conn = conn.execution_options(stream_results=True)
+        conn.execute(text("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+        conn.execute(text("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY"))
+        for table, query in tables.items():
+            counts[table] = _export_table(conn, query, os.path.join(staging, f"{table}.parquet"))
+        counts[ATTENDANCE_RATES_FILE] = build_attendance_rates(conn, os.path.join(staging, ATTENDANCE_RATES_FILE))
+        conn.rollback()
+
+    with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+        json.dump({'run_id': run_id, 'published_at': datetime.datetime.now().isoformat(), 'rows': counts},
+                  f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+    set_current_version(directory, version)
+
+    _prune(directory, keep=KEEP_VERSIONS)
+    return path
+
+
+def _prune(directory: str, keep: int):
+    versions = sorted(name for name in os.listdir(directory)
+                      if name.startswith('run-') and not name.endswith('.partial'))
+    for name in versions[:-keep]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
@@ -0,0 +1,159 @@
+"""
+Pre-aggregated tables the district dashboards read instead of the facts.
+
+    attendance_daily_summary  one row per day, school and grade level with
+                              the number of students in each status
+    performance_summary       one row per school, grade level and grade type
+                              with the sum and count of scores
+    district_kpi_cache        the district KPIs computed from the two above,
+                              one row per successful ETL run
+
+Rates and averages are SUM(...) / SUM(total) over these rows, which gives
+exactly what the same aggregate over the fact rows would. Both facts carry
+the student's grade level at the time, so the summaries are built from the
+facts alone. The ETL refreshes only the days and schools a run changed,
+except during a full refresh, which rebuilds the summaries from the shadow
+facts into the shadow summaries named by table_suffix (see table_swap.py).
+"""
+from typing import Optional, Sequence
+
+from sqlalchemy import text
+
+ATTENDANCE_SUMMARY_SQL = """
+CREATE TABLE attendance_daily_summary (
+  date_id INT NOT NULL,
+  school_id INT NOT NULL,
+  grade_level VARCHAR(4) NOT NULL,
+  present_count INT NOT NULL,
+  absent_count INT NOT NULL,
+  late_count INT NOT NULL,
+  excused_count INT NOT NULL,
+  total_count INT NOT NULL,
+  PRIMARY KEY (date_id, school_id, grade_level)
+)
+"""
+
+PERFORMANCE_SUMMARY_SQL = """
+CREATE TABLE performance_summary (
+  school_id INT NOT NULL,
+  grade_level VARCHAR(4) NOT NULL,
+  grade_type VARCHAR(20) NOT NULL,
+  score_sum BIGINT NOT NULL,
+  score_count INT NOT NULL,
+  PRIMARY KEY (school_id, grade_level, grade_type)
+)
+"""
+
+DISTRICT_KPI_CACHE_SQL = """
+CREATE TABLE district_kpi_cache (
+  run_id INT NOT NULL,
+  refreshed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  total_schools INT NOT NULL,
+  total_students INT NOT NULL,
+  total_teachers INT NOT NULL,
+  absence_rate DECIMAL(5,2),
+  late_rate DECIMAL(5,2),
+  excused_rate DECIMAL(5,2),
+  avg_score DECIMAL(5,2),
+  avg_homework_score DECIMAL(5,2),
+  avg_quiz_score DECIMAL(5,2),
+  avg_exam_score DECIMAL(5,2),
+  PRIMARY KEY (run_id)
+)
+"""
+
+DISTRICT_KPIS = ['total_schools', 'total_students', 'total_teachers', 'absence_rate', 'late_rate', 'excused_rate',
+                 'avg_score', 'avg_homework_score', 'avg_quiz_score', 'avg_exam_score']
+
+# the KPI columns of district_kpi_cache, as get_district_kpis returns them
+DISTRICT_KPIS_SELECT = """
+SELECT
+    (SELECT COUNT(*) FROM school_dim) AS total_schools,
+    (SELECT COUNT(*) FROM student_dim) AS total_students,
+    (SELECT COUNT(*) FROM teacher_dim) AS total_teachers,
+    ROUND(100 * a.absent / NULLIF(a.total, 0), 2) AS absence_rate,
+    ROUND(100 * a.late / NULLIF(a.total, 0), 2) AS late_rate,
+    ROUND(100 * a.excused / NULLIF(a.total, 0), 2) AS excused_rate,
+    ROUND(p.score_sum / NULLIF(p.score_count, 0), 2) AS avg_score,
+    ROUND(p.homework_sum / NULLIF(p.homework_count, 0), 2) AS avg_homework_score,
+    ROUND(p.quiz_sum / NULLIF(p.quiz_count, 0), 2) AS avg_quiz_score,
+    ROUND(p.exam_sum / NULLIF(p.exam_count, 0), 2) AS avg_exam_score
+FROM (
+    SELECT SUM(absent_count) AS absent, SUM(late_count) AS late,
+           SUM(excused_count) AS excused, SUM(total_count) AS total
+    FROM attendance_daily_summary
+) a
+CROSS JOIN (
+    SELECT SUM(score_sum) AS score_sum, SUM(score_count) AS score_count,
+           SUM(IF(grade_type IN ('homework1', 'homework2'), score_sum, 0)) AS homework_sum,
+           SUM(IF(grade_type IN ('homework1', 'homework2'), score_count, 0)) AS homework_count,
+           SUM(IF(grade_type = 'quiz', score_sum, 0)) AS quiz_sum,
+           SUM(IF(grade_type = 'quiz', score_count, 0)) AS quiz_count,
+           SUM(IF(grade_type IN ('mid exam', 'final exam'), score_sum, 0)) AS exam_sum,
+           SUM(IF(grade_type IN ('mid exam', 'final exam'), score_count, 0)) AS exam_count
+    FROM performance_summary
+) p
+"""
+
+ATTENDANCE_SUMMARY_SELECT = """
+SELECT
+    f.date_id,
+    f.school_id,
+    f.grade_level,
+    SUM(f.status = 'present'),
+    SUM(f.status = 'absent'),
+    SUM(f.status = 'late'),
+    SUM(f.status = 'excused'),
+    COUNT(*)
+FROM student_attendance_fact{suffix} f
+"""
+
+PERFORMANCE_SUMMARY_SELECT = """
+SELECT
+    f.school_id,
+    f.grade_level,
+    f.grade_type,
+    SUM(f.score),
+    COUNT(*)
+FROM student_performance_fact{suffix} f
+"""
+
+
+def _refresh(conn, table: str, select: str, group_by: str, key_column: str,
+             keys: Optional[Sequence[int]], table_suffix: str) -> int:
+    """Recompute the summary rows for keys (all rows when keys is None)"""
+    table += table_suffix
+    select = select.format(suffix=table_suffix)
+    if keys is None:
+        conn.execute(text(f"DELETE FROM {table}"))
+        where, params = '', {}
+    else:
+        if not keys:
+            return 0
+        params = {'keys': tuple(keys)}
+        conn.execute(text(f"DELETE FROM {table} WHERE {key_column} IN :keys"), params)
+        where = f"WHERE f.{key_column} IN :keys"
+
+    result = conn.execute(text(f"INSERT INTO {table} {select} {where} GROUP BY {group_by}"), params)
+    return result.rowcount
+
+
+def refresh_attendance_summary(conn, date_ids: Optional[Sequence[int]] = None, table_suffix: str = '') -> int:
+    """Rebuild attendance_daily_summary for the given days, or entirely"""
+    return _refresh(conn, 'attendance_daily_summary', ATTENDANCE_SUMMARY_SELECT,
+                    'f.date_id, f.school_id, f.grade_level', 'date_id', date_ids, table_suffix)
+
+
+def refresh_performance_summary(conn, school_ids: Optional[Sequence[int]] = None, table_suffix: str = '') -> int:
+    """Rebuild performance_summary for the given schools, or entirely"""
+    return _refresh(conn, 'performance_summary', PERFORMANCE_SUMMARY_SELECT,
+                    'f.school_id, f.grade_level, f.grade_type', 'school_id', school_ids, table_suffix)
+
+
+def refresh_district_kpis(conn, run_id: int) -> int:
+    """Cache the district KPIs of the live tables as run_id's row of district_kpi_cache"""
+    result = conn.execute(text(f"""
+        INSERT INTO district_kpi_cache (run_id, {', '.join(DISTRICT_KPIS)})
+        SELECT :run_id, kpis.* FROM ({DISTRICT_KPIS_SELECT}) kpis
+    """), {'run_id': run_id})
+    return result.rowcount
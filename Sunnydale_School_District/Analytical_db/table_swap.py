@@ -0,0 +1,58 @@
+"""
+Shadow tables for full refreshes.
+
+A full refresh loads empty copies of the warehouse tables (<table>_shadow)
+while the dashboards keep reading the live ones, then swaps them in with a
+single RENAME TABLE. RENAME TABLE with several renames is atomic, so a query
+sees either all of the old tables or all of the new ones, never an empty or
+half-loaded one.
+
+The copies are made from SHOW CREATE TABLE rather than CREATE TABLE ... LIKE
+so they keep their partitions and foreign keys. Foreign keys are pointed at
+the other shadow tables; InnoDB re-points them as the tables are renamed, so
+after the swap they reference the live tables again.
+"""
+import re
+from typing import Sequence
+
+from sqlalchemy import text
+
+SHADOW_SUFFIX = '_shadow'
+OLD_SUFFIX = '_old'
+
+
+def shadow_definition(create_sql: str, table: str, tables: Sequence[str]) -> str:
+    """SHOW CREATE TABLE output rewritten to create table's shadow"""
+    sql = create_sql.replace(f"CREATE TABLE `{table}`", f"CREATE TABLE `{table}{SHADOW_SUFFIX}`", 1)
+    # constraint names are unique per schema, let InnoDB name the shadow's own
+    sql = re.sub(r"CONSTRAINT `[^`]+` FOREIGN KEY", "FOREIGN KEY", sql)
+    for referenced in tables:
+        sql = sql.replace(f"REFERENCES `{referenced}` ", f"REFERENCES `{referenced}{SHADOW_SUFFIX}` ")
+    return sql
+
+
+def drop_tables(conn, tables: Sequence[str], suffix: str):
+    """Drop the suffixed copies of tables, in the given (referencing first) order"""
+    for table in tables:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table}{suffix}"))
+
+
+def create_shadow_tables(conn, tables: Sequence[str]):
+    """
+    Empty shadow copies of tables, which must list referencing tables before
+    the ones they reference. Shadows left by a failed run are replaced.
+    """
+    drop_tables(conn, tables, SHADOW_SUFFIX)
+    for table in reversed(tables):
+        create_sql = conn.execute(text(f"SHOW CREATE TABLE {table}")).fetchone()[1]
+        conn.execute(text(shadow_definition(create_sql, table, tables)))
+
+
+def swap_tables(conn, tables: Sequence[str]):
+    """Move the loaded shadows into place in one atomic rename, then drop the old tables"""
+    renames = []
+    for table in tables:
+        renames.append(f"{table} TO {table}{OLD_SUFFIX}")
+        renames.append(f"{table}{SHADOW_SUFFIX} TO {table}")
+    conn.execute(text(f"RENAME TABLE {', '.join(renames)}"))
+    drop_tables(conn, tables, OLD_SUFFIX)
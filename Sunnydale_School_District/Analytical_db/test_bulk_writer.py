@@ -0,0 +1,178 @@
+import os
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from bulk_writer import BulkWriter, to_load_data_text, to_rows
+
+
+class OperationalError(Exception):
+    """What the driver raises, args (errno, message)"""
+
+
+class WrappedError(Exception):
+    """What SQLAlchemy raises around a driver error"""
+    def __init__(self, orig):
+        super().__init__(str(orig))
+        self.orig = orig
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        if sql.startswith('LOAD DATA'):
+            self.conn.load_data_calls += 1
+            if self.conn.load_error:
+                raise self.conn.load_error
+            path, = params
+            self.conn.load_paths.append(path)
+            with open(path, encoding='utf-8') as f:
+                self.conn.loaded.append(f.read())
+            self.rowcount = self.conn.loaded[-1].count('\n') - self.conn.skipped
+        elif sql.startswith('SHOW WARNINGS'):
+            self.rows = self.conn.warnings
+
+    def fetchall(self):
+        return self.rows
+
+    def executemany(self, sql, rows):
+        self.conn.inserted.append((sql, rows))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """A SQLAlchemy connection whose DBAPI connection records LOAD DATA and executemany calls"""
+    def __init__(self, load_error=None, skipped=0, warnings=()):
+        self.load_error = load_error
+        self.skipped = skipped
+        self.warnings = list(warnings)
+        self.load_data_calls = 0
+        self.load_paths = []
+        self.loaded = []
+        self.inserted = []
+        self.connection = self
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'student_id': [1, 2],
+        'notes': ['late\tbus\nagain C:\\bus', None],
+        'is_school_day': [True, False],
+    })
+
+
+def test_null_and_escaping():
+    df = pd.DataFrame({
+        'id': [1, 2, 3],
+        'text': ['tab\there', 'line\nbreak\r', None],
+        'path': ['C:\\temp', '\\N', 'plain'],
+        'score': [1.5, None, 3.0],
+    })
+    assert to_load_data_text(df) == (
+        '1\ttab\\there\tC:\\\\temp\t1.5\n'
+        '2\tline\\nbreak\\r\t\\\\N\t\\N\n'
+        '3\t\\N\tplain\t3.0\n'
+    )
+
+
+def test_booleans_load_as_integers(df):
+    lines = to_load_data_text(df[['student_id', 'is_school_day']]).splitlines()
+    assert lines == ['1\t1', '2\t0']
+
+
+def test_single_column():
+    assert to_load_data_text(pd.DataFrame({'id': [7, 8]})) == '7\n8\n'
+
+
+def test_rows_use_none_for_missing_values():
+    assert to_rows(pd.DataFrame({'id': [1, 2], 'score': [1.5, None]})) == [(1, 1.5), (2, None)]
+
+
+def test_load_data_writes_the_encoded_rows(df):
+    conn = FakeConnection()
+    writer = BulkWriter()
+    writer.write(conn, df, 'student_attendance_fact')
+
+    assert conn.loaded == [to_load_data_text(df)]
+    assert conn.inserted == []
+    assert not os.path.exists(conn.load_paths[0])
+    assert writer.stats['student_attendance_fact'][0] == 2
+
+
+@pytest.mark.parametrize('errno', [1148, 3948, 2068])
+def test_falls_back_when_local_infile_is_refused(df, errno):
+    conn = FakeConnection(load_error=WrappedError(OperationalError(errno, 'LOAD DATA LOCAL is disabled')))
+    writer = BulkWriter()
+    writer.write(conn, df, 'student_attendance_fact')
+    writer.write(conn, df, 'student_attendance_fact')
+
+    # the second write goes straight to executemany
+    assert conn.load_data_calls == 1
+    assert writer.method == 'executemany'
+    assert len(conn.inserted) == 2
+    sql, rows = conn.inserted[0]
+    assert sql == ("INSERT INTO student_attendance_fact (student_id, notes, is_school_day) "
+                   "VALUES (%s, %s, %s)")
+    assert rows == [(1, 'late\tbus\nagain C:\\bus', True), (2, None, False)]
+    assert writer.stats['student_attendance_fact'][0] == 4
+
+
+def test_refusal_from_the_driver_itself(df):
+    conn = FakeConnection(load_error=OperationalError(1148, 'The used command is not allowed'))
+    writer = BulkWriter()
+    writer.write(conn, df, 'attendance_note_dim')
+    assert writer.method == 'executemany'
+
+
+def test_other_errors_are_raised(df):
+    conn = FakeConnection(load_error=WrappedError(OperationalError(1062, 'Duplicate entry')))
+    writer = BulkWriter()
+    with pytest.raises(WrappedError):
+        writer.write(conn, df, 'student_attendance_fact')
+    assert writer.method == 'auto'
+    assert conn.inserted == []
+
+
+def test_load_data_method_does_not_fall_back(df):
+    conn = FakeConnection(load_error=OperationalError(1148, 'The used command is not allowed'))
+    writer = BulkWriter('load_data')
+    with pytest.raises(OperationalError):
+        writer.write(conn, df, 'student_attendance_fact')
+    assert conn.inserted == []
+
+
+def test_skipped_rows_raise(df):
+    conn = FakeConnection(skipped=1, warnings=[('Warning', 1062, "Duplicate entry '2' for key 'PRIMARY'")])
+    with pytest.raises(RuntimeError, match="loaded 1 of 2 rows: Duplicate entry"):
+        BulkWriter().write(conn, df, 'student_attendance_fact')
+    assert not os.path.exists(conn.load_paths[0])
+
+
+def test_executemany_method_skips_load_data(df):
+    conn = FakeConnection()
+    BulkWriter('executemany').write(conn, df, 'student_attendance_fact')
+    assert conn.load_data_calls == 0
+    assert len(conn.inserted) == 1
+
+
+def test_empty_frames_are_not_written(df):
+    conn = FakeConnection()
+    writer = BulkWriter()
+    writer.write(conn, df.iloc[:0], 'student_attendance_fact')
+    assert conn.load_data_calls == 0 and conn.inserted == [] and writer.stats == {}
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        BulkWriter('copy')
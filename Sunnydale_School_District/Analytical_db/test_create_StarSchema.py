@@ -0,0 +1,72 @@
+import sys
+import types
+
+import pytest
+
+pytest.importorskip('pandas')
+pytest.importorskip('sqlalchemy')
+
+try:
+    import mysql.connector
+except ImportError:
+    # only its Error is used here, no test connects to MySQL
+    class Error(Exception):
+        pass
+
+    connector = types.ModuleType('mysql.connector')
+    connector.Error = Error
+    connector.MySQLConnection = object
+    sys.modules['mysql'] = types.ModuleType('mysql')
+    sys.modules['mysql'].connector = connector
+    sys.modules['mysql.connector'] = connector
+
+import mysql.connector
+from create_StarSchema import create_star_schema, create_tables_sql, schema_statements
+from migrations import MIGRATIONS
+
+
+class FakeCursor:
+    """Records every statement, raising mysql.connector.Error on the one at index fail_at"""
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        if len(self.executed) == self.fail_at:
+            raise mysql.connector.Error("Table 'school_dim' already exists")
+        self.executed.append((sql, params))
+
+    def recorded_migrations(self):
+        return [params[0] for sql, params in self.executed if sql.startswith('INSERT IGNORE INTO schema_migrations')]
+
+
+def test_every_statement_creates_a_table():
+    # a semicolon in a comment used to cut a CREATE TABLE in two
+    statements = schema_statements(create_tables_sql)
+    assert statements
+    for stmt in statements:
+        assert stmt.startswith('CREATE TABLE'), stmt[:80]
+
+
+def test_fact_tables_are_created():
+    statements = schema_statements(create_tables_sql)
+    for table in ('student_performance_fact', 'student_attendance_fact'):
+        assert any(stmt.startswith(f'CREATE TABLE {table} (') for stmt in statements), table
+
+
+def test_records_every_migration_after_the_tables():
+    cursor = FakeCursor()
+    create_star_schema(cursor)
+
+    statements = schema_statements()
+    assert [sql for sql, params in cursor.executed[:len(statements)]] == statements
+    assert cursor.recorded_migrations() == [migration.version for migration in MIGRATIONS]
+    assert len(cursor.executed) == len(statements) + len(MIGRATIONS)
+
+
+def test_failed_table_records_no_migration():
+    cursor = FakeCursor(fail_at=2)
+    with pytest.raises(mysql.connector.Error):
+        create_star_schema(cursor)
+    assert len(cursor.executed) == 2
+    assert cursor.recorded_migrations() == []
@@ -0,0 +1,151 @@
+import datetime
+import types
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+import partitions
+from partitions import (DEFAULT_START, FUTURE_PARTITION, ensure_future_partitions, from_days, next_boundary,
+                        partition_clause, period_starts, to_days)
+
+
+class FakeConnection:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def execute(self, statement):
+        sql = str(statement)
+        self.engine.statements.append(sql)
+        rows = self.engine.partitions if 'information_schema.partitions' in sql else []
+        return types.SimpleNamespace(fetchall=lambda: rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeEngine:
+    """Answers the information_schema query with partitions, (name, description) rows"""
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.statements = []
+
+    def begin(self):
+        return FakeConnection(self)
+
+    def reorganized(self):
+        return [sql for sql in self.statements if 'REORGANIZE' in sql]
+
+
+@pytest.fixture
+def today(monkeypatch):
+    class Today(datetime.date):
+        @classmethod
+        def today(cls):
+            return cls(2025, 5, 20)
+
+    monkeypatch.setattr(partitions, 'datetime', types.SimpleNamespace(date=Today))
+
+
+def test_to_days_matches_mysql():
+    # SELECT TO_DAYS('0001-01-01'), TO_DAYS('2007-10-07'), TO_DAYS('2025-03-01')
+    assert to_days(datetime.date(1, 1, 1)) == 366
+    assert to_days(datetime.date(2007, 10, 7)) == 733321
+    assert to_days(DEFAULT_START) == 739676
+
+
+def test_from_days_round_trips_month_ends():
+    for day in (datetime.date(2024, 2, 29), datetime.date(2025, 2, 28), datetime.date(2025, 3, 1),
+                datetime.date(2025, 12, 31), datetime.date(2026, 1, 1)):
+        assert from_days(to_days(day)) == day
+        assert from_days(to_days(day) + 1) == day + datetime.timedelta(days=1)
+
+
+def test_month_boundaries():
+    assert next_boundary(datetime.date(2025, 1, 31)) == datetime.date(2025, 2, 1)
+    assert next_boundary(datetime.date(2025, 3, 1)) == datetime.date(2025, 4, 1)
+    assert next_boundary(datetime.date(2025, 12, 31)) == datetime.date(2026, 1, 1)
+
+
+def test_term_boundaries():
+    assert next_boundary(datetime.date(2025, 1, 1), 'term') == datetime.date(2025, 8, 1)
+    assert next_boundary(datetime.date(2025, 7, 31), 'term') == datetime.date(2025, 8, 1)
+    assert next_boundary(datetime.date(2025, 8, 1), 'term') == datetime.date(2026, 1, 1)
+    assert next_boundary(datetime.date(2025, 12, 31), 'term') == datetime.date(2026, 1, 1)
+
+
+def test_unknown_granularity_and_kind():
+    with pytest.raises(ValueError):
+        next_boundary(DEFAULT_START, 'week')
+    with pytest.raises(ValueError):
+        partition_clause('date', 'datetime', end=DEFAULT_START)
+
+
+def test_period_starts_include_the_partial_first_and_last_months():
+    assert period_starts(datetime.date(2025, 3, 15), datetime.date(2025, 5, 1)) == [
+        datetime.date(2025, 3, 1), datetime.date(2025, 4, 1), datetime.date(2025, 5, 1)
+    ]
+    assert period_starts(DEFAULT_START, DEFAULT_START - datetime.timedelta(days=1)) == []
+
+
+def test_partition_clause_starts_at_default_start():
+    # the first partition also holds any day before DEFAULT_START
+    clause = partition_clause('date', 'date', end=DEFAULT_START)
+    assert clause == (
+        "PARTITION BY RANGE COLUMNS(date) (\n"
+        "  PARTITION p202503 VALUES LESS THAN ('2025-04-01'),\n"
+        f"  PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)\n"
+        ")"
+    )
+
+
+def test_partition_clause_to_days():
+    clause = partition_clause('date_id', 'to_days', end=datetime.date(2025, 4, 30))
+    assert clause.startswith("PARTITION BY RANGE (date_id) (\n")
+    assert f"PARTITION p202503 VALUES LESS THAN ({to_days(datetime.date(2025, 4, 1))})" in clause
+    assert f"PARTITION p202504 VALUES LESS THAN ({to_days(datetime.date(2025, 5, 1))})" in clause
+    assert clause.count('PARTITION p') == 3
+
+
+def test_reorganizes_p_future_up_to_the_horizon(today):
+    engine = FakeEngine([
+        ('p202503', "'2025-04-01'"),
+        ('p202504', "'2025-05-01'"),
+        (FUTURE_PARTITION, 'MAXVALUE'),
+    ])
+    created = ensure_future_partitions(engine, 'attendance', 'date', months_ahead=3)
+
+    # today is 2025-05-20, so named partitions reach 2025-09-01
+    assert created == ['p202505', 'p202506', 'p202507', 'p202508']
+    statement, = engine.reorganized()
+    assert statement.startswith(f"ALTER TABLE attendance REORGANIZE PARTITION {FUTURE_PARTITION} INTO (")
+    assert "PARTITION p202508 VALUES LESS THAN ('2025-09-01')" in statement
+    assert statement.rstrip().endswith(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)\n)")
+
+
+def test_reorganizes_to_days_partitions(today):
+    engine = FakeEngine([
+        ('p202503', str(to_days(datetime.date(2025, 4, 1)))),
+        ('p202504', str(to_days(datetime.date(2025, 5, 1)))),
+        (FUTURE_PARTITION, 'MAXVALUE'),
+    ])
+    assert ensure_future_partitions(engine, 'student_attendance_fact', 'to_days', months_ahead=1) == [
+        'p202505', 'p202506'
+    ]
+    statement, = engine.reorganized()
+    assert f"PARTITION p202506 VALUES LESS THAN ({to_days(datetime.date(2025, 7, 1))})" in statement
+
+
+def test_nothing_to_do_when_covered(today):
+    engine = FakeEngine([('p202509', "'2025-10-01'"), (FUTURE_PARTITION, 'MAXVALUE')])
+    assert ensure_future_partitions(engine, 'attendance', 'date', months_ahead=3) == []
+    assert engine.reorganized() == []
+
+
+def test_skips_unpartitioned_tables(today):
+    engine = FakeEngine([])
+    assert ensure_future_partitions(engine, 'attendance', 'date') == []
+    assert engine.reorganized() == []
@@ -0,0 +1,49 @@
+import datetime
+
+from school_calendar import HOLIDAYS, calendar_rows, days_off, is_school_day, school_days
+
+SPRING_BREAK = [datetime.date(2025, 3, day) for day in range(24, 29)]
+
+
+def test_days_off_covers_every_day():
+    assert days_off(datetime.date(2025, 3, 24), datetime.date(2025, 3, 28), 'Spring break') == {
+        day: 'Spring break' for day in SPRING_BREAK
+    }
+
+
+def test_every_day_of_spring_break_is_a_holiday():
+    for day in SPRING_BREAK:
+        assert HOLIDAYS[day] == 'Spring break'
+        assert not is_school_day(day)
+
+
+def test_school_days_around_spring_break():
+    assert school_days(datetime.date(2025, 3, 17), datetime.date(2025, 4, 4)) == (
+        [datetime.date(2025, 3, day) for day in range(17, 22)] +
+        [datetime.date(2025, 3, 31)] + [datetime.date(2025, 4, day) for day in range(1, 5)]
+    )
+
+
+def test_weekends_are_not_school_days():
+    assert not is_school_day(datetime.date(2025, 3, 22))
+    assert not is_school_day(datetime.date(2025, 3, 23))
+    assert is_school_day(datetime.date(2025, 3, 21))
+
+
+def test_calendar_rows_mark_spring_break():
+    rows = {row['date']: row for row in calendar_rows(datetime.date(2025, 3, 21), datetime.date(2025, 3, 31))}
+    assert len(rows) == 11
+    for day in SPRING_BREAK:
+        assert rows[day]['is_holiday'] and not rows[day]['is_school_day']
+        assert rows[day]['holiday_name'] == 'Spring break'
+        assert not rows[day]['is_weekend']
+    assert rows[datetime.date(2025, 3, 22)]['is_weekend'] and not rows[datetime.date(2025, 3, 22)]['is_holiday']
+    for day in (datetime.date(2025, 3, 21), datetime.date(2025, 3, 31)):
+        assert rows[day]['is_school_day'] and rows[day]['holiday_name'] is None
+
+
+def test_calendar_row_fields():
+    row, = calendar_rows(datetime.date(2025, 3, 26), datetime.date(2025, 3, 26))
+    assert row['date_id'] == datetime.date(2025, 3, 26).toordinal() + 365
+    assert (row['day'], row['month'], row['year'], row['weekday']) == (26, 3, 2025, 'Wednesday')
+    assert (row['semester'], row['school_year']) == (2, 2024)
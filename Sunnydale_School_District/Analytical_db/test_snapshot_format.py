@@ -0,0 +1,45 @@
+import io
+
+from snapshot_format import (MAGIC, array_layout, current_version, make_header, pack_header, read_header,
+                             set_current_version)
+
+
+def test_header_round_trip():
+    header = make_header(3, [(1, 'Sunnydale High'), (2, 'Oak Élémentaire')], ['K', '1'])
+    data = pack_header(header)
+    assert data.startswith(MAGIC)
+    read, offset = read_header(io.BytesIO(data + b'\0' * 16))
+    assert read == header
+    assert offset == len(data)
+
+
+def test_arrays_start_on_an_8_byte_boundary():
+    for name_length in range(1, 10):
+        data = pack_header(make_header(1, [(1, 'x' * name_length)], ['K']))
+        assert len(data) % 8 == 0
+
+
+def test_rejects_other_files():
+    try:
+        read_header(io.BytesIO(b'PAR1' + b'\0' * 32), 'school_dim.parquet')
+    except ValueError as e:
+        assert 'school_dim.parquet' in str(e)
+    else:
+        raise AssertionError("a file without MAGIC was read")
+
+
+def test_array_layout():
+    layout = array_layout(make_header(5, [(1, 'a'), (2, 'b')], ['K', '1', '2']))
+    assert layout == [
+        ('date_ids', '<i4', (5,)),
+        ('school_rates', '<f4', (5, 2)),
+        ('grade_rates', '<f4', (5, 2, 3)),
+    ]
+
+
+def test_current_version(tmp_path):
+    assert current_version(str(tmp_path)) is None
+    set_current_version(str(tmp_path), 'run-000001')
+    set_current_version(str(tmp_path), 'run-000002')
+    assert current_version(str(tmp_path)) == 'run-000002'
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['CURRENT']
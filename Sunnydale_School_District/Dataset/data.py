@@ -1,12 +1,19 @@
+import argparse
+import os
+import sys
 import pandas as pd
 import random
 from faker import Faker
 import string
-from datetime import datetime, timedelta
+from datetime import datetime
 import hashlib
 import numpy as np
 from tqdm import tqdm
 
+# the holiday list is shared with the warehouse's date dimension
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Analytical_db'))
+from school_calendar import school_days as calendar_school_days
+
 # Set random seed for reproducibility
 random.seed(42)
 Faker.seed(42)  # Seed Faker to ensure consistent fake data generation
@@ -66,16 +73,16 @@ def generate_username(first_name, middle_name, last_name, role):
     return username[:20]  # Ensure reasonable length
 
 
-def generate_users():
-    """Generate user data"""
+def generate_users(scale=1):
+    """Generate user data. scale multiplies the teachers, students and guardians"""
     users = []
     user_id = 1
     
     # Define number of each role
     role_counts = {
-        'teacher': 200,
-        'student': 3000,
-        'guardian': 5000,
+        'teacher': 200 * scale,
+        'student': 3000 * scale,
+        'guardian': 5000 * scale,
         'school_admin': 20,
         'district_admin': 1
     }
@@ -190,7 +197,7 @@ def generate_guardians(user_df, all_names):
 
 
 ##### Generate Teacher Data #####
-def generate_teachers(user_df, all_names, school_ids):
+def generate_teachers(user_df, all_names, school_ids, scale=1):
     """Generate teacher data with matching names"""
     teacher_users = user_df[user_df['role'] == 'teacher']
     teachers = []
@@ -204,10 +211,10 @@ def generate_teachers(user_df, all_names, school_ids):
     }
 
     teacher_allocation = {
-        "elementary": (school_ids_by_type["elementary"], 88),
-        "middle": (school_ids_by_type["middle"], 48),
-        "high": (school_ids_by_type["high"], 60),
-        "special_ed": (school_ids_by_type["special_ed"], 4)
+        "elementary": (school_ids_by_type["elementary"], 88 * scale),
+        "middle": (school_ids_by_type["middle"], 48 * scale),
+        "high": (school_ids_by_type["high"], 60 * scale),
+        "special_ed": (school_ids_by_type["special_ed"], 4 * scale)
     }
 
     school_teacher_slots = []
@@ -316,14 +323,16 @@ def generate_students(user_df, all_names, df_teachers, num_student=3000):
         homeroom_teacher_id = None
         homeroom_id = None
         
-        # Check if there's an existing homeroom with space (max 25 students)
-        for h_id, h_data in homerooms[school_id][grade].items():
+        # Check if there's an existing homeroom with space (max 25 students).
+        # Homerooms fill in order, so only the newest one can still have space.
+        if homerooms[school_id][grade]:
+            h_id = next(reversed(homerooms[school_id][grade]))
+            h_data = homerooms[school_id][grade][h_id]
             if len(h_data['students']) < 25:
                 homeroom_teacher_id = h_data['teacher_id']
                 homeroom_id = h_id
                 h_data['students'].append(student_id)
                 homeroom_assigned = True
-                break
                 
         # If no available homeroom, create a new one
         if not homeroom_assigned:
@@ -331,7 +340,7 @@ def generate_students(user_df, all_names, df_teachers, num_student=3000):
             available_teachers = grade_teacher_map.get(school_id, {}).get(grade, [])
             if available_teachers:
                 # Try to find a teacher who isn't already a homeroom teacher for this grade
-                existing_homeroom_teachers = [h['teacher_id'] for h in homerooms[school_id][grade].values()]
+                existing_homeroom_teachers = {h['teacher_id'] for h in homerooms[school_id][grade].values()}
                 candidates = [t for t in available_teachers if t not in existing_homeroom_teachers]
                 
                 if candidates:
@@ -393,9 +402,6 @@ def generate_guardian_student_relationships(df_students, df_guardians, max_guard
 
     guardian_ids = df_guardians['guardian_id'].tolist()
 
-    # Track which guardians have been assigned to students
-    guardian_assignments = {guardian_id: [] for guardian_id in guardian_ids}
-
     for student_id in df_students['student_id']:
         # Determing number of guardians for this student (1-2 normally, sometimes more)
         num_guardians = 1
@@ -406,11 +412,8 @@ def generate_guardian_student_relationships(df_students, df_guardians, max_guard
         
         num_guardians = min(num_guardians, max_guardians_per_student)
 
-        # Select guardians that aren't already assigned to this student
-        available_guardians = [
-            gid for gid in guardian_ids
-            if student_id not in guardian_assignments[gid]  
-        ]
+        # Each student is visited once, so every guardian is still available
+        available_guardians = guardian_ids
 
         # If we don't have enough available guardians, reduce the number
         num_guardians = min(num_guardians, len(available_guardians))
@@ -442,7 +445,6 @@ def generate_guardian_student_relationships(df_students, df_guardians, max_guard
                 "student_id": student_id,
                 "relationship": relationship_types[i] if i < len(relationship_types) else 'others'
             })
-            guardian_assignments[guardian_id].append(student_id)
     return pd.DataFrame(relationships)
 
 
@@ -676,6 +678,11 @@ def generate_teaches(df_teachers, df_students, df_takes, schedule_map, homerooms
 
     time_slots = generate_course_schedule()
 
+    teachers_by_school = {
+        school_id: group["teacher_id"].tolist()
+        for school_id, group in df_teachers.groupby("school_id")
+    }
+
     for key, course_ids in schedule_map.items():
         school_id, grade, homeroom_id = key
         h_teacher_id = homerooms[school_id][grade][homeroom_id]["teacher_id"]
@@ -692,7 +699,7 @@ def generate_teaches(df_teachers, df_students, df_takes, schedule_map, homerooms
             if school_id in [1, 2, 3, 4]:  # Elementary: only homeroom teacher
                 candidates = [h_teacher_id]
             else:
-                candidates = [h_teacher_id] if random.random() < 0.5 else df_teachers[df_teachers["school_id"] == school_id]["teacher_id"].tolist()
+                candidates = [h_teacher_id] if random.random() < 0.5 else list(teachers_by_school.get(school_id, []))
 
             # Shuffle candidates for fairness
             random.shuffle(candidates)
@@ -744,23 +751,7 @@ def generate_attendance_data(df_students, start_date='2025-03-15', end_date='202
     end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
     # Generate all school days (Monday-Friday, excluding holidays)
-    school_days = []
-    current_date = start_date
-    
-    # List of major holidays/breaks during Spring 2025
-    holidays = [
-        # '2025-01-20',  # MLK Day
-        # '2025-02-17',  # Presidents Day
-        '2025-03-24',  # Spring break start
-        '2025-03-28',  # Spring break end
-        '2025-04-18'  # Good Friday
-    ]
-    holidays = [datetime.strptime(d, '%Y-%m-%d').date() for d in holidays]
-    
-    while current_date <= end_date:
-        if current_date.weekday() < 5 and current_date not in holidays:
-            school_days.append(current_date)
-        current_date += timedelta(days=1)
+    school_days = calendar_school_days(start_date, end_date)
     
     # Create a mapping of school_id to available teachers for fallback
     school_teachers = df_students.groupby('school_id')['homeroom_teacher_id'].unique().to_dict()
@@ -790,10 +781,6 @@ def generate_attendance_data(df_students, start_date='2025-03-15', end_date='202
         for day in school_days:
             status = 'present'
             
-            # Skip attendance for weekends/holidays (shouldn't happen but just in case)
-            if day.weekday() >= 5 or day in holidays:
-                continue
-                
             # Random chance of absence
             if random.random() < base_absence_prob:
                 status = 'absent'
@@ -903,10 +890,10 @@ def generate_grade_details(df_takes):
     return pd.DataFrame(grade_details)
 
 
-def main():
+def main(scale=1):
     # Generate user data
     print("Generating user data...")
-    df_users, all_names = generate_users()
+    df_users, all_names = generate_users(scale)
     save_data(df_users)
 
     # Generate district data
@@ -927,12 +914,12 @@ def main():
     # Generate teacher data
     print("\nGenerating teacher data...")
     school_ids = df_schools["school_id"].tolist()
-    df_teachers = generate_teachers(df_users, all_names, school_ids)
+    df_teachers = generate_teachers(df_users, all_names, school_ids, scale)
     df_teachers.to_csv("teachers_data.csv", index=False)
 
     # Generate student data
     print("\nGenerating student data...")
-    df_students, homerooms = generate_students(df_users, all_names, df_teachers)
+    df_students, homerooms = generate_students(df_users, all_names, df_teachers, num_student=3000 * scale)
     df_students.to_csv("students_data.csv", index=False)
 
     # Generate guardian-student relationships
@@ -972,4 +959,12 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate the Sunnydale data set as CSV files")
+    parser.add_argument('--scale', type=int, default=1,
+                        help="multiply teachers, students and guardians (schools stay at 10)")
+    parser.add_argument('--out', default='.', help="directory to write the CSV files to")
+    options = parser.parse_args()
+
+    os.makedirs(options.out, exist_ok=True)
+    os.chdir(options.out)
+    main(options.scale)
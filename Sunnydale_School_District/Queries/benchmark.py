@@ -0,0 +1,643 @@
+#-------------------------------------------------------#
+# Stored-procedure benchmark at several district sizes  #
+#-------------------------------------------------------#
+"""
+Seeds one operational and one warehouse database per scale factor from
+Dataset/data.py, installs every procedure defined in the Queries notebooks
+and calls each one with argument sets sampled from the seeded data.
+
+For every procedure and scale it reports p50/p95/p99 latency, the rows the
+server examined (Handler_read* counters) and the rows returned. Results are
+written to benchmark_results/ and compared with the previous run, so a
+procedure that got slower shows up as a regression. The on-disk size of
+every warehouse table is saved alongside, so schema changes can be compared
+by size as well as latency.
+
+    python benchmark.py seed --scales 1 10 100
+    python benchmark.py run --scales 1 10 --samples 30
+    python benchmark.py compare benchmark_results/a.json benchmark_results/b.json
+
+The databases are named after the ones in the ini files, e.g. sheql_bench10x
+and sheql_wh_bench10x, so the configured user needs CREATE DATABASE rights.
+"""
+
+import argparse
+import ast
+import csv
+import datetime
+import glob
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from configparser import ConfigParser
+
+from mysql.connector import MySQLConnection
+
+from procedures import QUERIES_DIR, load_procedures, execute_strings
+
+PROJECT_DIR = os.path.dirname(QUERIES_DIR)
+DATASET_DIR = os.path.join(PROJECT_DIR, 'Dataset')
+ANALYTICAL_DIR = os.path.join(PROJECT_DIR, 'Analytical_db')
+DATA_DIR = os.path.join(QUERIES_DIR, 'benchmark_data')
+RESULTS_DIR = os.path.join(QUERIES_DIR, 'benchmark_results')
+
+DEFAULT_SCALES = (1, 10, 100)
+
+# procedures from these notebook folders run against the warehouse
+WAREHOUSE_FOLDERS = ('District',)
+
+# (csv file, table, columns to keep) in the order Create_Table.ipynb loads them
+CSV_TABLES = [
+    ('all_users_with_passwords.csv', 'users', [0, 1, 2, 3, 4, 5]),
+    ('admins_data.csv', 'administrator', None),
+    ('districts_data.csv', 'district', None),
+    ('schools_data.csv', 'school', None),
+    ('teachers_data.csv', 'teacher', None),
+    ('students_data.csv', 'student', None),
+    ('guardians_data.csv', 'guardian', None),
+    ('guardian_student_relationships.csv', 'guardian_student_relationship', None),
+    ('school_courses.csv', 'course', None),
+    ('teaches_data.csv', 'teaches', None),
+    ('takes_data.csv', 'takes', None),
+    ('grade_details.csv', 'grade_details', None),
+    ('attendance_data.csv', 'attendance', [1, 2, 3, 4, 5]),
+]
+
+BATCH_SIZE = 5000
+
+GRADE_TYPES = ('homework1', 'homework2', 'quiz', 'mid exam', 'final exam')
+
+# p95 growth over the previous run that counts as a regression; calls
+# faster than REGRESSION_FLOOR_MS are ignored as noise
+REGRESSION_THRESHOLD = 0.2
+REGRESSION_FLOOR_MS = 1.0
+
+
+# ========== Connections ==========
+
+def read_config(config_file, section='mysql'):
+    parser = ConfigParser()
+    if not parser.read(config_file):
+        raise Exception(f"Configuration file '{config_file}' doesn't exist.")
+    if not parser.has_section(section):
+        raise Exception(f'Section [{section}] missing in config file {config_file}')
+    return dict(parser.items(section))
+
+
+def connect(config, database=None):
+    """
+    Connect with the ini settings but to another database (or none).
+    """
+    settings = {key: value for key, value in config.items() if key != 'database'}
+    if database:
+        settings['database'] = database
+    return MySQLConnection(**settings)
+
+
+def bench_database(config, scale):
+    return f"{config['database']}_bench{scale}x"
+
+
+def recreate_database(config, name):
+    conn = connect(config)
+    cursor = conn.cursor()
+    cursor.execute(f'DROP DATABASE IF EXISTS {name}')
+    cursor.execute(f'CREATE DATABASE {name}')
+    cursor.close()
+    conn.close()
+
+
+# ========== Seeding ==========
+
+def generate_data(scale):
+    """
+    Run the generator once per scale factor; the CSV files are reused on
+    later runs.
+    """
+    data_dir = os.path.join(DATA_DIR, f'scale_{scale}')
+    if not os.path.isfile(os.path.join(data_dir, 'grade_details.csv')):
+        print(f"Generating data at {scale}x into {data_dir}")
+        subprocess.run(
+            [sys.executable, os.path.join(DATASET_DIR, 'data.py'), '--scale', str(scale), '--out', data_dir],
+            check=True
+        )
+    return data_dir
+
+
+def _create_table_notebook():
+    with open(os.path.join(DATASET_DIR, 'Create_Table.ipynb'), encoding='utf-8') as f:
+        cells = json.load(f)['cells']
+    for cell in cells:
+        if cell['cell_type'] == 'code':
+            try:
+                yield ast.parse(''.join(cell['source']))
+            except SyntaxError:
+                continue
+
+
+def create_table_statements():
+    """
+    The create_table_query list from Create_Table.ipynb, so the benchmark
+    always uses the current schema.
+    """
+    for tree in _create_table_notebook():
+        for node in tree.body:
+            if (isinstance(node, ast.Assign) and isinstance(node.value, ast.List)
+                    and any(getattr(t, 'id', None) == 'create_table_query' for t in node.targets)):
+                return [element.value for element in node.value.elts]
+    raise Exception('create_table_query not found in Create_Table.ipynb')
+
+
+def derived_table_statements():
+    """
+    INSERT ... SELECT statements Create_Table.ipynb runs after the CSV load
+    (currently the student_course_grade build).
+    """
+    return [sql for tree in _create_table_notebook() for sql in execute_strings(tree)
+            if sql.lstrip().upper().startswith('INSERT INTO')]
+
+
+def load_csv(cursor, path, table, columns):
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        batch, insert = [], None
+        for row in reader:
+            if columns:
+                row = [row[i] for i in columns]
+            row = [value if value != '' else None for value in row]
+            if insert is None:
+                insert = f"INSERT INTO {table} VALUES ({', '.join(['%s'] * len(row))})"
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany(insert, batch)
+                batch = []
+        if batch:
+            cursor.executemany(insert, batch)
+
+
+def seed_operational(config, scale, data_dir):
+    name = bench_database(config, scale)
+    recreate_database(config, name)
+    conn = connect(config, name)
+    cursor = conn.cursor()
+    cursor.execute('SET FOREIGN_KEY_CHECKS=0')
+
+    for statement in create_table_statements():
+        cursor.execute(statement)
+    for csv_file, table, columns in CSV_TABLES:
+        start = time.perf_counter()
+        load_csv(cursor, os.path.join(data_dir, csv_file), table, columns)
+        conn.commit()
+        print(f"  {table:<32} loaded in {time.perf_counter() - start:.1f}s")
+    for statement in derived_table_statements():
+        cursor.execute(statement)
+
+    cursor.execute('SET FOREIGN_KEY_CHECKS=1')
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return name
+
+
+def _etl_config(config, database):
+    return {'user': config['user'], 'password': config['password'],
+            'host': config['host'], 'database': database}
+
+
+def seed_warehouse(config, wh_config, scale, source_name):
+    """
+    Build the star schema and run the full ETL from the seeded operational
+    database.
+    """
+    if ANALYTICAL_DIR not in sys.path:
+        sys.path.append(ANALYTICAL_DIR)
+    from create_StarSchema import create_star_schema
+    from ETL import ETLProcessor
+
+    name = bench_database(wh_config, scale)
+    recreate_database(wh_config, name)
+    conn = connect(wh_config, name)
+    cursor = conn.cursor()
+    create_star_schema(cursor)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    ETLProcessor(_etl_config(config, source_name), _etl_config(wh_config, name)).run_full_etl()
+    return name
+
+
+def install_procedures(conn, procedures):
+    cursor = conn.cursor()
+    for procedure in procedures:
+        cursor.execute(f'DROP PROCEDURE IF EXISTS {procedure.name}')
+        cursor.execute(procedure.create_sql)
+    conn.commit()
+    cursor.close()
+
+
+def split_procedures(procedures):
+    """
+    Returns (operational, warehouse) lists of StoredProcedure.
+    """
+    operational, warehouse = [], []
+    for procedure in procedures.values():
+        folder = os.path.basename(os.path.dirname(procedure.notebook))
+        (warehouse if folder in WAREHOUSE_FOLDERS else operational).append(procedure)
+    return operational, warehouse
+
+
+# ========== Argument sampling ==========
+
+def _random_ids(cursor, table, column, count, rng):
+    cursor.execute(f'SELECT MIN({column}), MAX({column}) FROM {table}')
+    low, high = cursor.fetchone()
+    return [rng.randint(low, high) for _ in range(count)]
+
+
+def sample_operational(conn, samples, rng):
+    """
+    Coherent argument sets: a student, one of their teachers and classes,
+    the student's and a guardian's usernames and a day they have attendance.
+    """
+    cursor = conn.cursor()
+    argument_sets = []
+
+    for sid in _random_ids(cursor, 'student', 'student_id', samples * 3, rng):
+        cursor.execute(
+            """
+            SELECT teaches.teacher_id, t.user_id, teaches.course_id, s.grade_level,
+                   su.username, gu.username
+            FROM student s
+            JOIN teaches ON teaches.homeroom_id = s.homeroom_id
+                AND teaches.school_id = s.school_id
+                AND teaches.grade_level = s.grade_level
+            JOIN teacher t ON t.teacher_id = teaches.teacher_id
+            JOIN users su ON su.user_id = s.user_id
+            JOIN guardian_student_relationship gsr ON gsr.student_id = s.student_id
+            JOIN guardian g ON g.guardian_id = gsr.guardian_id
+            JOIN users gu ON gu.user_id = g.user_id
+            WHERE s.student_id = %s
+                AND s.grade_level <> 'K'
+            LIMIT 1
+            """,
+            (sid,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            continue
+        tid, uid, cid, grade, student_username, guardian_username = row
+
+        cursor.execute('SELECT date FROM attendance WHERE student_id = %s', (sid,))
+        dates = [r[0] for r in cursor.fetchall()]
+        if not dates:
+            continue
+        day = rng.choice(dates)
+
+        argument_sets.append({
+            'tid': tid, 'uid': uid, 'cid': cid, 'grade': int(grade), 'sid': sid, 'sID': sid,
+            'sUserName': student_username, 'gUserName': guardian_username, 'date': day,
+            # write procedures
+            'student_id': sid, 'course_id': cid, 'teacher_id': tid,
+            'grade_type': rng.choice(GRADE_TYPES), 'score': rng.randint(50, 100), 'weight': 0.05,
+            'status': 'present', 'notes': None,
+        })
+        if len(argument_sets) == samples:
+            break
+
+    cursor.close()
+    return argument_sets
+
+
+def sample_warehouse(conn, samples, rng):
+    """
+    School, grade level and date combinations that have attendance facts.
+    Each lookup filters on the partition key and stops at the first match,
+    so sampling stays cheap on a large fact table.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT date_id FROM date_dim
+        WHERE is_school_day
+            AND date_id BETWEEN (SELECT MIN(date_id) FROM student_attendance_fact)
+                            AND (SELECT MAX(date_id) FROM student_attendance_fact)
+        """
+    )
+    date_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute('SELECT school_id FROM school_dim')
+    school_ids = [row[0] for row in cursor.fetchall()]
+    argument_sets = []
+
+    for _ in range(samples * 3):
+        school_id = rng.choice(school_ids)
+        cursor.execute(
+            """
+            SELECT f.grade_level, FROM_DAYS(f.date_id)
+            FROM student_attendance_fact f
+            WHERE f.date_id = %s
+                AND f.school_id = %s
+            LIMIT 1
+            """,
+            (rng.choice(date_ids), school_id)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            continue
+        grade_level, day = row
+        argument_sets.append({
+            'schoolId': school_id, 'gradeLevel': grade_level, 'gradeType': rng.choice(GRADE_TYPES),
+            'date': day.strftime('%Y-%m-%d'), 'date_input': day.strftime('%Y-%m-%d'),
+        })
+        if len(argument_sets) == samples:
+            break
+
+    cursor.close()
+    return argument_sets
+
+
+# ========== Measuring ==========
+
+def handler_reads(cursor):
+    """
+    Rows the server has read in this session, summed over Handler_read_*.
+    """
+    cursor.execute("SHOW SESSION STATUS LIKE 'Handler_read%'")
+    return sum(int(value) for _, value in cursor.fetchall())
+
+
+def table_sizes(conn):
+    """
+    {table: {'rows', 'data_bytes', 'index_bytes'}} for the connection's
+    database, from InnoDB's statistics after refreshing them
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT table_name FROM information_schema.tables "
+                   "WHERE table_schema = DATABASE() AND table_type = 'BASE TABLE'")
+    tables = [row[0] for row in cursor.fetchall()]
+    for table in tables:
+        cursor.execute(f'ANALYZE TABLE {table}')
+        cursor.fetchall()
+    cursor.execute("SELECT table_name, table_rows, data_length, index_length FROM information_schema.tables "
+                   "WHERE table_schema = DATABASE() AND table_type = 'BASE TABLE' ORDER BY table_name")
+    sizes = {table: {'rows': rows, 'data_bytes': data, 'index_bytes': index}
+             for table, rows, data, index in cursor.fetchall()}
+    cursor.close()
+    return sizes
+
+
+def print_table_sizes(sizes):
+    print(f"  {'table':<40} {'rows':>12} {'data MiB':>10} {'index MiB':>10}")
+    for table, size in sizes.items():
+        print(f"  {table:<40} {size['rows']:>12} {size['data_bytes'] / 1048576:>10.1f} "
+              f"{size['index_bytes'] / 1048576:>10.1f}")
+
+
+def percentiles(values):
+    if len(values) == 1:
+        return values[0], values[0], values[0]
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return cuts[49], cuts[94], cuts[98]
+
+
+def benchmark_procedure(conn, procedure, argument_sets, repeat):
+    """
+    Call the procedure repeat times per argument set. Write procedures run
+    inside a transaction that is rolled back afterwards.
+    """
+    cursor = conn.cursor()
+    status = conn.cursor()
+
+    # SHOW STATUS reads a few rows itself; measure that once and subtract it
+    before = handler_reads(status)
+    overhead = handler_reads(status) - before
+
+    latencies, examined, returned, errors = [], [], [], 0
+    for arguments in argument_sets:
+        if any(name not in arguments for name in procedure.param_names):
+            continue
+        args = tuple(arguments[name] for name in procedure.param_names)
+
+        for _ in range(repeat):
+            before = handler_reads(status)
+            start = time.perf_counter()
+            try:
+                cursor.callproc(procedure.name, args)
+                rows = sum(len(result.fetchall()) for result in cursor.stored_results())
+            except Exception:
+                errors += 1
+                conn.rollback()
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            examined.append(max(handler_reads(status) - before - overhead, 0))
+            returned.append(rows)
+            if procedure.is_write:
+                conn.rollback()
+
+    cursor.close()
+    status.close()
+
+    if not latencies:
+        return None
+    p50, p95, p99 = percentiles(latencies)
+    return {
+        'procedure': procedure.name,
+        'calls': len(latencies),
+        'errors': errors,
+        'p50_ms': round(p50, 3),
+        'p95_ms': round(p95, 3),
+        'p99_ms': round(p99, 3),
+        'rows_examined': round(statistics.mean(examined), 1),
+        'rows_returned': round(statistics.mean(returned), 1),
+    }
+
+
+def run_group(conn, procedures, argument_sets, repeat, scale, include_writes):
+    results = []
+    for procedure in procedures:
+        if procedure.is_write and not include_writes:
+            continue
+        result = benchmark_procedure(conn, procedure, argument_sets, repeat)
+        if result is None:
+            print(f"  {procedure.name:<40} no usable argument sets")
+            continue
+        result['scale'] = scale
+        results.append(result)
+        print(f"  {procedure.name:<40} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+              f"{result['p99_ms']:>9.2f} {result['rows_examined']:>12.0f} {result['rows_returned']:>9.0f}")
+    return results
+
+
+# ========== Results ==========
+
+FIELDS = ['scale', 'procedure', 'calls', 'errors', 'p50_ms', 'p95_ms', 'p99_ms',
+          'rows_examined', 'rows_returned']
+
+
+def latest_results():
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')))
+    return files[-1] if files else None
+
+
+def save_results(results, table_sizes=None):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(RESULTS_DIR, f'{stamp}.json')
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'created': stamp, 'results': results, 'table_sizes': table_sizes or {}}, f, indent=1)
+    with open(path[:-len('.json')] + '.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+    print(f"\nResults saved to {path}")
+    return path
+
+
+def compare_results(previous_path, current_path, threshold=REGRESSION_THRESHOLD):
+    """
+    Print p95 and warehouse table size changes between two result files and
+    return the regressions.
+    """
+    def load(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    previous_run, current_run = load(previous_path), load(current_path)
+    previous = {(r['scale'], r['procedure']): r for r in previous_run['results']}
+    current = {(r['scale'], r['procedure']): r for r in current_run['results']}
+    regressions = []
+
+    print(f"\nCompared with {os.path.basename(previous_path)}:")
+    print(f"  {'scale':>5} {'procedure':<40} {'p95 before':>10} {'p95 now':>10} {'change':>8}")
+    for key in sorted(current):
+        if key not in previous:
+            continue
+        before, now = previous[key]['p95_ms'], current[key]['p95_ms']
+        change = (now - before) / before if before else 0.0
+        flag = ''
+        if change > threshold and now > REGRESSION_FLOOR_MS:
+            flag = '  REGRESSION'
+            regressions.append(key)
+        print(f"  {key[0]:>4}x {key[1]:<40} {before:>10.2f} {now:>10.2f} {change:>+7.0%}{flag}")
+
+    if not regressions:
+        print("  No regressions.")
+
+    previous_sizes = previous_run.get('table_sizes', {})
+    current_sizes = current_run.get('table_sizes', {})
+    if any(scale in previous_sizes for scale in current_sizes):
+        print(f"\n  {'scale':>5} {'table':<40} {'MiB before':>10} {'MiB now':>10} {'change':>8}")
+    for scale, tables in current_sizes.items():
+        for table, size in tables.items():
+            before = previous_sizes.get(scale, {}).get(table)
+            if before is None:
+                continue
+            before_bytes = before['data_bytes'] + before['index_bytes']
+            now_bytes = size['data_bytes'] + size['index_bytes']
+            change = (now_bytes - before_bytes) / before_bytes if before_bytes else 0.0
+            print(f"  {scale:>4}x {table:<40} {before_bytes / 1048576:>10.1f} {now_bytes / 1048576:>10.1f} "
+                  f"{change:>+7.0%}")
+    return regressions
+
+
+# ========== Commands ==========
+
+def seed(options):
+    config = read_config(options.config)
+    wh_config = read_config(options.wh_config)
+    for scale in options.scales:
+        print(f"\n=== Seeding {scale}x")
+        data_dir = generate_data(scale)
+        name = seed_operational(config, scale, data_dir)
+        if not options.no_warehouse:
+            seed_warehouse(config, wh_config, scale, name)
+
+
+def run(options):
+    config = read_config(options.config)
+    wh_config = read_config(options.wh_config)
+    procedures = load_procedures()
+    if options.only:
+        wanted = set(options.only.split(','))
+        procedures = {name: p for name, p in procedures.items() if name in wanted}
+    operational, warehouse = split_procedures(procedures)
+    rng = random.Random(options.seed)
+    results = []
+    sizes = {}
+
+    for scale in options.scales:
+        groups = [(config, operational, sample_operational)]
+        if not options.no_warehouse:
+            groups.append((wh_config, warehouse, sample_warehouse))
+
+        for group_config, group, sampler in groups:
+            if not group:
+                continue
+            name = bench_database(group_config, scale)
+            print(f"\n=== {name} ({len(group)} procedures)")
+            print(f"  {'procedure':<40} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+                  f"{'rows read':>12} {'returned':>9}")
+            conn = connect(group_config, name)
+            try:
+                install_procedures(conn, group)
+                argument_sets = sampler(conn, options.samples, rng)
+                results.extend(run_group(conn, group, argument_sets, options.repeat,
+                                         scale, options.include_writes))
+                if group is warehouse:
+                    sizes[str(scale)] = table_sizes(conn)
+                    print()
+                    print_table_sizes(sizes[str(scale)])
+            finally:
+                conn.close()
+
+    previous = latest_results()
+    path = save_results(results, sizes)
+    if previous and compare_results(previous, path, options.threshold):
+        raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the stored procedures at several district sizes")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    for command in ('seed', 'run'):
+        sub = commands.add_parser(command)
+        sub.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES))
+        sub.add_argument('--config', default=os.path.join(QUERIES_DIR, 'Teacher', 'sheql.ini'),
+                         help="ini file of the operational database server")
+        sub.add_argument('--wh-config', default=os.path.join(QUERIES_DIR, 'District', 'sheql_wh.ini'),
+                         help="ini file of the warehouse database server")
+        sub.add_argument('--no-warehouse', action='store_true', help="skip the warehouse and District procedures")
+
+    run_parser = commands.choices['run']
+    run_parser.add_argument('--samples', type=int, default=20, help="argument sets per procedure")
+    run_parser.add_argument('--repeat', type=int, default=3, help="calls per argument set")
+    run_parser.add_argument('--seed', type=int, default=201)
+    run_parser.add_argument('--only', help="comma separated procedure names")
+    run_parser.add_argument('--include-writes', action='store_true',
+                            help="also time the write procedures (rolled back after each call)")
+    run_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                            help="p95 growth that counts as a regression")
+
+    compare_parser = commands.add_parser('compare')
+    compare_parser.add_argument('previous')
+    compare_parser.add_argument('current')
+
+    options = parser.parse_args()
+    if options.command == 'seed':
+        seed(options)
+    elif options.command == 'run':
+        run(options)
+    else:
+        compare_results(options.previous, options.current)
+
+
+if __name__ == "__main__":
+    main()
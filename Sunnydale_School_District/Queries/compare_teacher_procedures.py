@@ -0,0 +1,663 @@
+#--------------------------------------------------------#
+# Compare the roster-first teacher procedures with the   #
+# course-wide versions they replaced                     #
+#--------------------------------------------------------#
+"""
+The teacher procedures used to join grade_details and takes on course_id
+alone, reading every grade for the course across the district before
+filtering down to the teacher's homerooms. They now start from the
+teacher's roster (DISTINCT rows of teaches) and look grades up by
+(student_id, course_id).
+
+This script installs the old definitions next to the current ones as
+legacy_<name>, calls both with arguments sampled from the database, checks
+that they return the same rows and prints the median latency of each. The
+procedures in CHANGED_PROCEDURES return different rows on purpose, so they
+are only timed. The script exits with 1 if any other procedure disagrees.
+Point it at a database seeded at 10x scale to see the difference:
+
+    python compare_teacher_procedures.py --config Teacher/sheql.ini
+    python compare_teacher_procedures.py --config bench_10x.ini --samples 50
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import time
+
+from procedures import QUERIES_DIR, load_procedures
+
+# Definitions from before the roster-first rewrite, installed as legacy_<name>
+LEGACY_PROCEDURES = {
+    'teacher_one_class_all_students': """
+        CREATE PROCEDURE teacher_one_class_all_students(
+            IN tid INT,
+            IN cid INT,
+            IN grade INT
+        )
+        BEGIN
+            SELECT
+                t.teacher_id AS "Teacher ID",
+                s.student_id AS "Student ID",
+                s.school_id AS "School ID",
+                s.user_id AS "Student User ID",
+                CONCAT(s.first_name, " ", s.last_name) AS "Student Name",
+                c.course_id AS "Course ID",
+                c.name AS "Course Name",
+                s.grade_level AS "Grade"
+            FROM teacher t
+            JOIN teaches USING (teacher_id)
+            JOIN course c USING (course_id)
+            JOIN takes USING (course_id)
+            JOIN student s USING (student_id)
+            WHERE teaches.teacher_id = tid
+                AND teaches.course_id = cid
+                AND teaches.grade_level = s.grade_level
+                AND teaches.school_id = s.school_id
+                AND teaches.homeroom_id = s.homeroom_id
+                AND s.grade_level = grade
+            GROUP BY t.teacher_id,
+                s.student_id,
+                s.user_id,
+                s.first_name,
+                s.last_name,
+                c.course_id,
+                c.name
+            ORDER BY s.grade_level, s.last_name, s.first_name, s.student_id;
+        END
+    """,
+    'teacher_one_class_student_count': """
+        CREATE PROCEDURE teacher_one_class_student_count(
+            IN tid INT,
+            IN cid INT,
+            IN grade INT
+        )
+        BEGIN
+            SELECT
+                COUNT(DISTINCT s.student_id) AS "Student Count"
+            FROM teacher t
+            JOIN teaches USING (teacher_id)
+            JOIN course c USING (course_id)
+            JOIN takes USING (course_id)
+            JOIN student s USING (student_id)
+            WHERE teaches.teacher_id = tid
+                AND teaches.course_id = cid
+                AND teaches.grade_level = s.grade_level
+                AND teaches.school_id = s.school_id
+                AND teaches.homeroom_id = s.homeroom_id
+                AND s.grade_level = grade;
+        END
+    """,
+    'teacher_all_students': """
+         CREATE PROCEDURE teacher_all_students(
+             IN tid INT
+         )
+        BEGIN
+             SELECT
+                 t.teacher_id AS "Teacher ID",
+                 s.student_id AS "Student ID",
+                 s.user_id AS "Student User ID",
+                 s.school_id AS "School ID",
+                 CONCAT(s.first_name, " ", s.last_name) AS "Student Name",
+                 c.course_id AS "Course ID",
+                 c.name AS "Course Name",
+                 s.grade_level AS "Grade_Level"
+             FROM teacher t
+             JOIN teaches USING (teacher_id)
+             JOIN course c USING (course_id)
+             JOIN takes USING (course_id)
+             JOIN student s USING (student_id)
+             WHERE teaches.teacher_id = tid
+                 AND teaches.course_id = takes.course_id
+                 AND teaches.homeroom_id = s.homeroom_id
+                 AND teaches.school_id = s.school_id
+                 AND teaches.grade_level = s.grade_level
+             GROUP BY t.teacher_id,
+                 s.student_id,
+                 s.user_id,
+                 s.first_name,
+                 s.last_name,
+                 c.course_id,
+                 c.name
+             ORDER BY c.course_id, s.grade_level, s.last_name, s.first_name, s.student_id;
+         END
+    """,
+    'teacher_one_student_all_grades': """
+        CREATE PROCEDURE teacher_one_student_all_grades(
+            IN tid INT,
+            IN sid INT
+        )
+        BEGIN
+            SELECT
+                s.student_id AS "Student ID",
+                CONCAT(s.first_name, " ", s.last_name) AS "Student Name",
+                c.course_id AS "Course ID",
+                c.name AS "Course Name",
+                gd.grade_type AS "Assignment",
+                gd.score AS "Score",
+                CASE
+                    WHEN gd.score >= 90 THEN "A"
+                    WHEN gd.score >= 80 THEN "B"
+                    WHEN gd.score >= 70 THEN "C"
+                    WHEN gd.score >= 60 THEN "D"
+                    ELSE "F"
+                END AS "Letter Grade"
+            FROM teacher t
+            JOIN teaches USING (teacher_id)
+            JOIN course c USING (course_id)
+            JOIN grade_details gd USING (course_id)
+            JOIN takes USING (student_id)
+            JOIN student s USING (student_id)
+            WHERE teaches.teacher_id = tid
+                AND teaches.course_id = takes.course_id
+                AND teaches.homeroom_id = s.homeroom_id
+                AND teaches.school_id = s.school_id
+                AND teaches.grade_level = s.grade_level
+                AND s.student_id = sid
+            GROUP BY s.student_id,
+                s.first_name,
+                s.last_name,
+                c.course_id,
+                c.name,
+                gd.grade_type,
+                gd.score
+            ORDER BY c.course_id;
+        END
+    """,
+    'teacher_one_student_one_class_grades': """
+        CREATE PROCEDURE teacher_one_student_one_class_grades(
+            IN tid INT,
+            IN sid INT,
+            IN cid INT
+        )
+        BEGIN
+            SELECT
+                gd.grade_type AS "Assignment",
+                gd.score AS "Score",
+                gd.weight AS "Weight",
+                CASE
+                    WHEN gd.score >= 90 THEN "A"
+                    WHEN gd.score >= 80 THEN "B"
+                    WHEN gd.score >= 70 THEN "C"
+                    WHEN gd.score >= 60 THEN "D"
+                    ELSE "F"
+                END AS "Letter Grade"
+            FROM teacher t
+            JOIN teaches USING (teacher_id)
+            JOIN course c USING (course_id)
+            JOIN grade_details gd USING (course_id)
+            JOIN takes USING (student_id)
+            JOIN student s USING (student_id)
+            WHERE teaches.teacher_id = tid
+                AND teaches.course_id = takes.course_id
+                AND teaches.homeroom_id = s.homeroom_id
+                AND teaches.school_id = s.school_id
+                AND teaches.grade_level = s.grade_level
+                AND s.student_id = sid
+                AND c.course_id = cid
+            GROUP BY
+                gd.grade_type,
+                gd.score,
+                gd.weight;
+        END
+    """,
+    'teacher_one_class_grade_counts': """
+        CREATE PROCEDURE teacher_one_class_grade_counts(
+            IN tid INT,
+            IN cid INT,
+            IN grade INT
+        )
+        BEGIN
+            WITH student_grades AS (
+            SELECT
+                s.student_id,
+                ROUND(SUM(gd.score * gd.weight) / SUM(gd.weight), 2) AS weighted_average
+            FROM teacher t
+            JOIN teaches USING (teacher_id)
+            JOIN course c USING (course_id)
+            JOIN grade_details gd USING (course_id)
+            JOIN takes USING (student_id)
+            JOIN student s USING (student_id)
+            WHERE teaches.teacher_id = tid
+                AND teaches.course_id = takes.course_id
+                AND teaches.homeroom_id = s.homeroom_id
+                AND teaches.school_id = s.school_id
+                AND teaches.grade_level = s.grade_level
+                AND c.course_id = cid
+                AND teaches.grade_level = grade
+            GROUP BY s.student_id
+        ),
+        letter_grades AS (
+            SELECT
+                CASE
+                    WHEN weighted_average >= 90 THEN 'A'
+                    WHEN weighted_average >= 80 THEN 'B'
+                    WHEN weighted_average >= 70 THEN 'C'
+                    WHEN weighted_average >= 60 THEN 'D'
+                    ELSE 'F'
+                END AS letter_grade
+            FROM student_grades
+        )
+        SELECT
+            letter_grade AS "Letter Grade",
+            COUNT(*) AS "Grade Count"
+        FROM letter_grades
+        GROUP BY letter_grade
+        ORDER BY letter_grade;
+        END
+    """,
+    'teacher_one_student_weighted_grade': """
+        CREATE PROCEDURE teacher_one_student_weighted_grade(
+            IN tid INT,
+            IN sid INT,
+            IN cid INT
+        )
+        BEGIN
+            WITH student_grades AS (
+            SELECT
+                  ROUND(SUM(gd.score * gd.weight) / SUM(gd.weight), 2) AS weighted_average
+            FROM teacher t
+            JOIN teaches USING (teacher_id)
+            JOIN course c USING (course_id)
+            JOIN grade_details gd USING (course_id)
+            JOIN takes USING (student_id)
+            JOIN student s USING (student_id)
+            WHERE teaches.teacher_id = tid
+                AND teaches.course_id = takes.course_id
+                AND teaches.homeroom_id = s.homeroom_id
+                AND teaches.school_id = s.school_id
+                AND teaches.grade_level = s.grade_level
+                AND s.student_id = sid
+                AND c.course_id = cid
+            GROUP BY c.course_id, c.name
+        )
+        SELECT
+            weighted_average AS "Weighted Average",
+            CASE
+                WHEN weighted_average >= 90 THEN 'A'
+                WHEN weighted_average >= 80 THEN 'B'
+                WHEN weighted_average >= 70 THEN 'C'
+                WHEN weighted_average >= 60 THEN 'D'
+                ELSE 'F'
+            END AS "Letter Grade"
+            FROM student_grades;
+        END
+    """,
+    'teacher_class_attendance_dates': """
+        CREATE PROCEDURE teacher_class_attendance_dates(
+            IN tid INT,
+            IN cid INT
+        )
+        BEGIN
+            SELECT
+                a.date AS "Date"
+            FROM teacher t
+            JOIN teaches USING (teacher_id)
+            JOIN course c USING (course_id)
+            JOIN takes USING (course_id)
+            JOIN student s USING (student_id)
+            JOIN attendance a USING (student_id)
+            WHERE teaches.teacher_id = tid
+                AND teaches.course_id = cid
+                AND a.date = date
+                AND teaches.grade_level = s.grade_level
+                AND teaches.school_id = s.school_id
+                AND teaches.homeroom_id = s.homeroom_id
+                AND teaches.course_id = takes.course_id
+            GROUP BY a.date
+            ORDER BY a.date;
+        END
+    """,
+    'teacher_class_attendance_by_date': """
+        CREATE PROCEDURE teacher_class_attendance_by_date(
+            IN tid INT,
+            IN date DATE
+        )
+        BEGIN
+            SELECT DISTINCT
+                s.student_id AS "Student ID",
+                s.last_name AS "Last Name",
+                s.first_name AS "First Name",
+                a.status AS "Status",
+                a.notes AS "Notes"
+            FROM teacher t
+            JOIN teaches USING (teacher_id)
+            JOIN course c USING (course_id)
+            JOIN takes USING (course_id)
+            JOIN student s USING (student_id)
+            JOIN attendance a USING (student_id)
+            WHERE teaches.teacher_id = tid
+                AND a.date = date
+                AND teaches.grade_level = s.grade_level
+                AND teaches.school_id = s.school_id
+                AND teaches.homeroom_id = s.homeroom_id
+                AND teaches.course_id = takes.course_id
+            GROUP BY t.teacher_id,
+                s.student_id,
+                s.first_name,
+                s.last_name,
+                c.course_id,
+                a.date,
+                a.status,
+                a.notes
+            ORDER BY s.last_name, s.first_name, s.student_id;
+        END
+    """,
+    'teacher_attendance_counts_by_date': """
+        CREATE PROCEDURE teacher_attendance_counts_by_date(
+            IN tid INT,
+            IN date DATE
+        )
+        BEGIN
+            SELECT
+                a.status AS "Status",
+                COUNT(DISTINCT a.student_id) AS "Attendance Count"
+            FROM teacher t
+            JOIN teaches USING (teacher_id)
+            JOIN course c USING (course_id)
+            JOIN takes USING (course_id)
+            JOIN student s USING (student_id)
+            JOIN attendance a USING (student_id)
+            WHERE teaches.teacher_id = tid
+                AND a.date = date
+                AND teaches.grade_level = s.grade_level
+                AND teaches.school_id = s.school_id
+                AND teaches.homeroom_id = s.homeroom_id
+                AND teaches.course_id = takes.course_id
+            GROUP BY a.status
+            ORDER BY a.status;
+        END
+    """,
+    'teacher_all_classes_all_guardians': """
+        CREATE PROCEDURE teacher_all_classes_all_guardians(
+            IN tid INT
+        )
+        BEGIN
+            SELECT
+                t.teacher_id AS "Teacher ID",
+                s.student_id AS "Student ID",
+                CONCAT(s.first_name, " ", s.last_name) AS "Student Name",
+                CONCAT(g.first_name, " ", g.last_name) AS "Guardian Name",
+                gsr.relationship AS "Relationship to Student",
+                g.phone_number AS "Guardian Phone Number"
+            FROM teacher t
+            JOIN teaches USING (teacher_id)
+            JOIN course c USING (course_id)
+            JOIN grade_details gd USING (course_id)
+            JOIN takes USING (student_id)
+            JOIN student s USING (student_id)
+            JOIN guardian_student_relationship gsr USING (student_id)
+            JOIN guardian g USING (guardian_id)
+            WHERE teaches.teacher_id = tid
+                AND teaches.course_id = takes.course_id
+                AND teaches.homeroom_id = s.homeroom_id
+                AND teaches.school_id = s.school_id
+                AND teaches.grade_level = s.grade_level
+            GROUP BY t.teacher_id,
+                s.student_id,
+                s.first_name,
+                s.last_name,
+                g.first_name,
+                g.last_name,
+                gsr.relationship,
+                g.phone_number
+            ORDER BY s.last_name, s.first_name;
+        END
+    """,
+    'teacher_one_class_all_guardians': """
+        CREATE PROCEDURE teacher_one_class_all_guardians(
+            IN tid INT,
+            IN cid INT
+        )
+        BEGIN
+            SELECT
+                t.teacher_id AS "Teacher ID",
+                s.student_id AS "Student ID",
+                c.course_id AS "Course ID",
+                CONCAT(s.first_name, " ", s.last_name) AS "Student Name",
+                CONCAT(g.first_name, " ", g.last_name) AS "Guardian Name",
+                gsr.relationship AS "Relationship to Student",
+                g.phone_number AS "Guardian Phone Number"
+            FROM teacher t
+            JOIN teaches USING (teacher_id)
+            JOIN course c USING (course_id)
+            JOIN grade_details gd USING (course_id)
+            JOIN takes USING (student_id)
+            JOIN student s USING (student_id)
+            JOIN guardian_student_relationship gsr USING (student_id)
+            JOIN guardian g USING (guardian_id)
+            WHERE teaches.teacher_id = tid
+                AND teaches.course_id = takes.course_id
+                AND teaches.homeroom_id = s.homeroom_id
+                AND teaches.school_id = s.school_id
+                AND teaches.grade_level = s.grade_level
+                AND c.course_id = cid
+            GROUP BY t.teacher_id,
+                s.student_id,
+                c.course_id,
+                s.first_name,
+                s.last_name,
+                g.first_name,
+                g.last_name,
+                gsr.relationship,
+                g.phone_number
+            ORDER BY s.last_name, s.first_name;
+        END
+    """,
+    'teacher_one_student_all_guardians': """
+        CREATE PROCEDURE teacher_one_student_all_guardians(
+            IN tid INT,
+            IN sid INT
+        )
+
+        BEGIN
+            SELECT
+                g.first_name AS "First Name",
+                g.last_name AS "Last Name",
+                g.phone_number AS "Guardian Phone Number",
+                u.email AS "Guardian Email",
+                gsr.relationship AS "Relationship to Student"
+            FROM teacher t
+            JOIN teaches USING (teacher_id)
+            JOIN course c USING (course_id)
+            JOIN grade_details gd USING (course_id)
+            JOIN student s USING (student_id)
+            JOIN guardian_student_relationship gsr USING (student_id)
+            JOIN guardian g USING (guardian_id)
+            JOIN users u ON u.user_id = g.user_id
+            WHERE t.teacher_id = tid
+                AND s.grade_level = teaches.grade_level
+                AND s.school_id = t.school_id
+                AND s.student_id = sid
+                AND u.user_id = g.user_id
+            GROUP BY t.teacher_id,
+                g.first_name,
+                g.last_name,
+                gsr.relationship,
+                g.phone_number,
+                u.email;
+        END
+    """,
+}
+
+
+# Procedures whose results the rewrite changed on purpose, with the reason.
+# They are installed and timed like the others, but not expected to match.
+CHANGED_PROCEDURES = {
+    'teacher_class_attendance_dates':
+        "the legacy filter a.date = date has no date parameter and compares the column with itself",
+    'teacher_all_classes_all_guardians': "guardians are listed before the student has a grade",
+    'teacher_one_class_all_guardians': "guardians are listed before the student has a grade",
+    'teacher_one_student_all_guardians':
+        "guardians are listed before the student has a grade, for students on the teacher's roster only",
+}
+
+
+def legacy_name(name):
+    return 'legacy_' + name
+
+
+def install(cursor, name, create_sql):
+    cursor.execute(f'DROP PROCEDURE IF EXISTS {name}')
+    cursor.execute(create_sql)
+
+
+def install_procedures(conn, current):
+    """
+    Create the current definitions (as in teacher.ipynb) and the legacy ones
+    side by side.
+    """
+    cursor = conn.cursor()
+    for name, create_sql in LEGACY_PROCEDURES.items():
+        install(cursor, name, current[name].create_sql)
+        legacy_sql = re.sub(r'CREATE\s+PROCEDURE\s+' + name + r'\b',
+                            'CREATE PROCEDURE ' + legacy_name(name), create_sql)
+        install(cursor, legacy_name(name), legacy_sql)
+    conn.commit()
+    cursor.close()
+
+
+def drop_legacy(conn):
+    cursor = conn.cursor()
+    for name in LEGACY_PROCEDURES:
+        cursor.execute(f'DROP PROCEDURE IF EXISTS {legacy_name(name)}')
+    conn.commit()
+    cursor.close()
+
+
+def sample_rosters(conn, samples, seed):
+    """
+    Pick (tid, cid, grade, sid) combinations from real class rosters and a
+    set of attendance dates, so every call has something to return.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT DISTINCT teaches.teacher_id, teaches.course_id, teaches.grade_level, s.student_id
+        FROM teaches
+        JOIN student s ON s.homeroom_id = teaches.homeroom_id
+            AND s.school_id = teaches.school_id
+            AND s.grade_level = teaches.grade_level
+        JOIN takes ON takes.student_id = s.student_id
+            AND takes.course_id = teaches.course_id
+        WHERE teaches.grade_level <> 'K'
+        """
+    )
+    rosters = cursor.fetchall()
+    cursor.execute('SELECT DISTINCT date FROM attendance')
+    dates = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+
+    rng = random.Random(seed)
+    rosters = rng.sample(rosters, min(samples, len(rosters)))
+    return [
+        {'tid': tid, 'cid': cid, 'grade': int(grade), 'sid': sid, 'date': rng.choice(dates)}
+        for tid, cid, grade, sid in rosters
+    ]
+
+
+def call(cursor, name, args):
+    cursor.callproc(name, args)
+    rows = []
+    for result in cursor.stored_results():
+        rows.extend(result.fetchall())
+    return rows
+
+
+def same_rows(a, b):
+    """
+    Both procedures must return the same multiset of rows. Order is only
+    compared loosely because ties in ORDER BY may come back either way.
+    """
+    key = lambda row: tuple(str(value) for value in row)
+    return sorted(a, key=key) == sorted(b, key=key)
+
+
+def timed(cursor, name, args, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call(cursor, name, args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def compare(conn, current, samples, repeat):
+    """
+    Returns {name: (mismatches, calls, legacy ms, current ms)} where the
+    latencies are medians over every sampled call. mismatches is None for
+    the CHANGED_PROCEDURES, which are not compared.
+    """
+    cursor = conn.cursor()
+    results = {}
+
+    for name in LEGACY_PROCEDURES:
+        param_names = current[name].param_names
+        mismatches = None if name in CHANGED_PROCEDURES else 0
+        legacy_ms, current_ms = [], []
+
+        for sample in samples:
+            args = tuple(sample[p] for p in param_names)
+            if mismatches is not None and not same_rows(call(cursor, legacy_name(name), args),
+                                                         call(cursor, name, args)):
+                mismatches += 1
+                print(f"  MISMATCH {name}{args}")
+            legacy_ms.append(timed(cursor, legacy_name(name), args, repeat))
+            current_ms.append(timed(cursor, name, args, repeat))
+
+        results[name] = (mismatches, len(samples),
+                         statistics.median(legacy_ms), statistics.median(current_ms))
+
+    cursor.close()
+    return results
+
+
+def print_results(results):
+    print(f"  {'procedure':<40} {'equal':>9} {'legacy ms':>10} {'new ms':>10} {'speedup':>8}")
+    for name, (mismatches, calls, legacy_ms, current_ms) in results.items():
+        speedup = legacy_ms / current_ms if current_ms else float('inf')
+        equal = 'changed' if mismatches is None else f"{calls - mismatches}/{calls}"
+        print(f"  {name:<40} {equal:>9} {legacy_ms:>10.2f} {current_ms:>10.2f} {speedup:>7.1f}x")
+
+
+def mismatched(results):
+    """Names of the compared procedures that returned different rows"""
+    return [name for name, (mismatches, _, _, _) in results.items() if mismatches]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare roster-first teacher procedures with the legacy versions")
+    parser.add_argument('--config', default=os.path.join(QUERIES_DIR, 'Teacher', 'sheql.ini'),
+                        help="ini file of the database to run against")
+    parser.add_argument('--samples', type=int, default=20, help="argument sets per procedure")
+    parser.add_argument('--repeat', type=int, default=5, help="calls per argument set when timing")
+    parser.add_argument('--seed', type=int, default=201)
+    parser.add_argument('--keep', action='store_true', help="leave the legacy_ procedures installed")
+    options = parser.parse_args()
+
+    # only needed against a live server, the comparison itself is plain Python
+    from data201 import db_connection
+
+    current = load_procedures()
+    conn = db_connection(config_file=options.config)
+    try:
+        install_procedures(conn, current)
+        samples = sample_rosters(conn, options.samples, options.seed)
+        print(f"Comparing {len(LEGACY_PROCEDURES)} procedures over {len(samples)} argument sets")
+        results = compare(conn, current, samples, options.repeat)
+        print_results(results)
+        if not options.keep:
+            drop_legacy(conn)
+    finally:
+        conn.close()
+
+    for name, reason in CHANGED_PROCEDURES.items():
+        print(f"  {name}: not compared, {reason}")
+    if mismatched(results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
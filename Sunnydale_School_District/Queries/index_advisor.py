@@ -0,0 +1,305 @@
+#----------------------------------------------------#
+# Index advisor driven by the stored-procedure workload #
+#----------------------------------------------------#
+"""
+Runs EXPLAIN on every stored procedure defined in the Queries notebooks
+(with the arguments the notebooks call them with), flags full table scans,
+filesorts and temporary tables, and proposes a composite index for every
+scanned table from the columns the statement filters and joins it on. With
+--apply the proposed indexes are created and every procedure is timed before
+and after.
+
+    python index_advisor.py                 # report only
+    python index_advisor.py --apply         # create indexes, show timings
+    python index_advisor.py --only teacher_one_class_grade_counts
+"""
+
+import argparse
+import statistics
+import time
+
+from data201 import db_connection
+from procedures import (load_procedures, explainable_statements, table_aliases,
+                        predicate_columns)
+
+# a plan row is worth a look if it reads this many rows even with an index
+ROWS_WARNING = 10000
+
+# MySQL's limit on identifier length
+MAX_INDEX_NAME = 64
+
+
+def explain(cursor, statement):
+    """
+    Run EXPLAIN on the statement and return the plan rows as dictionaries.
+    """
+    cursor.execute('EXPLAIN ' + statement)
+    columns = [c[0] for c in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def explain_analyze(cursor, statement):
+    """
+    EXPLAIN ANALYZE (MySQL 8.0.18+) executes the statement and returns the
+    measured plan tree as text.
+    """
+    cursor.execute('EXPLAIN ANALYZE ' + statement)
+    return '\n'.join(row[0] for row in cursor.fetchall())
+
+
+def plan_problems(plan_row):
+    """
+    List what is wrong with one EXPLAIN row, if anything.
+    """
+    problems = []
+    extra = plan_row.get('Extra') or ''
+    rows = plan_row.get('rows') or 0
+
+    if plan_row.get('type') == 'ALL':
+        problems.append(f'full scan (~{rows} rows)')
+    elif plan_row.get('type') == 'index':
+        problems.append(f'full index scan (~{rows} rows)')
+    elif rows >= ROWS_WARNING:
+        problems.append(f'reads ~{rows} rows')
+    if 'Using filesort' in extra:
+        problems.append('filesort')
+    if 'Using temporary' in extra:
+        problems.append('temporary table')
+    return problems
+
+
+def existing_indexes(cursor, table):
+    """
+    Return the column tuples of every index already on the table.
+    """
+    cursor.execute(
+        """
+        SELECT index_name, column_name
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+        ORDER BY index_name, seq_in_index
+        """,
+        (table,)
+    )
+    indexes = {}
+    for index_name, column_name in cursor.fetchall():
+        indexes.setdefault(index_name, []).append(column_name)
+    return [tuple(columns) for columns in indexes.values()]
+
+
+def table_columns(cursor, table):
+    """
+    Return the names of the table's columns.
+    """
+    cursor.execute(
+        """
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s
+        """,
+        (table,)
+    )
+    return {column_name for column_name, in cursor.fetchall()}
+
+
+def index_columns(statement, alias, columns, bare_names):
+    """
+    The composite index for one table of a statement: the columns it is
+    compared on with equality first, then one range column, since an index
+    cannot seek on the columns after a range.
+    """
+    equality, other = predicate_columns(statement, alias, columns, bare_names)
+    return tuple(equality + other[:1])
+
+
+def index_name(table, columns):
+    return f"idx_{table}_{'_'.join(columns)}"[:MAX_INDEX_NAME]
+
+
+def is_covered(columns, indexes):
+    """
+    An index is redundant if an existing index starts with the same columns.
+    """
+    return any(index[:len(columns)] == tuple(columns) for index in indexes)
+
+
+def propose_indexes(cursor, statement, plan, index_cache):
+    """
+    Propose an index for every table the plan scans (full table or full
+    index scan) from the columns the statement filters and joins it on.
+    Returns a list of (table, index_name, columns, reason).
+    """
+    aliases = table_aliases(statement)
+    proposals = []
+
+    for plan_row in plan:
+        alias = plan_row.get('table') or ''
+        table = aliases.get(alias)
+        if plan_row.get('type') not in ('ALL', 'index') or table is None:
+            continue
+
+        if table not in index_cache:
+            index_cache[table] = (existing_indexes(cursor, table), table_columns(cursor, table))
+        indexes, columns = index_cache[table]
+
+        # a bare column name can only be this table's if it is the only table read
+        only_table = set(aliases.values()) == {table}
+        candidate = index_columns(statement, alias, columns, only_table)
+        if candidate and not is_covered(candidate, indexes):
+            proposals.append((table, index_name(table, candidate), candidate, ', '.join(plan_problems(plan_row))))
+
+    return proposals
+
+
+def time_procedure(conn, procedure, args, repeat):
+    """
+    Call the procedure repeat times and return the median latency in ms.
+    """
+    cursor = conn.cursor()
+    timings = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cursor.callproc(procedure.name, args)
+            for result in cursor.stored_results():
+                result.fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        cursor.close()
+    return statistics.median(timings)
+
+
+def analyse(conn, procedures, analyze=False):
+    """
+    Explain every procedure on one connection. Returns (report, proposals)
+    where proposals maps index_name -> (table, columns, [procedure names]).
+    """
+    cursor = conn.cursor()
+    index_cache = {}
+    report = []
+    proposals = {}
+
+    for procedure in procedures:
+        args = procedure.sample_args or ()
+        if len(args) != len(procedure.params) or None in args:
+            report.append((procedure.name, None, ['no sample arguments in notebook']))
+            continue
+
+        for statement in explainable_statements(procedure, args):
+            if statement.lstrip().upper().startswith(('INSERT', 'CALL')):
+                continue
+            try:
+                plan = explain(cursor, statement)
+            except Exception as e:
+                report.append((procedure.name, None, [f'EXPLAIN failed: {e}']))
+                continue
+
+            problems = []
+            for plan_row in plan:
+                for problem in plan_problems(plan_row):
+                    problems.append(f"{plan_row.get('table')}: {problem}")
+            report.append((procedure.name, plan, problems))
+
+            for table, index_name, columns, reason in propose_indexes(cursor, statement, plan, index_cache):
+                entry = proposals.setdefault(index_name, (table, columns, []))
+                if procedure.name not in entry[2]:
+                    entry[2].append(procedure.name)
+
+            if analyze and problems and not procedure.is_write:
+                try:
+                    print(f"\n--- EXPLAIN ANALYZE {procedure.name}")
+                    print(explain_analyze(cursor, statement))
+                except Exception as e:
+                    print(f"EXPLAIN ANALYZE not available: {e}")
+
+    cursor.close()
+    return report, proposals
+
+
+def apply_indexes(conn, proposals):
+    """
+    Create the proposed indexes.
+    """
+    cursor = conn.cursor()
+    for index_name, (table, columns, _) in proposals.items():
+        sql = f"CREATE INDEX {index_name} ON {table} ({', '.join(columns)})"
+        print(f"Executing: {sql}")
+        cursor.execute(sql)
+    conn.commit()
+    cursor.close()
+
+
+def time_all(conn, procedures, repeat):
+    timings = {}
+    for procedure in procedures:
+        args = procedure.sample_args or ()
+        if procedure.is_write or len(args) != len(procedure.params) or None in args:
+            continue
+        try:
+            timings[procedure.name] = time_procedure(conn, procedure, args, repeat)
+        except Exception as e:
+            print(f"Could not time {procedure.name}: {e}")
+    return timings
+
+
+def print_report(report):
+    for name, plan, problems in report:
+        status = 'OK' if plan is not None and not problems else '; '.join(problems)
+        print(f"  {name:<40} {status}")
+
+
+def print_proposals(proposals):
+    if not proposals:
+        print("  No new indexes proposed.")
+    for index_name, (table, columns, users) in proposals.items():
+        print(f"  CREATE INDEX {index_name} ON {table} ({', '.join(columns)});")
+        print(f"      -- used by {', '.join(users)}")
+
+
+def print_timings(before, after):
+    print(f"  {'procedure':<40} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for name, ms in before.items():
+        if name in after:
+            speedup = ms / after[name] if after[name] else float('inf')
+            print(f"  {name:<40} {ms:>10.2f} {after[name]:>10.2f} {speedup:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index advisor for the stored procedures in Queries/*")
+    parser.add_argument('--apply', action='store_true', help="create the proposed indexes and re-time")
+    parser.add_argument('--analyze', action='store_true', help="print EXPLAIN ANALYZE for flagged statements")
+    parser.add_argument('--repeat', type=int, default=5, help="calls per procedure when timing")
+    parser.add_argument('--only', help="comma separated procedure names")
+    options = parser.parse_args()
+
+    procedures = load_procedures()
+    if options.only:
+        wanted = set(options.only.split(','))
+        procedures = {name: p for name, p in procedures.items() if name in wanted}
+
+    # procedures from the same notebook folder share a database
+    by_config = {}
+    for procedure in procedures.values():
+        by_config.setdefault(procedure.config_file, []).append(procedure)
+
+    for config_file, group in by_config.items():
+        print(f"\n=== {config_file} ({len(group)} procedures)")
+        conn = db_connection(config_file=config_file)
+        try:
+            report, proposals = analyse(conn, group, analyze=options.analyze)
+            print_report(report)
+            print("\nProposed indexes:")
+            print_proposals(proposals)
+
+            if options.apply and proposals:
+                before = time_all(conn, group, options.repeat)
+                apply_indexes(conn, proposals)
+                after = time_all(conn, group, options.repeat)
+                print("\nTimings (median of %d calls):" % options.repeat)
+                print_timings(before, after)
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
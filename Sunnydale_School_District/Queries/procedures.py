@@ -0,0 +1,380 @@
+#------------------------------------------------#
+# Catalogue of the stored procedures in Queries/* #
+#------------------------------------------------#
+
+import ast
+import glob
+import json
+import os
+import re
+
+QUERIES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# statements that change data; procedures containing any of these are never
+# executed by the tooling, only explained
+WRITE_KEYWORDS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class StoredProcedure:
+    """
+    One CREATE PROCEDURE found in a Queries notebook, together with the
+    configuration file the notebook connects with and the arguments the
+    notebook calls it with.
+    """
+    def __init__(self, name, params, body, create_sql, notebook, config_file):
+        self.name = name
+        self.params = params            # [(name, sql_type), ...]
+        self.body = body                # text between BEGIN and END
+        self.create_sql = create_sql
+        self.notebook = notebook
+        self.config_file = config_file
+        self.sample_args = None
+
+    @property
+    def param_names(self):
+        return [name for name, _ in self.params]
+
+    @property
+    def statements(self):
+        return split_statements(self.body)
+
+    @property
+    def is_write(self):
+        """
+        True if any statement in the body modifies data.
+        """
+        return any(
+            s.lstrip().upper().startswith(WRITE_KEYWORDS) for s in self.statements
+        )
+
+    def __repr__(self):
+        return f"StoredProcedure({self.name}({', '.join(self.param_names)}))"
+
+
+def _split_outside_quotes(text):
+    """
+    Split text into (segment, is_quoted) pieces so that identifiers inside
+    string literals and quoted aliases are never touched.
+    """
+    pieces = []
+    for i, piece in enumerate(re.split(r'("[^"]*"|\'[^\']*\'|`[^`]*`)', text)):
+        if piece:
+            pieces.append((piece, i % 2 == 1))
+    return pieces
+
+
+def split_statements(body):
+    """
+    Split a procedure body on semicolons that are not inside quotes.
+    """
+    statements, current = [], ''
+    for piece, quoted in _split_outside_quotes(body):
+        if quoted:
+            current += piece
+            continue
+        parts = piece.split(';')
+        for part in parts[:-1]:
+            current += part
+            if current.strip():
+                statements.append(current.strip())
+            current = ''
+        current += parts[-1]
+    if current.strip():
+        statements.append(current.strip())
+    return statements
+
+
+def is_declare(statement):
+    return statement.lstrip().upper().startswith('DECLARE')
+
+
+def _split_params(text):
+    """
+    Split the parameter list on top-level commas (DECIMAL(3, 2) has one).
+    """
+    params, depth, current = [], 0, ''
+    for ch in text:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        if ch == ',' and depth == 0:
+            params.append(current)
+            current = ''
+        else:
+            current += ch
+    params.append(current)
+
+    parsed = []
+    for param in params:
+        words = param.split()
+        if not words:
+            continue
+        if words[0].upper() in ('IN', 'OUT', 'INOUT'):
+            words = words[1:]
+        parsed.append((words[0], ' '.join(words[1:])))
+    return parsed
+
+
+def parse_create_procedure(sql):
+    """
+    Return (name, params, body) for a CREATE PROCEDURE statement, or None.
+    """
+    match = re.search(r'CREATE\s+PROCEDURE\s+(\w+)\s*\(', sql, re.IGNORECASE)
+    if not match:
+        return None
+
+    # walk to the parenthesis that closes the parameter list
+    depth, pos = 1, match.end()
+    while depth and pos < len(sql):
+        if sql[pos] == '(':
+            depth += 1
+        elif sql[pos] == ')':
+            depth -= 1
+        pos += 1
+
+    params = _split_params(sql[match.end():pos - 1])
+    rest = sql[pos:]
+    begin = re.search(r'\bBEGIN\b', rest, re.IGNORECASE)
+    ends = list(re.finditer(r'\bEND\b', rest, re.IGNORECASE))
+    if not begin or not ends:
+        return None
+
+    body = rest[begin.end():ends[-1].start()].strip()
+    return match.group(1), params, body
+
+
+def _literal(node, namespace):
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        return namespace.get(node.id)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = _literal(node.operand, namespace)
+        return -value if isinstance(value, (int, float)) else None
+    return None
+
+
+def execute_strings(tree):
+    """
+    All string constants passed to cursor.execute(...) in a parsed cell.
+    """
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr == 'execute' and node.args
+                and isinstance(node.args[0], ast.Constant)
+                and isinstance(node.args[0].value, str)):
+            yield node.args[0].value
+
+
+def load_procedures(queries_dir=QUERIES_DIR):
+    """
+    Read every notebook under queries_dir/*/ and return a dictionary of
+    procedure name -> StoredProcedure. When a procedure is defined more than
+    once the last definition wins, just like running the notebooks.
+    """
+    procedures = {}
+
+    for notebook in sorted(glob.glob(os.path.join(queries_dir, '*', '*.ipynb'))):
+        with open(notebook, encoding='utf-8') as f:
+            cells = json.load(f)['cells']
+
+        notebook_dir = os.path.dirname(notebook)
+        config_file = None
+        namespace = {}
+        calls = {}
+
+        for cell in cells:
+            if cell['cell_type'] != 'code':
+                continue
+            source = ''.join(cell['source'])
+
+            if config_file is None:
+                match = re.search(r"db_connection\(\s*(?:config_file\s*=\s*)?['\"]([^'\"]+)['\"]", source)
+                if match:
+                    config_file = os.path.join(notebook_dir, match.group(1))
+
+            try:
+                tree = ast.parse(source)
+            except SyntaxError:
+                continue
+
+            for sql in execute_strings(tree):
+                parsed = parse_create_procedure(sql)
+                if parsed:
+                    name, params, body = parsed
+                    procedures[name] = StoredProcedure(
+                        name, params, body, sql.strip(), notebook, config_file
+                    )
+
+            # replay simple assignments so callproc arguments can be resolved
+            for statement in tree.body:
+                if isinstance(statement, ast.Assign):
+                    value = _literal(statement.value, namespace)
+                    for target in statement.targets:
+                        if isinstance(target, ast.Name):
+                            namespace[target.id] = value
+                # `for school_id in range(1, 11):` -> use the first value
+                if (isinstance(statement, ast.For) and isinstance(statement.target, ast.Name)
+                        and isinstance(statement.iter, ast.Call)
+                        and getattr(statement.iter.func, 'id', None) == 'range'):
+                    range_args = [_literal(a, namespace) for a in statement.iter.args]
+                    namespace[statement.target.id] = range_args[0] if len(range_args) > 1 else 0
+                for node in ast.walk(statement):
+                    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                            and node.func.attr == 'callproc' and node.args
+                            and isinstance(node.args[0], ast.Constant)):
+                        args = ()
+                        if len(node.args) > 1 and isinstance(node.args[1], (ast.Tuple, ast.List)):
+                            args = tuple(_literal(a, namespace) for a in node.args[1].elts)
+                        calls.setdefault(node.args[0].value, args)
+
+        for name, args in calls.items():
+            if name in procedures and procedures[name].sample_args is None:
+                procedures[name].sample_args = args
+
+    return procedures
+
+
+def sql_literal(value):
+    """
+    Render a Python value as a SQL literal.
+    """
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace('\\', '\\\\').replace("'", "''") + "'"
+
+
+def _mask_quotes(text):
+    """
+    The text with every quoted piece blanked out, so positions still line up.
+    """
+    return ''.join(' ' * len(piece) if quoted else piece for piece, quoted in _split_outside_quotes(text))
+
+
+# places where a bare name is a column or an alias, never a parameter:
+# INSERT INTO t (a, b), UPDATE ... SET a = ..., b = ..., USING (a) and AS a
+COLUMN_POSITIONS = (
+    re.compile(r'\bINTO\s+\w+\s*(\([^)]*\))', re.IGNORECASE),
+    re.compile(r'\bUSING\s*(\([^)]*\))', re.IGNORECASE),
+    re.compile(r'\bAS\s+(\w+)', re.IGNORECASE),
+)
+SET_TARGET = re.compile(r'(?:\bSET\s+|,\s*)(\w+)\s*=(?!=)', re.IGNORECASE)
+
+
+def _column_spans(masked):
+    spans = [m.span(1) for pattern in COLUMN_POSITIONS for m in pattern.finditer(masked)]
+    set_clause = re.search(r'\bSET\b(.*?)(?:\bWHERE\b|$)', masked, re.IGNORECASE | re.DOTALL)
+    if set_clause:
+        start, end = set_clause.span()
+        spans += [m.span(1) for m in SET_TARGET.finditer(masked, start, end)]
+    return spans
+
+
+def inline_arguments(statement, values):
+    """
+    Replace unqualified references to procedure parameters (and DECLAREd
+    locals) with SQL expressions so the statement can run outside the
+    procedure, e.g. under EXPLAIN. Like MySQL, a bare name in an expression
+    is the parameter even when a column has the same name, but column lists,
+    SET targets and aliases are columns and keep their names. Qualified names
+    such as gd.student_id and anything inside quotes are left alone.
+    """
+    if not values:
+        return statement
+
+    pattern = re.compile(
+        r'(?<![\w.@])(' + '|'.join(re.escape(name) for name in values) + r')(?![\w])'
+    )
+    masked = _mask_quotes(statement)
+    columns = _column_spans(masked)
+    pieces, last = [], 0
+    for match in pattern.finditer(masked):
+        if any(start <= match.start() < end for start, end in columns):
+            continue
+        pieces.append(statement[last:match.start()])
+        pieces.append(values[match.group(1)])
+        last = match.end()
+    pieces.append(statement[last:])
+    return ''.join(pieces)
+
+
+def explainable_statements(procedure, args):
+    """
+    Return the procedure's statements with the given arguments inlined,
+    resolving DECLARE ... DEFAULT locals along the way.
+    """
+    values = {name: sql_literal(value) for name, value in zip(procedure.param_names, args)}
+    statements = []
+
+    for statement in procedure.statements:
+        if is_declare(statement):
+            match = re.match(r'\s*DECLARE\s+(\w+)\s+.*?\bDEFAULT\b\s+(.*)$', statement,
+                             re.IGNORECASE | re.DOTALL)
+            if match:
+                values[match.group(1)] = '(' + inline_arguments(match.group(2), values) + ')'
+            continue
+        statements.append(inline_arguments(statement, values))
+
+    return statements
+
+
+def table_aliases(statement):
+    """
+    Map every alias (and bare table name) in FROM/JOIN clauses to its table.
+    """
+    keywords = {'JOIN', 'LEFT', 'RIGHT', 'INNER', 'OUTER', 'CROSS', 'ON', 'USING',
+                'WHERE', 'GROUP', 'ORDER', 'HAVING', 'LIMIT', 'SET', 'STRAIGHT_JOIN'}
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?',
+                                   statement, re.IGNORECASE):
+        aliases[table] = table
+        if alias and alias.upper() not in keywords:
+            aliases[alias] = table
+    return aliases
+
+
+EQUALITY_OPERATORS = ('=', '<=>', 'IN')
+
+# a WHERE or ON condition runs until the next clause or subquery
+CONDITION = re.compile(
+    r'\b(?:WHERE|ON)\b(.*?)(?=\b(?:JOIN|LEFT|RIGHT|INNER|CROSS|STRAIGHT_JOIN|WHERE|GROUP|ORDER|'
+    r'HAVING|LIMIT|UNION|SELECT)\b|$)',
+    re.IGNORECASE | re.DOTALL
+)
+
+
+def predicate_columns(statement, alias, table_columns, bare_names=False):
+    """
+    Columns of one table that a statement compares in WHERE and JOIN ... ON
+    conditions or joins with USING. Returns (equality, other): columns compared
+    with =, <=> or IN, then those compared with ranges or LIKE, each in the
+    order they first appear. Columns are found as alias.column, and also as
+    bare names when bare_names is set (the statement reads only this table).
+    """
+    masked = _mask_quotes(statement)
+    conditions = '\n'.join(CONDITION.findall(masked))
+    # group 1 is alias.column, group 2 a bare column (never matched unless bare_names)
+    bare = r'(?<![\w.@])(\w+)' if bare_names else r'(?!)(\w+)'
+    name = r'(?:\b' + re.escape(alias) + r'\.(\w+)|' + bare + ')'
+    operator = r'(<=>|<=|>=|<>|!=|=|<|>|\bNOT\s+IN\b|\bIN\b|\bBETWEEN\b|\bLIKE\b)'
+    compared = []
+    for match in re.finditer(name + r'\s*' + operator, conditions, re.IGNORECASE):
+        compared.append((match.group(1) or match.group(2), match.group(3).upper()))
+    for match in re.finditer(r'(<=>|<=|>=|<>|!=|=|<|>)\s*' + name, conditions):
+        compared.append((match.group(2) or match.group(3), match.group(1)))
+    for using in re.findall(r'USING\s*\(([^)]*)\)', masked, re.IGNORECASE):
+        compared += [(column.strip(), '=') for column in using.split(',')]
+
+    equality, other = [], []
+    for column, op in compared:
+        if column not in table_columns:
+            continue
+        group = equality if op in EQUALITY_OPERATORS else other
+        if column not in equality and column not in group:
+            group.append(column)
+    return equality, [column for column in other if column not in equality]
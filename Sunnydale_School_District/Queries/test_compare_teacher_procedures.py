@@ -0,0 +1,103 @@
+import datetime
+import re
+
+import compare_teacher_procedures as harness
+from procedures import load_procedures
+
+# two students on teacher 4's roster and one attendance date
+ROSTERS = [(4, 1, '3', 2053), (4, 2, '3', 2054)]
+DATES = [datetime.date(2025, 5, 16)]
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+        self.results = []
+
+    def execute(self, sql, params=None):
+        created = re.search(r'CREATE\s+PROCEDURE\s+(\w+)', sql)
+        if created:
+            self.conn.installed.add(created.group(1))
+        elif 'FROM teaches' in sql:
+            self.rows = ROSTERS
+        elif 'FROM attendance' in sql:
+            self.rows = [(day,) for day in DATES]
+
+    def fetchall(self):
+        return self.rows
+
+    def callproc(self, name, args):
+        assert name in self.conn.installed, name
+        self.results = [FakeResult(self.conn.run(name, args))]
+
+    def stored_results(self):
+        return iter(self.results)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Every procedure returns one row of its name and arguments, unless run says otherwise"""
+    def __init__(self, run=None):
+        self.installed = set()
+        self.run = run or (lambda name, args: [(name.replace('legacy_', ''),) + tuple(args)])
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+
+def run_harness(conn):
+    current = load_procedures()
+    harness.install_procedures(conn, current)
+    samples = harness.sample_rosters(conn, samples=5, seed=201)
+    return harness.compare(conn, current, samples, repeat=1)
+
+
+def test_installs_current_and_legacy_definitions():
+    conn = FakeConnection()
+    run_harness(conn)
+    for name in harness.LEGACY_PROCEDURES:
+        assert {name, harness.legacy_name(name)} <= conn.installed
+
+
+def test_equal_results_pass():
+    results = run_harness(FakeConnection())
+    assert harness.mismatched(results) == []
+    assert all(results[name][1] == len(ROSTERS) for name in results)
+
+
+def test_changed_procedures_are_not_compared():
+    def run(name, args):
+        # the legacy guardian lists leave out students without grades
+        if name.startswith('legacy_') and name[len('legacy_'):] in harness.CHANGED_PROCEDURES:
+            return []
+        return [(name.replace('legacy_', ''),) + tuple(args)]
+
+    results = run_harness(FakeConnection(run))
+    assert harness.mismatched(results) == []
+    for name in harness.CHANGED_PROCEDURES:
+        assert results[name][0] is None
+
+
+def test_a_compared_procedure_that_differs_fails():
+    def run(name, args):
+        if name == 'teacher_all_students':
+            return []
+        return [(name.replace('legacy_', ''),) + tuple(args)]
+
+    results = run_harness(FakeConnection(run))
+    assert harness.mismatched(results) == ['teacher_all_students']
+    assert results['teacher_all_students'][0] == len(ROSTERS)
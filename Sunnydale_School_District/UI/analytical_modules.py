@@ -0,0 +1,12 @@
+"""
+Puts Analytical_db on the import path, so the UI uses the ETL's own modules
+(school_calendar.py, snapshot_format.py) rather than copies of them. Import
+it before importing any of them; UI modules of the same name, like
+data201.py, still come first.
+"""
+import os
+import sys
+
+ANALYTICAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Analytical_db')
+if ANALYTICAL_DIR not in sys.path:
+    sys.path.append(ANALYTICAL_DIR)
@@ -1,3 +1,109 @@
-attendance_by_grade = [{'school_id': 1, 'grade_level': '5', 'attendance_rate': 100.0}, {'school_id': 1, 'grade_level': '2', 'attendance_rate': 96.8}, {'school_id': 1, 'grade_level': 'K', 'attendance_rate': 94.3}, {'school_id': 1, 'grade_level': '1', 'attendance_rate': 95.5}, {'school_id': 1, 'grade_level': '4', 'attendance_rate': 91.9}, {'school_id': 1, 'grade_level': '3', 'attendance_rate': 100.0}, {'school_id': 2, 'grade_level': '1', 'attendance_rate': 97.8}, {'school_id': 2, 'grade_level': '2', 'attendance_rate': 93.7}, {'school_id': 2, 'grade_level': '4', 'attendance_rate': 100.0}, {'school_id': 2, 'grade_level': '3', 'attendance_rate': 94.7}, {'school_id': 2, 'grade_level': '5', 'attendance_rate': 100.0}, {'school_id': 2, 'grade_level': 'K', 'attendance_rate': 93.3}, {'school_id': 3, 'grade_level': '1', 'attendance_rate': 98.1}, {'school_id': 3, 'grade_level': 'K', 'attendance_rate': 100.0}, {'school_id': 3, 'grade_level': '4', 'attendance_rate': 97.6}, {'school_id': 3, 'grade_level': '2', 'attendance_rate': 93.7}, {'school_id': 3, 'grade_level': '3', 'attendance_rate': 94.0}, {'school_id': 3, 'grade_level': '5', 'attendance_rate': 98.2}, {'school_id': 4, 'grade_level': '3', 'attendance_rate': 96.9}, {'school_id': 4, 'grade_level': '2', 'attendance_rate': 98.0}, {'school_id': 4, 'grade_level': '4', 'attendance_rate': 96.0}, {'school_id': 4, 'grade_level': '1', 'attendance_rate': 100.0}, {'school_id': 4, 'grade_level': '5', 'attendance_rate': 98.5}, {'school_id': 4, 'grade_level': 'K', 'attendance_rate': 98.1}, {'school_id': 5, 'grade_level': '7', 'attendance_rate': 94.8}, {'school_id': 5, 'grade_level': '8', 'attendance_rate': 98.6}, {'school_id': 5, 'grade_level': '6', 'attendance_rate': 94.6}, {'school_id': 6, 'grade_level': '6', 'attendance_rate': 91.2}, {'school_id': 6, 'grade_level': '8', 'attendance_rate': 93.5}, {'school_id': 6, 'grade_level': '7', 'attendance_rate': 94.0}, {'school_id': 7, 'grade_level': '7', 'attendance_rate': 94.2}, {'school_id': 7, 'grade_level': '8', 'attendance_rate': 94.4}, {'school_id': 7, 'grade_level': '6', 'attendance_rate': 90.9}, {'school_id': 8, 'grade_level': '9', 'attendance_rate': 96.2}, {'school_id': 8, 'grade_level': '12', 'attendance_rate': 96.8}, {'school_id': 8, 'grade_level': '10', 'attendance_rate': 93.6}, {'school_id': 8, 'grade_level': '11', 'attendance_rate': 90.2}, {'school_id': 9, 'grade_level': '10', 'attendance_rate': 96.3}, {'school_id': 9, 'grade_level': '11', 'attendance_rate': 98.4}, {'school_id': 9, 'grade_level': '9', 'attendance_rate': 90.4}, {'school_id': 9, 'grade_level': '12', 'attendance_rate': 94.3}, {'school_id': 10, 'grade_level': '7', 'attendance_rate': 88.2}, {'school_id': 10, 'grade_level': '1', 'attendance_rate': 90.0}, {'school_id': 10, 'grade_level': '11', 'attendance_rate': 88.9}, {'school_id': 10, 'grade_level': '2', 'attendance_rate': 90.0}, {'school_id': 10, 'grade_level': '3', 'attendance_rate': 88.9}, {'school_id': 10, 'grade_level': '12', 'attendance_rate': 90.0}, {'school_id': 10, 'grade_level': '8', 'attendance_rate': 100.0}, {'school_id': 10, 'grade_level': '5', 'attendance_rate': 87.5}, {'school_id': 10, 'grade_level': '4', 'attendance_rate': 100.0}, {'school_id': 10, 'grade_level': '6', 'attendance_rate': 92.3}, {'school_id': 10, 'grade_level': '9', 'attendance_rate': 100.0}, {'school_id': 10, 'grade_level': '10', 'attendance_rate': 80.0}, {'school_id': 10, 'grade_level': 'K', 'attendance_rate': 100.0}]
+"""
+Attendance rates for the executive dashboard, read from the
+attendance_rates.bin file the ETL builds into every warehouse snapshot (the
+layout is defined once, in Analytical_db/snapshot_format.py).
 
-attendance_by_school = [(1, 'Melton Elementary School', 96.6), (2, 'Singh Elementary School', 96.4), (3, 'Coffey Elementary School', 96.8), (4, 'Griffin Elementary School', 97.9), (5, 'Campbell Middle School', 96.0), (6, 'Powell Middle School', 93.0), (7, 'Johnson Middle School', 93.2), (8, 'Lewis High School', 94.2), (9, 'Larsen High School', 94.9), (10, 'Mclaughlin Special Education School', 92.0)]
\ No newline at end of file
+Opening a snapshot reads only the file's header; the rate arrays are
+memory-mapped the first time a date is looked up, and the operating system
+pages in just the days the dashboard shows. Like local_warehouse(),
+load_attendance_snapshot() notices when the ETL has published a newer
+snapshot and opens its file on the next call.
+"""
+import datetime
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import analytical_modules  # the file format is shared with the ETL that writes it
+from local_warehouse import DEFAULT_SNAPSHOT_DIR
+from school_calendar import to_days
+from snapshot_format import ATTENDANCE_RATES_FILE, array_layout, current_version, read_header
+
+
+class AttendanceSnapshot:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            header, self.offset = read_header(f, path)
+        self.layout = array_layout(header)
+
+        self.schools: List[Tuple[int, str]] = [(school_id, name) for school_id, name in header['schools']]
+        self.grade_levels: List[str] = header['grade_levels']
+        self.shape = (header['dates'], len(self.schools), len(self.grade_levels))
+        self._school_index: Dict[int, int] = {school_id: i for i, (school_id, _) in enumerate(self.schools)}
+        self._arrays = None
+
+    def _map(self):
+        """date_ids, school_rates and grade_rates, mapped in the order the file lays them out"""
+        if self._arrays is None:
+            arrays, offset = [], self.offset
+            for _, dtype, shape in self.layout:
+                if 0 in shape:
+                    # an empty region cannot be mapped
+                    array = np.empty(shape, dtype)
+                else:
+                    array = np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=shape)
+                arrays.append(array)
+                offset += array.nbytes
+            self._arrays = tuple(arrays)
+        return self._arrays
+
+    def first_date(self) -> Optional[datetime.date]:
+        date_ids = self._map()[0]
+        return datetime.date.fromordinal(int(date_ids[0]) - 365) if len(date_ids) else None
+
+    def last_date(self) -> Optional[datetime.date]:
+        date_ids = self._map()[0]
+        return datetime.date.fromordinal(int(date_ids[-1]) - 365) if len(date_ids) else None
+
+    def _day(self, day: datetime.date) -> Optional[int]:
+        """Index of day, or of the last school day before it"""
+        date_ids = self._map()[0]
+        index = int(np.searchsorted(date_ids, to_days(day), side='right')) - 1
+        return index if index >= 0 else None
+
+    def school_day(self, day: datetime.date) -> Optional[datetime.date]:
+        """The school day the rates for day come from: day itself or the last school day before it"""
+        index = self._day(day)
+        return None if index is None else datetime.date.fromordinal(int(self._map()[0][index]) - 365)
+
+    def attendance_by_school(self, day: datetime.date) -> List[Tuple[int, str, float]]:
+        """(school_id, name, attendance rate) of every school with attendance that day"""
+        index = self._day(day)
+        if index is None:
+            return []
+        rates = self._map()[1][index]
+        return [(school_id, name, float(rates[i]))
+                for i, (school_id, name) in enumerate(self.schools) if not np.isnan(rates[i])]
+
+    def attendance_by_grade(self, school_id: int, day: datetime.date) -> List[dict]:
+        """{'school_id', 'grade_level', 'attendance_rate'} of each grade of a school that day"""
+        index = self._day(day)
+        if index is None or school_id not in self._school_index:
+            return []
+        rates = self._map()[2][index, self._school_index[school_id]]
+        return [{'school_id': school_id, 'grade_level': grade_level, 'attendance_rate': float(rates[i])}
+                for i, grade_level in enumerate(self.grade_levels) if not np.isnan(rates[i])]
+
+
+_current: Optional[AttendanceSnapshot] = None
+
+
+def load_attendance_snapshot(directory: str = DEFAULT_SNAPSHOT_DIR) -> Optional[AttendanceSnapshot]:
+    """
+    The rates of the latest warehouse snapshot, None when none has been
+    published. The same object is returned until CURRENT names a new version.
+    """
+    global _current
+    version = current_version(directory)
+    if version is None:
+        return None
+    path = os.path.join(directory, version, ATTENDANCE_RATES_FILE)
+    if _current is None or _current.path != path:
+        try:
+            _current = AttendanceSnapshot(path)
+        except (OSError, ValueError) as e:
+            print(f"Could not open the attendance snapshot {path}: {e}")
+            return None
+    return _current
@@ -0,0 +1,106 @@
+"""
+A Qt canvas holding one BarChart (report_charts.py) for the lifetime of a
+window. Showing new data changes the existing bars and schedules a repaint
+with draw_idle(), so clicking through courses and dates no longer creates a
+figure and a canvas per selection. With blit=True, a change to the bar
+lengths alone repaints only the bars over the saved background.
+
+    python chart_canvas.py [updates]
+
+compares the memory of updating one canvas with creating a figure per
+update, the way the charts used to be drawn.
+"""
+from typing import Callable, Optional, Sequence
+
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+from report_charts import FIGURE_SIZE, BarChart
+
+
+class ChartCanvas(FigureCanvas):
+    def __init__(self, chart: Optional[Callable] = None, figsize=FIGURE_SIZE, blit: bool = False, **options):
+        """chart makes the BarChart from the Axes, otherwise options are BarChart's"""
+        super().__init__(Figure(figsize=figsize))
+        ax = self.figure.add_subplot(111)
+        self.chart: BarChart = chart(ax) if chart else BarChart(ax, **options)
+        self.blit_bars = blit
+        self._background = None
+        if blit:
+            self.chart.set_animated(True)
+            self.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, _event):
+        # animated bars are not part of a full draw: save what is behind them, then draw them
+        self._background = self.copy_from_bbox(self.figure.bbox)
+        self.chart.draw_bars()
+
+    def show_bars(self, labels: Sequence[str], values: Sequence[float], title: str = ''):
+        relayout = self.chart.update(labels, values, title)
+        self.setVisible(True)
+        if self.blit_bars and not relayout and self._background is not None:
+            self.restore_region(self._background)
+            self.chart.draw_bars()
+            self.blit(self.figure.bbox)
+        else:
+            self.draw_idle()
+
+    def clear_bars(self):
+        """Remove the bars and hide the canvas until there is data again"""
+        self.chart.update([], [], '')
+        self.setVisible(False)
+
+
+def _memory_check(updates: int):
+    import gc
+    import random
+    import tracemalloc
+
+    from PyQt5.QtWidgets import QApplication, QWidget
+
+    QApplication.instance() or QApplication(['chart_canvas', '-platform', 'offscreen'])
+    labels = ['present', 'absent', 'late', 'excused']
+
+    def measure(name, update):
+        gc.collect()
+        tracemalloc.start()
+        for _ in range(updates):
+            update([random.randint(0, 30) for _ in labels])
+            QApplication.processEvents()
+        gc.collect()
+        QApplication.processEvents()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        figures = sum(isinstance(o, Figure) for o in gc.get_objects())
+        print(f"{name:28} {current / 2**20:8.2f} MiB held {peak / 2**20:8.2f} MiB peak {figures:6} figures alive")
+
+    parent = QWidget()
+    canvases = []
+
+    def new_figure(values):
+        # as before: a new figure and canvas per selection, the old one deleted later
+        for canvas in canvases:
+            canvas.deleteLater()
+        canvases.clear()
+        canvas = FigureCanvas(Figure(figsize=FIGURE_SIZE))
+        canvas.setParent(parent)
+        canvas.figure.add_subplot(111).bar(labels, values)
+        canvas.draw()
+        canvases.append(canvas)
+
+    reused = ChartCanvas(blit=True, limits=(0, 30))
+    reused.setParent(parent)
+    reused.show_bars(labels, [0] * len(labels), 'Attendance')
+    reused.draw()
+
+    def reuse(values):
+        reused.show_bars(labels, values, 'Attendance')
+
+    print(f"{updates} updates")
+    measure('new figure per update', new_figure)
+    measure('one canvas, bars updated', reuse)
+
+
+if __name__ == "__main__":
+    import sys
+    _memory_check(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,153 @@
+"""
+The district dashboard's two measures as NumPy cubes, loaded once from a
+warehouse snapshot's summaries by LocalWarehouse (local_warehouse.py):
+
+    scores      score sum and count by school x grade level x grade type
+    attendance  students by school x grade level x school day x status
+
+Any cell, slice or roll-up is a sum over the cube: leaving a dimension out
+(None) rolls it up, so avg_score() is the district average and
+avg_score(school_id=3) the school's. The *_by() methods drill down, giving
+the measure for every member of one dimension within the filters.
+"""
+import datetime
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import analytical_modules  # school_calendar is shared with the ETL
+from school_calendar import grade_order, to_days
+
+STATUSES = ['present', 'absent', 'late', 'excused']
+
+
+class DistrictCube:
+    def __init__(self, path: str):
+        """Load the cubes from the snapshot version directory path"""
+        schools = pd.read_parquet(os.path.join(path, 'school_dim.parquet'), columns=['school_id'])
+        performance = pd.read_parquet(os.path.join(path, 'performance_summary.parquet'))
+        attendance = pd.read_parquet(os.path.join(path, 'attendance_daily_summary.parquet'))
+
+        self.school_ids: List[int] = sorted(int(school_id) for school_id in schools['school_id'])
+        self.grade_levels: List[str] = sorted(
+            set(performance['grade_level']) | set(attendance['grade_level']), key=grade_order
+        )
+        self.grade_types: List[str] = sorted(performance['grade_type'].unique())
+        self.date_ids = np.sort(attendance['date_id'].unique())
+        self.index = {
+            'school_id': {school_id: i for i, school_id in enumerate(self.school_ids)},
+            'grade_level': {grade_level: i for i, grade_level in enumerate(self.grade_levels)},
+            'grade_type': {grade_type: i for i, grade_type in enumerate(self.grade_types)},
+        }
+
+        performance = performance[performance['school_id'].isin(self.index['school_id'])]
+        shape = (len(self.school_ids), len(self.grade_levels), len(self.grade_types))
+        cells = (
+            performance['school_id'].map(self.index['school_id']).to_numpy(),
+            performance['grade_level'].map(self.index['grade_level']).to_numpy(),
+            performance['grade_type'].map(self.index['grade_type']).to_numpy(),
+        )
+        self.score_sum = np.zeros(shape)
+        self.score_count = np.zeros(shape, dtype=np.int64)
+        np.add.at(self.score_sum, cells, performance['score_sum'].to_numpy())
+        np.add.at(self.score_count, cells, performance['score_count'].to_numpy())
+
+        attendance = attendance[attendance['school_id'].isin(self.index['school_id'])]
+        shape = (len(self.school_ids), len(self.grade_levels), len(self.date_ids), len(STATUSES))
+        cells = (
+            attendance['school_id'].map(self.index['school_id']).to_numpy(),
+            attendance['grade_level'].map(self.index['grade_level']).to_numpy(),
+            np.searchsorted(self.date_ids, attendance['date_id'].to_numpy()),
+        )
+        self.attendance = np.zeros(shape, dtype=np.int32)
+        for i, status in enumerate(STATUSES):
+            np.add.at(self.attendance[..., i], cells, attendance[f"{status}_count"].to_numpy())
+
+    # ========== Selection ==========
+    def _members(self, dimension: str, value) -> Sequence[int]:
+        """Indexes along dimension selected by value: all for None, none for an unknown member"""
+        if value is None:
+            return range(len(self.index[dimension]))
+        position = self.index[dimension].get(value)
+        return [] if position is None else [position]
+
+    def _days(self, start: Optional[datetime.date], end: Optional[datetime.date]) -> Sequence[int]:
+        """Indexes of the school days from start through end (end defaults to start)"""
+        if start is None:
+            return range(len(self.date_ids))
+        end = end or start
+        first = np.searchsorted(self.date_ids, to_days(start), side='left')
+        last = np.searchsorted(self.date_ids, to_days(end), side='right')
+        return range(first, last)
+
+    # ========== Scores ==========
+    def _scores(self, school_id, grade_level, grade_type):
+        selection = np.ix_(self._members('school_id', school_id), self._members('grade_level', grade_level),
+                           self._members('grade_type', grade_type))
+        return self.score_sum[selection], self.score_count[selection]
+
+    def avg_score(self, school_id: Optional[int] = None, grade_level: Optional[str] = None,
+                  grade_type: Optional[str] = None) -> Optional[float]:
+        """Average score of the cell, None when it has no scores"""
+        score_sum, score_count = self._scores(school_id, grade_level, grade_type)
+        count = score_count.sum()
+        return round(float(score_sum.sum() / count), 2) if count else None
+
+    def avg_score_by(self, dimension: str, school_id: Optional[int] = None, grade_level: Optional[str] = None,
+                     grade_type: Optional[str] = None) -> Dict[object, float]:
+        """Average score of each member of dimension ('school_id', 'grade_level' or 'grade_type') within the filters"""
+        score_sum, score_count = self._scores(school_id, grade_level, grade_type)
+        axis = ['school_id', 'grade_level', 'grade_type'].index(dimension)
+        others = tuple(a for a in range(3) if a != axis)
+        sums, counts = score_sum.sum(axis=others), score_count.sum(axis=others)
+        members = self._member_names(dimension, [school_id, grade_level, grade_type][axis])
+        return {member: round(float(s / c), 2) for member, s, c in zip(members, sums, counts) if c}
+
+    # ========== Attendance ==========
+    def _attendance(self, school_id, grade_level, start, end):
+        selection = np.ix_(self._members('school_id', school_id), self._members('grade_level', grade_level),
+                           self._days(start, end), range(len(STATUSES)))
+        return self.attendance[selection]
+
+    def attendance_counts(self, school_id: Optional[int] = None, grade_level: Optional[str] = None,
+                          start: Optional[datetime.date] = None,
+                          end: Optional[datetime.date] = None) -> Dict[str, int]:
+        """Students in each status over the cell"""
+        counts = self._attendance(school_id, grade_level, start, end).sum(axis=(0, 1, 2))
+        return {status: int(count) for status, count in zip(STATUSES, counts)}
+
+    def attendance_rate(self, school_id: Optional[int] = None, grade_level: Optional[str] = None,
+                        start: Optional[datetime.date] = None,
+                        end: Optional[datetime.date] = None) -> Optional[float]:
+        """Percentage of students present over the cell, None when it has no attendance"""
+        counts = self.attendance_counts(school_id, grade_level, start, end)
+        total = sum(counts.values())
+        return round(100 * counts['present'] / total, 1) if total else None
+
+    def attendance_rate_by(self, dimension: str, school_id: Optional[int] = None,
+                           grade_level: Optional[str] = None, start: Optional[datetime.date] = None,
+                           end: Optional[datetime.date] = None) -> Dict[object, float]:
+        """Attendance rate of each member of dimension ('school_id', 'grade_level' or 'date') within the filters"""
+        counts = self._attendance(school_id, grade_level, start, end)
+        if dimension == 'date':
+            days = self._days(start, end)
+            members = [datetime.date.fromordinal(int(self.date_ids[d]) - 365) for d in days]
+            axis = 2
+        else:
+            axis = ['school_id', 'grade_level'].index(dimension)
+            members = self._member_names(dimension, [school_id, grade_level][axis])
+        totals = counts.sum(axis=tuple(a for a in range(4) if a != axis))
+        present = counts[..., 0].sum(axis=tuple(a for a in range(3) if a != axis))
+        return {member: round(float(100 * p / t), 1) for member, p, t in zip(members, present, totals) if t}
+
+    def grade_levels_of(self, school_id: Optional[int] = None) -> List[str]:
+        """Grade levels with scores at the school (or anywhere in the district)"""
+        counts = self._scores(school_id, None, None)[1].sum(axis=(0, 2))
+        return [grade_level for grade_level, count in zip(self.grade_levels, counts) if count]
+
+    def _member_names(self, dimension: str, value) -> list:
+        members = {'school_id': self.school_ids, 'grade_level': self.grade_levels,
+                   'grade_type': self.grade_types}[dimension]
+        return [members[i] for i in self._members(dimension, value)]
@@ -4,10 +4,12 @@ from PyQt5.QtCore import QDate, pyqtSignal
 from PyQt5.QtWidgets import QMessageBox
 
 from data201 import db_connection
+# Schools and grade levels, loaded once at startup
+from school_catalogue import load_school_catalogue
 
 
 # Simulated data fetch functions
-def get_average_exam_score(school_name, grade_level, exam_type):
+def get_average_exam_score(school_id, grade_level, exam_type):
     import os
     from data201 import db_connection
 
@@ -18,9 +20,8 @@ def get_average_exam_score(school_name, grade_level, exam_type):
     cursor = conn.cursor()
 
     try:
-        school_id = get_school_id_by_name(cursor, school_name)
-        if not school_id:
-            raise ValueError(f"No school ID found for school: {school_name}")
+        if school_id is None:
+            raise ValueError("No school selected")
 
         cursor.callproc('get_avg_score', [school_id, grade_level, exam_type.lower()])
         
@@ -43,7 +44,7 @@ def get_average_exam_score(school_name, grade_level, exam_type):
         conn.close()
 
 
-def get_attendance_rate(school_name, grade_level, date_str):
+def get_attendance_rate(school_id, grade_level, date_str):
     import os
     from data201 import db_connection
 
@@ -54,10 +55,8 @@ def get_attendance_rate(school_name, grade_level, date_str):
     cursor = conn.cursor()
 
     try:
-        school_id = get_school_id_by_name(cursor, school_name)
-        print(f"Resolved school_id: {school_id} for school_name: {school_name}")
-        if not school_id:
-            raise ValueError(f"No school ID found for school: {school_name}")
+        if school_id is None:
+            raise ValueError("No school selected")
 
         print(f"Calling procedure with: school_id={school_id} ({type(school_id)}), grade_level={grade_level} ({type(grade_level)}), date={date_str} ({type(date_str)})")
         cursor.callproc('get_attendance_rate', [school_id, grade_level, date_str])
@@ -87,11 +86,6 @@ def require_widget(parent, widget_type, name):
         raise RuntimeError(f"Missing widget: {name}")
     return widget
 
-def get_school_id_by_name(cursor, school_name):
-    cursor.execute("SELECT school_id FROM school_dim WHERE name = %s", (school_name,))
-    result = cursor.fetchone()
-    return result[0] if result else None
-
 
 
 class DistrictEmployeeDashboard(QtWidgets.QMainWindow):
@@ -129,14 +123,15 @@ class DistrictEmployeeDashboard(QtWidgets.QMainWindow):
         self.btnFetchExamStats.clicked.connect(self.fetch_exam_score)
         self.btnFetchAttendance.clicked.connect(self.fetch_attendance_rate)
 
-        # Populate school combo box
+        # Populate school combo box, each item carrying its school_id
         try:
-            school_names = self.fetch_school_names()
-            print("Fetched school names:", school_names)
-            if not school_names:
+            self.catalogue = self.load_catalogue()
+            print("Fetched schools:", self.catalogue.schools)
+            if not self.catalogue.schools:
                 self.comboSchool.addItems(["No schools found"])
             else:
-                self.comboSchool.addItems(school_names)
+                for school_id, school_name in self.catalogue.schools:
+                    self.comboSchool.addItem(school_name, school_id)
         except Exception as e:
             self.show_error(f"Failed to load schools:\n{e}")
             self.comboSchool.addItems(["DB Error - fallback"])
@@ -154,89 +149,38 @@ class DistrictEmployeeDashboard(QtWidgets.QMainWindow):
         self.logout_signal.emit()
         self.close()
 
-    def fetch_school_names(self):
+    def load_catalogue(self):
+        """Schools and their grade levels, in one call to the warehouse"""
         # use below for python script
         current_dir = os.path.dirname(os.path.abspath(__file__))
         ini_path = os.path.join(current_dir, "sheql2.ini")
-
-        conn = db_connection(config_file=ini_path)
         #use below for python notebook
-        #conn = db_connection(config_file='sheql2.ini')
-        cursor = conn.cursor()
-
-        try:
-            cursor.callproc('get_all_schools')
-            found_results = False
-            schools = []
-
-            for result in cursor.stored_results():
-                print("Found stored result set")
-                schools = [row[1] for row in result.fetchall()]
-                found_results = True
-                break 
-            
-            if not found_results:
-                print(" No stored result set found")
-                raise RuntimeError("No result set returned from stored procedure.")
-
-            print(f"Fetched schools {schools}")  # Debug statement
-            return schools
-        
-        finally:
-            cursor.close()
-            conn.close()
+        #ini_path = 'sheql2.ini'
+        return load_school_catalogue(ini_path)
 
     # Handler method to get grade levels 
     def on_school_selected(self, school_name):
         if school_name and "No schools" not in school_name and "Error" not in school_name:
-            self.fetch_grade_levels(school_name)
-        
-    def fetch_grade_levels(self, school_name):
-        # use below for python script
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        ini_path = os.path.join(current_dir, "sheql2.ini")
-
-        conn = db_connection(config_file=ini_path)
-        #use below for python notebook
-        #conn = db_connection(config_file='sheql2.ini')
-        cursor = conn.cursor()
-
-        try:
-            school_id = get_school_id_by_name(cursor, school_name)
-            if school_id is None:
-                raise ValueError("No school ID found for '{school name}'")
-            
-            cursor.callproc('get_grade_levels', [school_id])
-            grades = []
-
-            for result in cursor.stored_results():
-                grades = [row[0] for row in result.fetchall()]
-            
-            self.comboGrade.clear()
-            self.comboGrade.addItems(grades if grades else ["No grades found"])
-
-        except Exception as e:
-            self.show_error(f"Failed to load grades:\n{e}")
-            self.comboGrade.clear()
-            self.comboGrade.addItems(['error'])
+            self.fetch_grade_levels(self.comboSchool.currentData())
         
-        finally:
-            cursor.close()
-            conn.close()
+    def fetch_grade_levels(self, school_id):
+        grades = self.catalogue.grade_levels(school_id)
+        self.comboGrade.clear()
+        self.comboGrade.addItems(grades if grades else ["No grades found"])
 
 
     def fetch_exam_score(self):
-        school = self.comboSchool.currentText()
+        school_id = self.comboSchool.currentData()
         grade = self.comboGrade.currentText()
         exam_type = self.comboExamType.currentText()
-        avg = get_average_exam_score(school, grade, exam_type)
+        avg = get_average_exam_score(school_id, grade, exam_type)
         self.lblExamResult.setText(f"Avg: {avg:.2f}")
 
     def fetch_attendance_rate(self):
-        school = self.comboSchool.currentText()
+        school_id = self.comboSchool.currentData()
         grade = self.comboGrade.currentText()
         date = self.dateAttendance.date().toString("yyyy-MM-dd")
-        rate = get_attendance_rate(school, grade, date)
+        rate = get_attendance_rate(school_id, grade, date)
         self.lblAttendanceResult.setText(f"Avg: {rate:.2f}%")
 
     def show_error(self, msg):
@@ -0,0 +1,92 @@
+"""
+The district dashboard's queries answered in memory from the Parquet
+snapshot the ETL publishes after each run (Analytical_db/snapshot_publisher.py),
+so changing a combobox does not go to MySQL and the dashboard keeps working
+while the warehouse is busy or down.
+
+The summaries are loaded into a DistrictCube (district_cube.py) when a
+snapshot is loaded, so any cell or roll-up is a sum over NumPy arrays.
+local_warehouse() notices when the ETL has published a newer snapshot and
+loads it on the next call.
+"""
+import datetime
+import os
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+import analytical_modules  # the CURRENT pointer is read like the ETL reads it
+from district_cube import DistrictCube
+from snapshot_format import current_version
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    '..', 'Analytical_db', 'snapshots')
+
+# combobox entries that roll a dimension up
+ALL_SCHOOLS = 'All schools'
+ALL_GRADES = 'All grades'
+
+
+class LocalWarehouse:
+    def __init__(self, directory: str, version: str):
+        self.directory = directory
+        self.version = version
+        path = os.path.join(directory, version)
+
+        schools = pd.read_parquet(os.path.join(path, 'school_dim.parquet'), columns=['school_id', 'name'])
+        schools = schools.sort_values('name')
+        self.schools: List[Tuple[int, str]] = list(schools.itertuples(index=False, name=None))
+        self.cube = DistrictCube(path)
+
+        # the latest run's row of district_kpi_cache, snapshots from before it existed have none
+        self.kpis: Optional[dict] = None
+        kpi_path = os.path.join(path, 'district_kpi_cache.parquet')
+        if os.path.exists(kpi_path):
+            kpis = pd.read_parquet(kpi_path).sort_values('run_id')
+            if not kpis.empty:
+                self.kpis = kpis.iloc[-1].drop(['run_id', 'refreshed_at']).to_dict()
+
+    # each method returns what the stored procedure of the same name does,
+    # with None for school_id or grade_level rolling that dimension up
+
+    def all_schools(self) -> List[Tuple[int, str]]:
+        """get_all_schools"""
+        return self.schools
+
+    def district_kpis(self) -> Optional[dict]:
+        """get_district_kpis, None when the snapshot has no KPIs"""
+        return self.kpis
+
+    def grade_levels(self, school_id: Optional[int]) -> List[str]:
+        """get_grade_levels"""
+        return self.cube.grade_levels_of(school_id)
+
+    def avg_score(self, school_id: Optional[int], grade_level: Optional[str], grade_type: str) -> Optional[float]:
+        """get_avg_score"""
+        return self.cube.avg_score(school_id, grade_level, grade_type)
+
+    def attendance_rate(self, school_id: Optional[int], grade_level: Optional[str], date_str: str) -> Optional[float]:
+        """get_attendance_rate, date_str as YYYY-MM-DD"""
+        day = datetime.datetime.strptime(date_str, '%Y-%m-%d').date()
+        return self.cube.attendance_rate(school_id, grade_level, day)
+
+
+_current: Optional[LocalWarehouse] = None
+
+
+def local_warehouse(directory: str = DEFAULT_SNAPSHOT_DIR) -> Optional[LocalWarehouse]:
+    """
+    The latest published snapshot, None when there is none or it cannot be
+    read, in which case callers query the warehouse as before
+    """
+    global _current
+    version = current_version(directory)
+    if version is None:
+        return None
+    if _current is None or _current.directory != directory or _current.version != version:
+        try:
+            _current = LocalWarehouse(directory, version)
+        except Exception as e:
+            print(f"Could not load snapshot {version}, using the warehouse: {e}")
+            return None
+    return _current
@@ -2,20 +2,31 @@ import sys, os
 from PyQt5 import QtWidgets, uic, QtGui
 from PyQt5.QtCore import QDate, pyqtSignal
 from PyQt5.QtWidgets import QApplication, QMessageBox, QVBoxLayout
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-# Load cached data 
-from attendance_snapshot import attendance_by_school, attendance_by_grade
+# Attendance rates of every school day, published with each warehouse snapshot
+from attendance_snapshot import load_attendance_snapshot
+# Parquet snapshot of the warehouse, the queries below fall back to MySQL without one
+from local_warehouse import ALL_GRADES, ALL_SCHOOLS, local_warehouse
+# Schools and grade levels, loaded once at startup
+from school_catalogue import load_school_catalogue, snapshot_catalogue
+# Chart definitions shared with the headless report renderer, on canvases updated in place
+from chart_canvas import ChartCanvas
+from report_charts import (GRADE_CHART_TITLE, SCHOOL_CHART_TITLE, grade_attendance_bars, grade_attendance_chart,
+                           school_attendance_bars, school_attendance_chart)
 
 
 from data201 import db_connection
 
 
 # Simulated data fetch functions
-def get_average_exam_score(school_name, grade_level, exam_type):
+def get_average_exam_score(school_id, grade_level, exam_type):
     import os
     from data201 import db_connection
 
+    local = local_warehouse()
+    if local is not None:
+        grade_level = None if grade_level == ALL_GRADES else grade_level
+        return local.avg_score(school_id, grade_level, exam_type.lower()) or 0.0
+
     current_dir = os.path.dirname(os.path.abspath(__file__))
     ini_path = os.path.join(current_dir, "sheql2.ini")
 
@@ -23,9 +34,8 @@ def get_average_exam_score(school_name, grade_level, exam_type):
     cursor = conn.cursor()
 
     try:
-        school_id = get_school_id_by_name(cursor, school_name)
-        if not school_id:
-            raise ValueError(f"No school ID found for school: {school_name}")
+        if school_id is None:
+            raise ValueError("No school selected")
 
         cursor.callproc('get_avg_score', [school_id, grade_level, exam_type.lower()])
         
@@ -48,10 +58,15 @@ def get_average_exam_score(school_name, grade_level, exam_type):
         conn.close()
 
 
-def get_attendance_rate(school_name, grade_level, date_str):
+def get_attendance_rate(school_id, grade_level, date_str):
     import os
     from data201 import db_connection
 
+    local = local_warehouse()
+    if local is not None:
+        grade_level = None if grade_level == ALL_GRADES else grade_level
+        return local.attendance_rate(school_id, grade_level, date_str) or 0.0
+
     current_dir = os.path.dirname(os.path.abspath(__file__))
     ini_path = os.path.join(current_dir, "sheql2.ini")
 
@@ -59,17 +74,13 @@ def get_attendance_rate(school_name, grade_level, date_str):
     cursor = conn.cursor()
 
     try:
-        school_id = get_school_id_by_name(cursor, school_name)
-        print(f"Resolved school_id: {school_id} for school_name: {school_name}")
-        if not school_id:
-            raise ValueError(f"No school ID found for school: {school_name}")
+        if school_id is None:
+            raise ValueError("No school selected")
 
-        print(f"Calling procedure with: school_id={school_id} ({type(school_id)}), grade_level={grade_level} ({type(grade_level)}), date={date_str} ({type(date_str)})")
         cursor.callproc('get_attendance_rate', [school_id, grade_level, date_str])
 
         for result in cursor.stored_results():
             rows = result.fetchall()
-            print("Procedure returned rows:", rows)
             if rows and rows[0][0] is not None:
                 return rows[0][0]
 
@@ -85,6 +96,60 @@ def get_attendance_rate(school_name, grade_level, date_str):
 
 
 
+def get_district_kpis():
+    """All district KPIs as {column: value}, from the snapshot or one get_district_kpis call"""
+    import os
+    from data201 import db_connection
+
+    local = local_warehouse()
+    if local is not None and local.district_kpis() is not None:
+        return local.district_kpis()
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    ini_path = os.path.join(current_dir, "sheql2.ini")
+
+    # connecting is inside the try: this runs in a Qt slot, where a down warehouse must not raise
+    conn = cursor = None
+    try:
+        conn = db_connection(config_file=ini_path)
+        cursor = conn.cursor()
+        cursor.callproc('get_district_kpis')
+
+        for result in cursor.stored_results():
+            row = result.fetchone()
+            if row:
+                return dict(zip([column[0] for column in result.description], row))
+
+        return None
+
+    except Exception as e:
+        print(f"Error in get_district_kpis: {e}")
+        return None
+
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if conn is not None:
+            conn.close()
+
+
+# KPI labels with the get_district_kpis column and format they show
+KPI_LABELS = [
+    # executive tab strip
+    ('lblKpiSchools', 'total_schools', '{:,}'),
+    ('lblKpiStudents', 'total_students', '{:,}'),
+    ('lblKpiTeachers', 'total_teachers', '{:,}'),
+    ('lblKpiAbsenceRate', 'absence_rate', '{:.2f}%'),
+    ('lblKpiLateRate', 'late_rate', '{:.2f}%'),
+    ('lblKpiExcusedRate', 'excused_rate', '{:.2f}%'),
+    ('lblKpiAvgScore', 'avg_score', '{:.2f}'),
+    # dashboard tab header
+    ('lblTotalSchools', 'total_schools', '{:,}'),
+    ('lblActiveStudents', 'total_students', '{:,}'),
+    ('lblAvgAttendance', 'absence_rate', '{:.2f}%'),
+]
+
+
 # Helper to enforce widget presence
 def require_widget(parent, widget_type, name):
     widget = parent.findChild(widget_type, name)
@@ -92,11 +157,6 @@ def require_widget(parent, widget_type, name):
         raise RuntimeError(f"Missing widget: {name}")
     return widget
 
-def get_school_id_by_name(cursor, school_name):
-    cursor.execute("SELECT school_id FROM school_dim WHERE name = %s", (school_name,))
-    result = cursor.fetchone()
-    return result[0] if result else None
-
 
 class DistrictEmployeeDashboard(QtWidgets.QMainWindow):
     logout_signal = pyqtSignal()
@@ -133,10 +193,17 @@ class DistrictEmployeeDashboard(QtWidgets.QMainWindow):
         self.schoolBarChartWidget = require_widget(self, QtWidgets.QWidget, "schoolBarChart")
         self.gradeBarChartWidget = require_widget(self, QtWidgets.QWidget, "gradeBarChart")
         self.comboSchoolChart = require_widget(self, QtWidgets.QComboBox, "comboSchoolChart")
+        self.dateExecutive = require_widget(self, QtWidgets.QDateEdit, "dateExecutive")
+        self.labelSchoolChartTitle = require_widget(self, QtWidgets.QLabel, "labelSchoolChartTitle")
+        self.labelGradeChartTitle = require_widget(self, QtWidgets.QLabel, "labelGradeChartTitle")
+        self.mainTabs = require_widget(self, QtWidgets.QTabWidget, "mainTabs")
+        self.executiveTab = require_widget(self, QtWidgets.QWidget, "executiveTab")
+        self.kpiLabels = [(require_widget(self, QtWidgets.QLabel, name), column, pattern)
+                          for name, column, pattern in KPI_LABELS]
 
         # Create and attach chart canvases
-        self.schoolChart, self.schoolAx = self.create_chart_canvas()
-        self.gradeChart, self.gradeAx = self.create_chart_canvas()
+        self.schoolChart = ChartCanvas(school_attendance_chart, blit=True)
+        self.gradeChart = ChartCanvas(grade_attendance_chart, blit=True)
 
         self.schoolBarChartWidget.setLayout(QVBoxLayout())
         self.schoolBarChartWidget.layout().addWidget(self.schoolChart)
@@ -152,11 +219,16 @@ class DistrictEmployeeDashboard(QtWidgets.QMainWindow):
         
 
 
-        # Populate school dropdown
+        # Populate school dropdown, each item carrying its school_id
+        self.rollups = False
         try:
-            school_names = self.fetch_school_names()
-            print("Fetched school names:", school_names)
-            self.comboSchool.addItems(school_names or ["No schools found"])
+            self.catalogue = self.load_catalogue()
+            if self.catalogue.schools and self.rollups:
+                self.comboSchool.addItem(ALL_SCHOOLS, None)
+            for school_id, school_name in self.catalogue.schools:
+                self.comboSchool.addItem(school_name, school_id)
+            if not self.catalogue.schools:
+                self.comboSchool.addItems(["No schools found"])
         except Exception as e:
             self.show_error(f"Failed to load schools:\n{e}")
             self.comboSchool.addItems(["DB Error - fallback"])
@@ -165,14 +237,18 @@ class DistrictEmployeeDashboard(QtWidgets.QMainWindow):
         self.dateAttendance.setDate(QDate.currentDate())
 
         # Populate dropdown
-        self.school_map = {}
-        for entry in attendance_by_school:
-            school_id = entry[0]
-            school_name = entry[1]
-            self.comboSchoolChart.addItem(school_name, school_id)
-            self.school_map[school_id] = school_name
+        self.attendance = load_attendance_snapshot()
+        self.show_attendance_snapshot()
 
         self.comboSchoolChart.currentTextChanged.connect(self.update_grade_chart)
+        self.dateExecutive.dateChanged.connect(self.refresh_executive_tab)
+
+        # KPIs of the latest ETL run, loaded once per snapshot like the catalogue,
+        # and checked for a newer snapshot when the executive tab is shown
+        self.kpis = None
+        self.kpis_version = None
+        self.show_district_kpis()
+        self.mainTabs.currentChanged.connect(self.on_tab_changed)
 
 
          # Initial draw
@@ -186,154 +262,143 @@ class DistrictEmployeeDashboard(QtWidgets.QMainWindow):
         self.logout_signal.emit()
         self.close()
 
-    def fetch_school_names(self):
+    def load_catalogue(self):
+        """Schools and grade levels from the local snapshot, or in one call to the warehouse"""
+        local = local_warehouse()
+        self.rollups = local is not None
+        if local is not None:
+            return snapshot_catalogue(local)
+
         # use below for python script
         current_dir = os.path.dirname(os.path.abspath(__file__))
         ini_path = os.path.join(current_dir, "sheql2.ini")
-
-        conn = db_connection(config_file=ini_path)
         #use below for python notebook
-        #conn = db_connection(config_file='sheql2.ini')
-        cursor = conn.cursor()
-
-        try:
-            cursor.callproc('get_all_schools')
-            found_results = False
-            schools = []
-
-            for result in cursor.stored_results():
-                print("Found stored result set")
-                schools = [row[1] for row in result.fetchall()]
-                found_results = True
-                break 
-            
-            if not found_results:
-                print(" No stored result set found")
-                raise RuntimeError("No result set returned from stored procedure.")
-
-            print(f"Fetched schools {schools}")  # Debug statement
-            return schools
-        
-        finally:
-            cursor.close()
-            conn.close()
+        #ini_path = 'sheql2.ini'
+        return load_school_catalogue(ini_path)
 
     # Handler method to get grade levels 
     def on_school_selected(self, school_name):
         if school_name and "No schools" not in school_name and "Error" not in school_name:
-            self.fetch_grade_levels(school_name)
-        
-    def fetch_grade_levels(self, school_name):
-        self.comboGrade.clear()
-        self.comboGrade.addItem("Loading grades...")
-        QApplication.processEvents()
+            self.fetch_grade_levels(self.comboSchool.currentData())
 
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        ini_path = os.path.join(current_dir, "sheql2.ini")
-
-        conn = db_connection(config_file=ini_path)
-        #conn = db_connection(config_file='sheql2.ini')
-        cursor = conn.cursor()
-
-        try:
-            school_id = get_school_id_by_name(cursor, school_name)
-            if school_id is None:
-                raise ValueError("No school ID found for '{school name}'")
-            
-            cursor.callproc('get_grade_levels', [school_id])
-            grades = []
-
-            for result in cursor.stored_results():
-                grades = [row[0] for row in result.fetchall()]
-            
-            self.comboGrade.clear()
-            self.comboGrade.addItems(grades if grades else ["No grades found"])
-
-        except Exception as e:
-            self.show_error(f"Failed to load grades:\n{e}")
-            self.comboGrade.clear()
-            self.comboGrade.addItems(['error'])
-        
-        finally:
-            cursor.close()
-            conn.close()
+    def fetch_grade_levels(self, school_id):
+        """Fill the grade combobox from the catalogue, school_id None for the whole district"""
+        grades = self.catalogue.grade_levels(school_id)
+        if grades and self.rollups:
+            grades = [ALL_GRADES] + grades
+        self.comboGrade.clear()
+        self.comboGrade.addItems(grades if grades else ["No grades found"])
 
 
     def fetch_exam_score(self):
-        school = self.comboSchool.currentText()
+        school_id = self.comboSchool.currentData()
         grade = self.comboGrade.currentText()
         exam_type = self.comboExamType.currentText()
-        avg = get_average_exam_score(school, grade, exam_type)
+        avg = get_average_exam_score(school_id, grade, exam_type)
         self.lblExamResult.setText(f"Avg: {avg:.2f}")
 
     def fetch_attendance_rate(self):
-        school = self.comboSchool.currentText()
+        school_id = self.comboSchool.currentData()
         grade = self.comboGrade.currentText()
         date = self.dateAttendance.date().toString("yyyy-MM-dd")
-        rate = get_attendance_rate(school, grade, date)
+        rate = get_attendance_rate(school_id, grade, date)
         self.lblAttendanceResult.setText(f"Avg: {rate:.2f}%")
 
-    def create_chart_canvas(self):
-        fig = Figure(figsize=(10, 4))
-        canvas = FigureCanvas(fig)
-        ax = fig.add_subplot(111)
-        return canvas, ax
+    def on_tab_changed(self, index):
+        if self.mainTabs.widget(index) is self.executiveTab:
+            self.show_district_kpis()
+            self.refresh_executive_tab()
+
+    def show_district_kpis(self):
+        """
+        Show the KPIs, read again only when the ETL has published a new
+        snapshot. Without a snapshot they are read from the warehouse once.
+        """
+        local = local_warehouse()
+        version = local.version if local is not None else None
+        if self.kpis is not None and version == self.kpis_version:
+            return
+        kpis = get_district_kpis()
+        if kpis is None:
+            return
+        self.kpis, self.kpis_version = kpis, version
+        for label, column, pattern in self.kpiLabels:
+            value = kpis.get(column)
+            # NULL (None, or NaN from the snapshot) when there is nothing to average yet
+            label.setText('--' if value is None or value != value else pattern.format(value))
+
+    def show_attendance_snapshot(self, keep_date: bool = False):
+        """
+        Fill the school dropdown and date range of the executive tab from
+        self.attendance, keeping the selected school and, with keep_date, the
+        picked date when the snapshot still has them
+        """
+        picked = self.dateExecutive.date()
+        selected_id = self.comboSchoolChart.currentData()
+        self.comboSchoolChart.blockSignals(True)
+        self.dateExecutive.blockSignals(True)
+        try:
+            self.comboSchoolChart.clear()
+            self.school_map = {}
+            for school_id, school_name in (self.attendance.schools if self.attendance else []):
+                self.comboSchoolChart.addItem(school_name, school_id)
+                self.school_map[school_id] = school_name
+            if selected_id in self.school_map:
+                self.comboSchoolChart.setCurrentIndex(self.comboSchoolChart.findData(selected_id))
+
+            # Dates the snapshot covers, defaulting to its latest school day
+            if self.attendance is not None and self.attendance.last_date() is not None:
+                first, last = self.attendance.first_date(), self.attendance.last_date()
+                self.dateExecutive.setDateRange(QDate(first.year, first.month, first.day),
+                                                QDate(last.year, last.month, last.day))
+                self.dateExecutive.setDate(picked if keep_date else QDate(last.year, last.month, last.day))
+        finally:
+            self.comboSchoolChart.blockSignals(False)
+            self.dateExecutive.blockSignals(False)
+
+    def reload_attendance_snapshot(self):
+        """Switch to a snapshot the ETL published since the last look at CURRENT"""
+        attendance = load_attendance_snapshot()
+        if attendance is not self.attendance:
+            self.attendance = attendance
+            self.show_attendance_snapshot(keep_date=True)
+
+    def executive_day(self):
+        """The school day shown on the executive tab: the picked date or the last school day before it"""
+        if self.attendance is None:
+            return None
+        return self.attendance.school_day(self.dateExecutive.date().toPyDate())
+
+    def refresh_executive_tab(self, _=None):
+        """Redraw the executive charts, from a newer attendance snapshot if the ETL has published one"""
+        self.reload_attendance_snapshot()
+        self.draw_school_chart()
+        self.update_grade_chart()
+
+    @staticmethod
+    def set_chart_title(label, title, day):
+        subtitle = day.strftime('%B %d, %Y').replace(' 0', ' ') if day else 'no attendance snapshot'
+        label.setText(f'<span style="font-size:18pt; font-weight:600;">{title}</span><br>'
+                      f'<span style="font-size:10pt; color:#666;">({subtitle})</span>')
 
     def draw_school_chart(self):
-        ax = self.schoolAx
-        ax.clear()
-        names = [entry[1] for entry in attendance_by_school]
-        rates = [entry[2] for entry in attendance_by_school]
-        ax.barh(names, rates)
-        ax.set_xlim(90, 100)
-        ax.set_title("Attendance Rate by School")
-        ax.tick_params(axis='y', labelsize=9)
-        self.schoolChart.figure.subplots_adjust(left=0.35)
-        self.schoolChart.draw()
+        day = self.executive_day()
+        self.set_chart_title(self.labelSchoolChartTitle, SCHOOL_CHART_TITLE, day)
+        attendance_by_school = self.attendance.attendance_by_school(day) if day else []
+
+        self.schoolChart.show_bars(*school_attendance_bars(attendance_by_school), SCHOOL_CHART_TITLE)
 
     def update_grade_chart(self):
         selected_id = self.comboSchoolChart.currentData()
-        print("Selected ID from comboSchoolChart:", selected_id, type(selected_id))
-        print("Available keys in school_map:", list(self.school_map.keys()))
-
         if selected_id is None:
-            print("No School Selected.")
             return
         
-        ax = self.gradeAx
-        ax.clear()
-
-        filtered = [entry for entry in attendance_by_grade if int(entry["school_id"]) == selected_id]
-        # Create a sorting system so we don't lose data in the plot
-        def grade_sort_key(g):
-            return 0 if g == "K" else int(g)
+        day = self.executive_day()
+        self.set_chart_title(self.labelGradeChartTitle, GRADE_CHART_TITLE, day)
 
-        filtered_sorted = sorted(filtered, key=lambda e: grade_sort_key(e["grade_level"]))
-
-        grades = [entry["grade_level"] for entry in filtered_sorted]
-        rates = [entry["attendance_rate"] for entry in filtered_sorted]
-
-        positions = list(range(len(grades)))
-
-        print("Filtered grades + rates:")
-        for entry in filtered_sorted:
-            print(entry)
-        
-        if "10" in grades:
-            print("Grade 10 found! Index:", grades.index("10"), "Rate:", rates[grades.index("10")])
-        else:
-            print("Grade 10 missing from sorted list!")
-
-
-        #school_name = self.school_map.get(selected_id, f"ID {selected_id}")
-        ax.bar(positions, rates, color='tab:blue')
-        ax.set_xticks(positions)
-        ax.set_xticklabels(grades)
-        #ax.bar(grades, rates)
-        ax.set_ylim(80, 100)
-        ax.set_title(f"Grade-Level Attendance - {self.school_map[selected_id]}")
-        ax.tick_params(axis='x', labelsize=9)
-        self.gradeChart.draw()
+        filtered = self.attendance.attendance_by_grade(selected_id, day) if day else []
+        self.gradeChart.show_bars(*grade_attendance_bars(filtered),
+                                  f"{GRADE_CHART_TITLE} - {self.school_map[selected_id]}")
 
 
     def show_error(self, msg):
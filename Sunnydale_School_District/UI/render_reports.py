@@ -0,0 +1,146 @@
+"""
+Nightly attendance reports for the district, rendered without Qt.
+
+One query reads the day's attendance_daily_summary rows for every school
+and grade, then a process pool draws the district report (the executive
+tab's school chart) and one report per school (its grade chart) with the
+chart definitions in report_charts.py, printing how long each one took.
+
+    python render_reports.py --date 2025-05-16 --format pdf --out reports
+
+The day is the given date or, like the executive tab, the last school day
+before it.
+"""
+import argparse
+import datetime
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from data201 import db_connection
+from report_charts import FIGURE_SIZE, plot_grade_attendance, plot_school_attendance
+
+UI_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FORMATS = ('pdf', 'png')
+
+REPORT_SQL = """
+SELECT ads.date_id, s.school_id, s.name, ads.grade_level, ads.present_count, ads.total_count
+FROM attendance_daily_summary ads
+JOIN school_dim s ON s.school_id = ads.school_id
+WHERE ads.date_id = (
+    SELECT MAX(d.date_id)
+    FROM date_dim d
+    WHERE d.is_school_day
+    AND d.date_id <= TO_DAYS(%s)
+    AND EXISTS (SELECT 1 FROM attendance_daily_summary x WHERE x.date_id = d.date_id)
+)
+ORDER BY s.name, ads.grade_level
+"""
+
+
+class Report(NamedTuple):
+    path: str
+    day: datetime.date
+    school_name: Optional[str]   # None for the district report
+    rows: list
+
+
+def load_attendance(ini_path: str, day: datetime.date):
+    """
+    The school day the reports show with its (school_id, name, rate) rows and
+    {'school_id', 'grade_level', 'attendance_rate'} rows by school, in one query
+    """
+    conn = db_connection(config_file=ini_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(REPORT_SQL, (day.isoformat(),))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    if not rows:
+        return None, [], {}
+
+    school_day = datetime.date.fromordinal(rows[0][0] - 365)
+    totals: Dict[int, List] = {}
+    by_grade: Dict[int, List[dict]] = {}
+    for _, school_id, name, grade_level, present, total in rows:
+        school = totals.setdefault(school_id, [name, 0, 0])
+        school[1] += present
+        school[2] += total
+        if total:
+            by_grade.setdefault(school_id, []).append({
+                'school_id': school_id,
+                'grade_level': grade_level,
+                'attendance_rate': round(100 * present / total, 1),
+            })
+    by_school = [(school_id, name, round(100 * present / total, 1))
+                 for school_id, (name, present, total) in totals.items() if total]
+    return school_day, by_school, by_grade
+
+
+def render_report(report: Report) -> Tuple[str, float]:
+    """Draw and save one report, returning its path and the seconds it took"""
+    started = time.perf_counter()
+    fig = Figure(figsize=FIGURE_SIZE)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    if report.school_name is None:
+        plot_school_attendance(ax, report.rows)
+    else:
+        plot_grade_attendance(ax, report.school_name, report.rows)
+    fig.text(0.99, 0.01, report.day.strftime('%B %d, %Y').replace(' 0', ' '), ha='right', fontsize=8)
+    fig.savefig(report.path)
+    return report.path, time.perf_counter() - started
+
+
+def render_reports(ini_path: str, day: datetime.date, out_dir: str, fmt: str = 'pdf',
+                   workers: Optional[int] = None) -> List[Tuple[str, float]]:
+    school_day, by_school, by_grade = load_attendance(ini_path, day)
+    if school_day is None:
+        print(f"No attendance on or before {day}")
+        return []
+
+    os.makedirs(out_dir, exist_ok=True)
+    names = {school_id: name for school_id, name, _ in by_school}
+    reports = [Report(os.path.join(out_dir, f"district-{school_day}.{fmt}"), school_day, None, by_school)]
+    reports += [Report(os.path.join(out_dir, f"school-{school_id:03d}-{school_day}.{fmt}"),
+                       school_day, names.get(school_id, f"ID {school_id}"), rows)
+                for school_id, rows in by_grade.items()]
+
+    print(f"Rendering {len(reports)} reports for {school_day}")
+    started = time.perf_counter()
+    timings = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in as_completed([pool.submit(render_report, report) for report in reports]):
+            path, seconds = future.result()
+            timings.append((path, seconds))
+            print(f"  {os.path.basename(path):40} {1000 * seconds:8.1f} ms")
+    print(f"Rendered {len(timings)} reports in {time.perf_counter() - started:.2f} s")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the district attendance reports without the dashboard")
+    parser.add_argument('--date', type=datetime.date.fromisoformat, default=datetime.date.today(),
+                        help="report on this day or the last school day before it (YYYY-MM-DD)")
+    parser.add_argument('--format', choices=FORMATS, default='pdf')
+    parser.add_argument('--out', default=os.path.join(UI_DIR, 'reports'), help="directory to write the reports to")
+    parser.add_argument('--config', default=os.path.join(UI_DIR, 'sheql2.ini'),
+                        help="ini file of the warehouse database server")
+    parser.add_argument('--workers', type=int, help="rendering processes, default one per CPU")
+    options = parser.parse_args()
+    render_reports(options.config, options.date, options.out, options.format, options.workers)
+
+
+if __name__ == "__main__":
+    main()
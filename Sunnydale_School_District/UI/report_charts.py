@@ -0,0 +1,142 @@
+"""
+The application's bar charts, drawn on a matplotlib Axes with no Qt, so the
+dashboards (through chart_canvas.py) and the headless report renderer
+(render_reports.py) draw exactly the same charts.
+
+A BarChart creates its bars once and afterwards only changes their lengths,
+rebuilding them only when the categories change.
+"""
+from typing import List, Optional, Sequence, Tuple, Union
+
+import analytical_modules  # school_calendar is shared with the ETL
+from school_calendar import grade_order
+
+FIGURE_SIZE = (10, 4)
+
+SCHOOL_CHART_TITLE = "Attendance Rate by School"
+GRADE_CHART_TITLE = "Grade-Level Attendance"
+
+
+class BarChart:
+    def __init__(self, ax, horizontal: bool = False, limits: Optional[Tuple[float, float]] = None,
+                 colors: Union[str, Sequence[str], None] = None, label_size: Optional[int] = None,
+                 grid: bool = False):
+        """
+        limits fixes the value axis, otherwise it grows with the values. colors
+        is one color or a palette the bars take in order.
+        """
+        self.ax = ax
+        self.horizontal = horizontal
+        self.limits = limits
+        self.colors = colors
+        self.labels: List[str] = []
+        self.bars = []
+        self.animated = False
+        self.title = ax.set_title('')
+
+        value_axis = 'x' if horizontal else 'y'
+        if label_size:
+            ax.tick_params(axis='y' if horizontal else 'x', labelsize=label_size)
+        if grid:
+            ax.grid(axis=value_axis, color='#dddddd')
+            ax.set_axisbelow(True)
+        if limits:
+            self._set_value_limits(limits)
+
+    def _set_value_limits(self, limits):
+        (self.ax.set_xlim if self.horizontal else self.ax.set_ylim)(*limits)
+
+    def _value_limits(self):
+        return (self.ax.get_xlim if self.horizontal else self.ax.get_ylim)()
+
+    def _bar_colors(self, count: int):
+        if self.colors is None or isinstance(self.colors, str):
+            return self.colors
+        return [self.colors[i % len(self.colors)] for i in range(count)]
+
+    def set_animated(self, animated: bool):
+        """Animated bars are left out of a full draw so a canvas can blit them"""
+        self.animated = animated
+        for bar in self.bars:
+            bar.set_animated(animated)
+
+    def update(self, labels: Sequence[str], values: Sequence[float], title: str = '') -> bool:
+        """
+        Show values as bars named labels. Returns True when more than the bar
+        lengths changed (categories, value axis or title), so the whole figure
+        needs drawing rather than just the bars.
+        """
+        labels = [str(label) for label in labels]
+        values = [float(value) for value in values]
+        ax = self.ax
+        relayout = labels != self.labels
+
+        if relayout:
+            for bar in self.bars:
+                bar.remove()
+            positions = list(range(len(labels)))
+            plot = ax.barh if self.horizontal else ax.bar
+            self.bars = list(plot(positions, values, color=self._bar_colors(len(values))))
+            for bar in self.bars:
+                bar.set_animated(self.animated)
+            if self.horizontal:
+                ax.set_yticks(positions)
+                ax.set_yticklabels(labels)
+                ax.set_ylim(-0.5, len(labels) - 0.5)
+            else:
+                ax.set_xticks(positions)
+                ax.set_xticklabels(labels)
+                ax.set_xlim(-0.5, len(labels) - 0.5)
+            self.labels = labels
+        else:
+            for bar, value in zip(self.bars, values):
+                (bar.set_width if self.horizontal else bar.set_height)(value)
+
+        if self.limits is None:
+            limits = (0, max(values, default=0) * 1.1 or 1)
+            if tuple(self._value_limits()) != limits:
+                self._set_value_limits(limits)
+                relayout = True
+
+        if title != self.title.get_text():
+            self.title.set_text(title)
+            relayout = True
+        return relayout
+
+    def draw_bars(self):
+        """Draw just the bars, for blitting"""
+        for bar in self.bars:
+            self.ax.draw_artist(bar)
+
+
+def school_attendance_chart(ax) -> BarChart:
+    """The executive tab's attendance rate by school"""
+    ax.figure.subplots_adjust(left=0.35)
+    return BarChart(ax, horizontal=True, limits=(90, 100), label_size=9)
+
+
+def school_attendance_bars(attendance_by_school: Sequence[Tuple[int, str, float]]):
+    """Labels and values of (school_id, name, attendance rate) rows"""
+    return [entry[1] for entry in attendance_by_school], [entry[2] for entry in attendance_by_school]
+
+
+def grade_attendance_chart(ax) -> BarChart:
+    """The executive tab's attendance rate by grade of one school"""
+    return BarChart(ax, limits=(80, 100), colors='tab:blue', label_size=9)
+
+
+def grade_attendance_bars(attendance_by_grade: List[dict]):
+    """Labels and values of {'grade_level', 'attendance_rate'} rows, K to 12"""
+    # Create a sorting system so we don't lose data in the plot
+    filtered_sorted = sorted(attendance_by_grade, key=lambda e: grade_order(e["grade_level"]))
+    return ([entry["grade_level"] for entry in filtered_sorted],
+            [entry["attendance_rate"] for entry in filtered_sorted])
+
+
+def plot_school_attendance(ax, attendance_by_school: Sequence[Tuple[int, str, float]]):
+    school_attendance_chart(ax).update(*school_attendance_bars(attendance_by_school), SCHOOL_CHART_TITLE)
+
+
+def plot_grade_attendance(ax, school_name: str, attendance_by_grade: List[dict]):
+    grade_attendance_chart(ax).update(*grade_attendance_bars(attendance_by_grade),
+                                      f"{GRADE_CHART_TITLE} - {school_name}")
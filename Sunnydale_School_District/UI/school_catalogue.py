@@ -0,0 +1,56 @@
+"""
+The schools and their grade levels, loaded once when a district dashboard
+starts (one get_school_catalogue call, or the local snapshot when there is
+one) so changing the school combobox needs no lookups and the school ids go
+straight to the procedures.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import analytical_modules  # school_calendar is shared with the ETL
+from data201 import db_connection
+from school_calendar import grade_order
+
+
+class SchoolCatalogue:
+    def __init__(self, rows: Iterable[Tuple[int, str, Optional[str]]]):
+        """rows of (school_id, name, grade_level), grade_level None for a school without grades"""
+        self.schools: List[Tuple[int, str]] = []
+        self.grade_levels_by_school: Dict[int, List[str]] = {}
+        for school_id, name, grade_level in rows:
+            if school_id not in self.grade_levels_by_school:
+                self.schools.append((school_id, name))
+                self.grade_levels_by_school[school_id] = []
+            if grade_level is not None:
+                self.grade_levels_by_school[school_id].append(grade_level)
+
+    def grade_levels(self, school_id: Optional[int]) -> List[str]:
+        """Grade levels of the school, or of the whole district for None"""
+        if school_id is None:
+            grades = {grade for grades in self.grade_levels_by_school.values() for grade in grades}
+            return sorted(grades, key=grade_order)
+        return self.grade_levels_by_school.get(school_id, [])
+
+
+def load_school_catalogue(ini_path: str) -> SchoolCatalogue:
+    """The catalogue from the warehouse, in one procedure call"""
+    conn = db_connection(config_file=ini_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.callproc('get_school_catalogue')
+        for result in cursor.stored_results():
+            return SchoolCatalogue(result.fetchall())
+        raise RuntimeError("No result set returned from stored procedure.")
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def snapshot_catalogue(local) -> SchoolCatalogue:
+    """The catalogue from a LocalWarehouse snapshot"""
+    return SchoolCatalogue(
+        (school_id, name, grade_level)
+        for school_id, name in local.all_schools()
+        for grade_level in (local.grade_levels(school_id) or [None])
+    )
@@ -6,10 +6,8 @@ from PyQt5.QtCore import QDate, Qt, pyqtSignal
 from data201 import db_connection
 import datetime
 
-import matplotlib.pyplot as plt
-import seaborn as sns
-from matplotlib.backends.backend_qt5agg import FigureCanvas 
-from pandas import DataFrame
+# bar charts created once and updated in place
+from chart_canvas import ChartCanvas
 
 class TeacherHomepageWindow(QMainWindow):
     """
@@ -94,6 +92,10 @@ class TeacherHomepageWindow(QMainWindow):
 
         # get the attendance chart for the day selected
         # self._draw_attendance_bar_chart()
+        self.attendance_chart = ChartCanvas(figsize=(6.4, 4.8), blit=True, grid=True,
+                                            colors=['#5acaf2', '#ff5959', '#fff07a', '#4de378'])
+        self.attendance_chart_layout.addWidget(self.attendance_chart)
+        self.attendance_chart.clear_bars()
         self.attendance_date_selector.currentIndexChanged.connect(self._draw_attendance_bar_chart)
 
         ### ------ COMMUNICATION TAB FUNCTIONALITY -------------
@@ -116,6 +118,9 @@ class TeacherHomepageWindow(QMainWindow):
         self.analytics_course_selector.currentIndexChanged.connect(self._show_course_grade_report)
 
         # show the chart of grade counts
+        self.grades_chart = ChartCanvas(figsize=(6.4, 4.8), blit=True, grid=True,
+                                        colors=['#27f562', '#88f06e', '#f0f06e', '#f0ad6e', '#f24b4b'])
+        self.analytics_chart_layout.layout().addWidget(self.grades_chart)
         self._draw_grades_bar_chart()
         self.analytics_course_selector.currentIndexChanged.connect(self._draw_grades_bar_chart)
 
@@ -673,11 +678,11 @@ class TeacherHomepageWindow(QMainWindow):
         """
         Draw a bar chart showcasing attendance counts each day
         """
-        self._clear_graph()
-        
         date = self.attendance_date_selector.currentData()
         
-        if date: 
+        if not date:
+            self._clear_graph()
+        else: 
             conn = db_connection(config_file='sheql.ini')
             cursor = conn.cursor()
 
@@ -691,33 +696,14 @@ class TeacherHomepageWindow(QMainWindow):
             cursor.close()
             conn.close()
                 
-            df = DataFrame(counts, columns = ['Attendance Type', 'Number of Students'])
-            
-            sns.set(style='whitegrid')
-            ax = sns.barplot(x='Attendance Type', y='Number of Students', hue ='Attendance Type',
-                             data=df,  errorbar=None, 
-                             palette=['#5acaf2', '#ff5959', '#fff07a', '#4de378'])
-    
-            ax.set_title(f'Attendance for {date}')
-            self.attendance_chart_layout.addWidget(FigureCanvas(ax.figure))
-    
-            plt.close()
+            self.attendance_chart.show_bars([row[0] for row in counts], [row[1] for row in counts],
+                                            f'Attendance for {date}')
 
     def _clear_graph(self):
         """
         Remove all the bars from the graph.
         """
-        children = []
-        
-        # Gather children which are the bars in the layout.
-        for i in range(self.attendance_chart_layout.count()):
-            child = self.attendance_chart_layout.itemAt(i).widget()
-            if child:
-                children.append(child)
-                
-        # Delete the bars.
-        for child in children:
-            child.deleteLater()
+        self.attendance_chart.clear_bars()
 
     ### ------ COMMUNICATION TAB  ----------
     def _initialize_communication_table(self):
@@ -831,11 +817,11 @@ class TeacherHomepageWindow(QMainWindow):
         """
         Draw a bar chart showcasing grade counts 
         """
-        self._clear_grades_graph()
-        
         course_data = self.analytics_course_selector.currentData()
-        if course_data:
-            course_name, course_id, grade = course_data
+        if not course_data:
+            self._clear_grades_graph()
+            return
+        course_name, course_id, grade = course_data
         
         conn = db_connection(config_file='sheql.ini')
         cursor = conn.cursor()
@@ -850,30 +836,11 @@ class TeacherHomepageWindow(QMainWindow):
         cursor.close()
         conn.close()
             
-        df = DataFrame(counts, columns = ['Letter Grade', 'Number of Students'])
-        
-        sns.set(style='whitegrid')
-        ax = sns.barplot(x='Letter Grade', y='Number of Students', hue ='Letter Grade',
-                         data=df,  errorbar=None, 
-                         palette=['#27f562', '#88f06e', '#f0f06e', '#f0ad6e', '#f24b4b'])
-
-        ax.set_title(f'Grade Report for {course_name}')
-        self.chart_layout.addWidget(FigureCanvas(ax.figure))
-
-        plt.close()
+        self.grades_chart.show_bars([row[0] for row in counts], [row[1] for row in counts],
+                                    f'Grade Report for {course_name}')
 
     def _clear_grades_graph(self):
         """
         Remove all the bars from the graph.
         """
-        children = []
-        
-        # Gather children which are the bars in the layout.
-        for i in range(self.chart_layout.count()):
-            child = self.chart_layout.itemAt(i).widget()
-            if child:
-                children.append(child)
-                
-        # Delete the bars.
-        for child in children:
-            child.deleteLater()
\ No newline at end of file
+        self.grades_chart.clear_bars()
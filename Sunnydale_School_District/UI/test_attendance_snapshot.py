@@ -0,0 +1,54 @@
+import datetime
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+pytest.importorskip('sqlalchemy')
+
+from attendance_snapshot import AttendanceSnapshot
+# the writer, on the Analytical_db path attendance_snapshot adds
+from attendance_rates import write_attendance_rates
+from school_calendar import to_days
+
+MONDAY = datetime.date(2025, 5, 12)
+TUESDAY = datetime.date(2025, 5, 13)
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    rows = pd.DataFrame(
+        [
+            (to_days(MONDAY), 1, 'K', 9, 10),
+            (to_days(MONDAY), 1, '1', 3, 4),
+            (to_days(MONDAY), 2, '1', 1, 2),
+            # school 2 has no attendance on Tuesday
+            (to_days(TUESDAY), 1, 'K', 10, 10),
+        ],
+        columns=['date_id', 'school_id', 'grade_level', 'present_count', 'total_count'],
+    )
+    schools = pd.DataFrame([(1, 'Sunnydale High'), (2, 'Hilltop')], columns=['school_id', 'name'])
+    path = str(tmp_path / 'attendance_rates.bin')
+    assert write_attendance_rates(path, rows, schools) == 2
+    return AttendanceSnapshot(path)
+
+
+def test_reads_back_what_was_written(snapshot):
+    assert snapshot.schools == [(1, 'Sunnydale High'), (2, 'Hilltop')]
+    assert snapshot.grade_levels == ['K', '1']
+    assert (snapshot.first_date(), snapshot.last_date()) == (MONDAY, TUESDAY)
+    # rates are stored as float32
+    by_school = snapshot.attendance_by_school(MONDAY)
+    assert [(school_id, name) for school_id, name, _ in by_school] == [(1, 'Sunnydale High'), (2, 'Hilltop')]
+    assert [rate for _, _, rate in by_school] == pytest.approx([85.7, 50.0], abs=1e-4)
+    by_grade = snapshot.attendance_by_grade(1, MONDAY)
+    assert [entry['grade_level'] for entry in by_grade] == ['K', '1']
+    assert [entry['attendance_rate'] for entry in by_grade] == pytest.approx([90.0, 75.0])
+
+
+def test_days_without_attendance(snapshot):
+    assert snapshot.attendance_by_school(TUESDAY) == [(1, 'Sunnydale High', 100.0)]
+    assert snapshot.attendance_by_grade(2, TUESDAY) == []
+    # the weekend shows the last school day before it
+    assert snapshot.school_day(datetime.date(2025, 5, 17)) == TUESDAY
+    assert snapshot.school_day(datetime.date(2025, 5, 11)) is None